@@ -0,0 +1,33 @@
+-- CreateIndex respostas: leitura incremental por criado_em no rollup do ML Service
+CREATE INDEX `respostas_criado_em_idx` ON `respostas`(`criado_em`);
+
+-- CreateTable
+CREATE TABLE `ml_aluno_stats` (
+    `aluno_id` VARCHAR(191) NOT NULL,
+    `turma_id` VARCHAR(191) NOT NULL DEFAULT '',
+    `total_respostas` INTEGER NOT NULL DEFAULT 0,
+    `soma_notas` BIGINT NOT NULL DEFAULT 0,
+    `total_notas` INTEGER NOT NULL DEFAULT 0,
+    `primeira_resposta` DATETIME(3) NULL,
+    `ultima_resposta` DATETIME(3) NULL,
+
+    INDEX `ml_aluno_stats_turma_id_idx`(`turma_id`),
+    PRIMARY KEY (`aluno_id`, `turma_id`)
+) DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- CreateTable
+CREATE TABLE `ml_aluno_questionarios` (
+    `aluno_id` VARCHAR(191) NOT NULL,
+    `questionario_id` VARCHAR(191) NOT NULL,
+
+    PRIMARY KEY (`aluno_id`, `questionario_id`)
+) DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- CreateTable
+CREATE TABLE `ml_rollup_state` (
+    `nome` VARCHAR(191) NOT NULL,
+    `watermark` DATETIME(3) NOT NULL,
+    `atualizado_em` DATETIME(3) NOT NULL,
+
+    PRIMARY KEY (`nome`)
+) DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
@@ -0,0 +1,8 @@
+-- CreateIndex respostas: versão dos dados (COUNT e MAX(criado_em)) por aluno e por
+-- questionário lida só do índice, para os ETags do ML Service
+CREATE INDEX `respostas_aluno_id_criado_em_idx` ON `respostas`(`aluno_id`, `criado_em`);
+CREATE INDEX `respostas_questionario_id_criado_em_idx` ON `respostas`(`questionario_id`, `criado_em`);
+
+-- DropIndex (cobertos pelos índices compostos, inclusive para as chaves estrangeiras)
+DROP INDEX `respostas_aluno_id_idx` ON `respostas`;
+DROP INDEX `respostas_questionario_id_idx` ON `respostas`;
@@ -9,6 +9,11 @@ jest.mock('@prisma/client', () => {
   };
 });
 
+// ── Mock do Axios (notificação de cache para o ML Service) ──────────────────
+jest.mock('axios');
+import axios from 'axios';
+const mockedAxios = axios as jest.Mocked<typeof axios>;
+
 import app from '../server';
 import { prismaMock } from './helpers/prisma.mock';
 import { adminToken, profToken, alunoToken, authHeader } from './helpers/tokens';
@@ -130,6 +135,36 @@ describe('DELETE /admin/professores/:id', () => {
   });
 });
 
+describe('DELETE /admin/alunos/:id', () => {
+  it('deve deletar aluno e avisar o ML Service que respostas foram removidas', async () => {
+    prismaMock.user.findFirst.mockResolvedValue({ id: 'aluno-1', role: 'ALUNO' });
+    prismaMock.user.delete.mockResolvedValue({ id: 'aluno-1' });
+    mockedAxios.post.mockResolvedValue({ data: { invalidated: 1 } });
+
+    const res = await request(app)
+      .delete('/admin/alunos/aluno-1')
+      .set(adminAuth);
+
+    expect(res.status).toBe(204);
+    expect(mockedAxios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/cache/invalidate'),
+      { alunoId: 'aluno-1', removido: true },
+      expect.any(Object)
+    );
+  });
+
+  it('deve retornar 404 para aluno inexistente', async () => {
+    prismaMock.user.findFirst.mockResolvedValue(null);
+
+    const res = await request(app)
+      .delete('/admin/alunos/naoexiste')
+      .set(adminAuth);
+
+    expect(res.status).toBe(404);
+    expect(mockedAxios.post).not.toHaveBeenCalled();
+  });
+});
+
 describe('GET /admin/professores', () => {
   it('deve listar professores para ADMIN', async () => {
     prismaMock.user.findMany.mockResolvedValue([
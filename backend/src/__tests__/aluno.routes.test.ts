@@ -9,6 +9,11 @@ jest.mock('@prisma/client', () => {
   };
 });
 
+// ── Mock do Axios (notificação de cache para o ML Service) ──────────────────
+jest.mock('axios');
+import axios from 'axios';
+const mockedAxios = axios as jest.Mocked<typeof axios>;
+
 import app from '../server';
 import { prismaMock } from './helpers/prisma.mock';
 import { alunoToken, adminToken, authHeader } from './helpers/tokens';
@@ -179,6 +184,39 @@ describe('POST /aluno/respostas', () => {
     expect(res.body.total).toBe(1);
   });
 
+  it('deve avisar o ML Service para invalidar o cache de analytics', async () => {
+    prismaMock.questionario.findUnique.mockResolvedValue(questionarioAtivo);
+    prismaMock.alunoTurma.findFirst.mockResolvedValue({ alunoId: ALUNO_ID, turmaId: 'turma-1' });
+    prismaMock.resposta.findFirst.mockResolvedValue(null);
+    prismaMock.resposta.create.mockResolvedValue({ id: 'resp-1' });
+
+    await request(app)
+      .post('/aluno/respostas')
+      .set(alunoAuth)
+      .send(payload);
+
+    expect(mockedAxios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/cache/invalidate'),
+      { turmaId: 'turma-1', alunoId: ALUNO_ID, questionarioId: Q_ID },
+      expect.any(Object)
+    );
+  });
+
+  it('deve responder normalmente mesmo com o ML Service indisponível', async () => {
+    prismaMock.questionario.findUnique.mockResolvedValue(questionarioAtivo);
+    prismaMock.alunoTurma.findFirst.mockResolvedValue({ alunoId: ALUNO_ID, turmaId: 'turma-1' });
+    prismaMock.resposta.findFirst.mockResolvedValue(null);
+    prismaMock.resposta.create.mockResolvedValue({ id: 'resp-1' });
+    mockedAxios.post.mockRejectedValueOnce(new Error('ECONNREFUSED'));
+
+    const res = await request(app)
+      .post('/aluno/respostas')
+      .set(alunoAuth)
+      .send(payload);
+
+    expect(res.status).toBe(201);
+  });
+
   it('deve retornar 409 se questionário já foi respondido', async () => {
     prismaMock.questionario.findUnique.mockResolvedValue(questionarioAtivo);
     prismaMock.alunoTurma.findFirst.mockResolvedValue({ alunoId: ALUNO_ID, turmaId: 'turma-1' });
@@ -95,6 +95,99 @@ describe('GET /ml/analytics/turma/:id', () => {
   });
 });
 
+describe('Paginação (limit/offset e cursor)', () => {
+  it('deve repassar limit e offset da turma ao ML Service', async () => {
+    mockedAxios.get.mockResolvedValue({ status: 200, headers: {}, data: { turmaId: 'turma-1' } });
+
+    await request(app)
+      .get('/ml/analytics/turma/turma-1?limit=10&offset=20')
+      .set(profAuth);
+
+    expect(mockedAxios.get).toHaveBeenCalledWith(
+      expect.stringContaining('/analytics/turma/turma-1?limit=10&offset=20'),
+      expect.anything()
+    );
+  });
+
+  it('deve repassar limit e offset da predição de evasão', async () => {
+    mockedAxios.post.mockResolvedValue({ data: { turmaId: 'turma-1', predictions: [] } });
+
+    await request(app)
+      .post('/ml/predict/evasao')
+      .set(profAuth)
+      .send({ turmaId: 'turma-1', limit: 50, offset: 100 });
+
+    expect(mockedAxios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/predict/evasao'),
+      { turmaId: 'turma-1', limit: 50, offset: 100 }
+    );
+  });
+
+  it('deve repassar limit e cursor do histórico de respostas do aluno', async () => {
+    mockedAxios.get.mockResolvedValue({ status: 200, headers: {}, data: { alunoId: 'aluno-1', respostas: [] } });
+
+    await request(app)
+      .get('/ml/analytics/aluno/aluno-1/respostas?limit=20&cursor=abc&offset=5')
+      .set(profAuth);
+
+    expect(mockedAxios.get).toHaveBeenCalledWith(
+      expect.stringMatching(/\/analytics\/aluno\/aluno-1\/respostas\?limit=20&cursor=abc$/),
+      expect.anything()
+    );
+  });
+
+  it('deve repassar o cursor da predição de evasão', async () => {
+    mockedAxios.post.mockResolvedValue({ data: { turmaId: 'turma-1', predictions: [], proximoCursor: null } });
+
+    await request(app)
+      .post('/ml/predict/evasao')
+      .set(profAuth)
+      .send({ turmaId: 'turma-1', limit: 100, cursor: null });
+
+    expect(mockedAxios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/predict/evasao'),
+      expect.objectContaining({ turmaId: 'turma-1', limit: 100, cursor: null })
+    );
+  });
+});
+
+describe('GET condicional (ETag) nas rotas de analytics', () => {
+  it('deve repassar o ETag do ML Service', async () => {
+    mockedAxios.get.mockResolvedValue({
+      status: 200,
+      headers: { etag: 'W/"abc123"', 'cache-control': 'private, no-cache' },
+      data: { turmaId: 'turma-1' }
+    });
+
+    const res = await request(app)
+      .get('/ml/analytics/turma/turma-1')
+      .set(profAuth);
+
+    expect(res.status).toBe(200);
+    expect(res.headers.etag).toBe('W/"abc123"');
+    expect(res.headers['cache-control']).toBe('private, no-cache');
+  });
+
+  it('deve enviar If-None-Match ao ML Service e repassar 304', async () => {
+    mockedAxios.get.mockResolvedValue({
+      status: 304,
+      headers: { etag: 'W/"abc123"' },
+      data: ''
+    });
+
+    const res = await request(app)
+      .get('/ml/analytics/overview')
+      .set(adminAuth)
+      .set('If-None-Match', 'W/"abc123"');
+
+    expect(res.status).toBe(304);
+    expect(mockedAxios.get).toHaveBeenCalledWith(
+      expect.stringContaining('/analytics/overview'),
+      expect.objectContaining({ headers: { 'If-None-Match': 'W/"abc123"' } })
+    );
+  });
+});
+
 describe('GET /ml/analytics/aluno/:id', () => {
   it('deve retornar analytics do aluno', async () => {
     mockedAxios.get.mockResolvedValue({
@@ -139,6 +232,56 @@ describe('POST /ml/predict/evasao', () => {
   });
 });
 
+describe('POST /ml/predict/evasao/bulk', () => {
+  it('deve repassar a lista de turmas ao ML Service', async () => {
+    mockedAxios.post.mockResolvedValue({
+      data: { totalTurmas: 2, turmas: [{ turmaId: 'turma-1' }, { turmaId: 'turma-2' }] }
+    });
+
+    const res = await request(app)
+      .post('/ml/predict/evasao/bulk')
+      .set(adminAuth)
+      .send({ turmaIds: ['turma-1', 'turma-2'] });
+
+    expect(res.status).toBe(200);
+    expect(res.body.turmas).toHaveLength(2);
+    expect(mockedAxios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/predict/evasao/bulk'),
+      { turmaIds: ['turma-1', 'turma-2'] }
+    );
+  });
+
+  it('deve aceitar "all"', async () => {
+    mockedAxios.post.mockResolvedValue({ data: { totalTurmas: 0, turmas: [] } });
+
+    const res = await request(app)
+      .post('/ml/predict/evasao/bulk')
+      .set(adminAuth)
+      .send({ turmaIds: 'all' });
+
+    expect(res.status).toBe(200);
+  });
+
+  it('deve retornar 400 sem turmaIds', async () => {
+    const res = await request(app)
+      .post('/ml/predict/evasao/bulk')
+      .set(adminAuth)
+      .send({ turmaIds: [] });
+
+    expect(res.status).toBe(400);
+    expect(res.body.error).toMatch(/turmaIds/i);
+  });
+
+  it('deve retornar 403 para PROF', async () => {
+    const res = await request(app)
+      .post('/ml/predict/evasao/bulk')
+      .set(profAuth)
+      .send({ turmaIds: 'all' });
+
+    expect(res.status).toBe(403);
+  });
+});
+
 describe('POST /ml/predict/desempenho', () => {
   it('deve retornar predição de desempenho', async () => {
     mockedAxios.post.mockResolvedValue({
@@ -165,6 +308,35 @@ describe('POST /ml/predict/desempenho', () => {
   });
 });
 
+describe('POST /ml/predict/desempenho/turma', () => {
+  it('deve retornar a tendência dos alunos da turma', async () => {
+    mockedAxios.post.mockResolvedValue({
+      data: { turmaId: 'turma-1', totalAlunos: 1, alunos: [{ alunoId: 'aluno-1', tendencia: 'melhorando' }] }
+    });
+
+    const res = await request(app)
+      .post('/ml/predict/desempenho/turma')
+      .set(profAuth)
+      .send({ turmaId: 'turma-1' });
+
+    expect(res.status).toBe(200);
+    expect(mockedAxios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/predict/desempenho/turma'),
+      { turmaId: 'turma-1' }
+    );
+  });
+
+  it('deve retornar 400 sem turmaId', async () => {
+    const res = await request(app)
+      .post('/ml/predict/desempenho/turma')
+      .set(profAuth)
+      .send({});
+
+    expect(res.status).toBe(400);
+    expect(res.body.error).toMatch(/turmaId/i);
+  });
+});
+
 // ══════════════════════════════════════════════════════════════════════════════
 // PADRÕES
 // ══════════════════════════════════════════════════════════════════════════════
@@ -205,6 +377,44 @@ describe('GET /ml/patterns/responses', () => {
 // ══════════════════════════════════════════════════════════════════════════════
 // MODELOS
 // ══════════════════════════════════════════════════════════════════════════════
+describe('POST /ml/train', () => {
+  it('deve repassar o job criado com status 202', async () => {
+    mockedAxios.post.mockResolvedValue({
+      status: 202,
+      data: { jobId: 'job-1', status: 'pendente', reaproveitado: false }
+    });
+
+    const res = await request(app).post('/ml/train').set(profAuth);
+
+    expect(res.status).toBe(202);
+    expect(res.body.jobId).toBe('job-1');
+  });
+});
+
+describe('GET /ml/train/jobs/:jobId', () => {
+  it('deve retornar o status do job', async () => {
+    mockedAxios.get.mockResolvedValue({
+      data: { jobId: 'job-1', status: 'executando', progresso: 30 }
+    });
+
+    const res = await request(app).get('/ml/train/jobs/job-1').set(adminAuth);
+
+    expect(res.status).toBe(200);
+    expect(res.body.progresso).toBe(30);
+    expect(mockedAxios.get).toHaveBeenCalledWith(expect.stringContaining('/train/jobs/job-1'));
+  });
+
+  it('deve repassar 404 de job desconhecido', async () => {
+    mockedAxios.get.mockRejectedValue({
+      response: { status: 404, data: { error: 'Job não encontrado' } }
+    });
+
+    const res = await request(app).get('/ml/train/jobs/nao-existe').set(adminAuth);
+
+    expect(res.status).toBe(404);
+  });
+});
+
 describe('GET /ml/models/status', () => {
   it('deve retornar status dos modelos', async () => {
     mockedAxios.get.mockResolvedValue({
@@ -9,6 +9,11 @@ jest.mock('@prisma/client', () => {
   };
 });
 
+// ── Mock do Axios (notificação de cache para o ML Service) ──────────────────
+jest.mock('axios');
+import axios from 'axios';
+const mockedAxios = axios as jest.Mocked<typeof axios>;
+
 import app from '../server';
 import { prismaMock } from './helpers/prisma.mock';
 import { profToken, adminToken, alunoToken, authHeader } from './helpers/tokens';
@@ -233,6 +238,22 @@ describe('DELETE /prof/questionarios/:id', () => {
     expect(res.status).toBe(204);
   });
 
+  it('deve avisar o ML Service que respostas foram removidas', async () => {
+    prismaMock.questionario.findUnique.mockResolvedValue({ id: 'q-1', criadoPor: PROF_ID });
+    prismaMock.questionario.delete.mockResolvedValue({ id: 'q-1' });
+    mockedAxios.post.mockResolvedValue({ data: { invalidated: 1 } });
+
+    await request(app)
+      .delete('/prof/questionarios/q-1')
+      .set(profAuth);
+
+    expect(mockedAxios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/cache/invalidate'),
+      { questionarioId: 'q-1', removido: true },
+      expect.any(Object)
+    );
+  });
+
   it('deve retornar 404 para questionário inexistente', async () => {
     prismaMock.questionario.findUnique.mockResolvedValue(null);
 
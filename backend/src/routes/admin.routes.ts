@@ -3,6 +3,7 @@ import bcrypt from 'bcrypt';
 import { z } from 'zod';
 import { PrismaClient, Role } from '@prisma/client';
 import { authenticate, authorize, AuthRequest } from '../middlewares/auth.middleware';
+import { invalidarCacheMl } from '../services/ml-cache.service';
 import { parse } from 'fast-csv';
 import { Readable } from 'stream';
 
@@ -341,6 +342,8 @@ router.delete('/alunos/:id', async (req: AuthRequest, res, next) => {
       where: { id }
     });
 
+    void invalidarCacheMl({ alunoId: id, removido: true });
+
     res.status(204).send();
   } catch (error) {
     next(error);
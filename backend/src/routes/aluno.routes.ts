@@ -2,6 +2,7 @@ import { Router } from 'express';
 import { z } from 'zod';
 import { PrismaClient, Role } from '@prisma/client';
 import { authenticate, authorize, AuthRequest } from '../middlewares/auth.middleware';
+import { invalidarCacheMl } from '../services/ml-cache.service';
 
 const router = Router();
 const prisma = new PrismaClient();
@@ -290,6 +291,12 @@ router.post('/respostas', async (req: AuthRequest, res, next) => {
       )
     );
 
+    void invalidarCacheMl({
+      turmaId: turmaIdEfetivo,
+      alunoId: req.user!.id,
+      questionarioId: data.questionarioId
+    });
+
     res.status(201).json({
       message: 'Respostas enviadas com sucesso',
       total: respostasSalvas.length
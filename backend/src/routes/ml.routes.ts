@@ -2,7 +2,7 @@
  * Rotas de Machine Learning e Analytics
  * Proxy para o serviço Python de ML
  */
-import { Router } from 'express';
+import { Router, Response } from 'express';
 import axios from 'axios';
 import { authenticate, authorize, AuthRequest } from '../middlewares/auth.middleware';
 import { Role } from '@prisma/client';
@@ -15,13 +15,51 @@ const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:5000';
 // Aplicar autenticação
 router.use(authenticate);
 
+/**
+ * GET condicional repassado ao ML Service: envia o If-None-Match do cliente
+ * e devolve ETag/Cache-Control; quando os dados não mudaram, o ML responde
+ * 304 sem recalcular e o 304 segue para o cliente.
+ */
+async function proxyGetCondicional(req: AuthRequest, res: Response, url: string) {
+  const ifNoneMatch = req.get('If-None-Match');
+  const response = await axios.get(url, {
+    headers: ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+  });
+
+  const etag = response.headers?.etag;
+  if (etag) {
+    res.set('ETag', String(etag));
+    res.set('Cache-Control', String(response.headers['cache-control'] || 'private, no-cache'));
+  }
+  if (response.status === 304) {
+    return res.status(304).end();
+  }
+  res.json(response.data);
+}
+
+/**
+ * Parâmetros de paginação (limit/offset ou limit/cursor) da query string do
+ * cliente, repassados ao ML Service (que valida)
+ */
+function queryPaginacao(req: AuthRequest, nomes: string[] = ['limit', 'offset']): string {
+  const params = new URLSearchParams();
+  for (const nome of nomes) {
+    const valor = req.query[nome];
+    if (typeof valor === 'string') {
+      params.set(nome, valor);
+    }
+  }
+  const query = params.toString();
+  return query ? `?${query}` : '';
+}
+
 // ========== ANALYTICS ==========
 
 // GET /ml/analytics/overview
 router.get('/analytics/overview', authorize(Role.ADMIN, Role.PROF), async (req: AuthRequest, res, next) => {
   try {
-    const response = await axios.get(`${ML_SERVICE_URL}/analytics/overview`);
-    res.json(response.data);
+    await proxyGetCondicional(req, res, `${ML_SERVICE_URL}/analytics/overview`);
   } catch (error: any) {
     if (error.response) {
       res.status(error.response.status).json(error.response.data);
@@ -42,8 +80,7 @@ router.get('/analytics/turma/:id', authorize(Role.ADMIN, Role.PROF), async (req:
       // Por enquanto, permitimos
     }
     
-    const response = await axios.get(`${ML_SERVICE_URL}/analytics/turma/${id}`);
-    res.json(response.data);
+    await proxyGetCondicional(req, res, `${ML_SERVICE_URL}/analytics/turma/${id}${queryPaginacao(req)}`);
   } catch (error: any) {
     if (error.response) {
       res.status(error.response.status).json(error.response.data);
@@ -58,8 +95,26 @@ router.get('/analytics/aluno/:id', authorize(Role.ADMIN, Role.PROF), async (req:
   try {
     const { id } = req.params;
     
-    const response = await axios.get(`${ML_SERVICE_URL}/analytics/aluno/${id}`);
-    res.json(response.data);
+    await proxyGetCondicional(req, res, `${ML_SERVICE_URL}/analytics/aluno/${id}`);
+  } catch (error: any) {
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      next(error);
+    }
+  }
+});
+
+// GET /ml/analytics/aluno/:id/respostas - Histórico paginado por cursor
+router.get('/analytics/aluno/:id/respostas', authorize(Role.ADMIN, Role.PROF), async (req: AuthRequest, res, next) => {
+  try {
+    const { id } = req.params;
+    
+    await proxyGetCondicional(
+      req,
+      res,
+      `${ML_SERVICE_URL}/analytics/aluno/${id}/respostas${queryPaginacao(req, ['limit', 'cursor'])}`
+    );
   } catch (error: any) {
     if (error.response) {
       res.status(error.response.status).json(error.response.data);
@@ -74,14 +129,44 @@ router.get('/analytics/aluno/:id', authorize(Role.ADMIN, Role.PROF), async (req:
 // POST /ml/predict/evasao
 router.post('/predict/evasao', authorize(Role.ADMIN, Role.PROF), async (req: AuthRequest, res, next) => {
   try {
-    const { turmaId } = req.body;
+    const { turmaId, limit, offset, cursor } = req.body;
     
     if (!turmaId) {
       return res.status(400).json({ error: 'turmaId é obrigatório' });
     }
     
+    // cursor: null pede a primeira página por cursor; ausente, limit/offset
     const response = await axios.post(`${ML_SERVICE_URL}/predict/evasao`, {
-      turmaId
+      turmaId,
+      limit,
+      offset,
+      cursor
+    });
+    res.json(response.data);
+  } catch (error: any) {
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      next(error);
+    }
+  }
+});
+
+// POST /ml/predict/evasao/bulk - Risco de evasão de várias turmas em uma chamada
+router.post('/predict/evasao/bulk', authorize(Role.ADMIN), async (req: AuthRequest, res, next) => {
+  try {
+    const { turmaIds, limit, offset } = req.body;
+    
+    const valido = turmaIds === 'all'
+      || (Array.isArray(turmaIds) && turmaIds.length > 0 && turmaIds.every((id: unknown) => typeof id === 'string' && id));
+    if (!valido) {
+      return res.status(400).json({ error: 'turmaIds deve ser uma lista de ids ou "all"' });
+    }
+    
+    const response = await axios.post(`${ML_SERVICE_URL}/predict/evasao/bulk`, {
+      turmaIds,
+      limit,
+      offset
     });
     res.json(response.data);
   } catch (error: any) {
@@ -115,6 +200,28 @@ router.post('/predict/desempenho', authorize(Role.ADMIN, Role.PROF), async (req:
   }
 });
 
+// POST /ml/predict/desempenho/turma - Tendência de todos os alunos da turma
+router.post('/predict/desempenho/turma', authorize(Role.ADMIN, Role.PROF), async (req: AuthRequest, res, next) => {
+  try {
+    const { turmaId } = req.body;
+    
+    if (!turmaId) {
+      return res.status(400).json({ error: 'turmaId é obrigatório' });
+    }
+    
+    const response = await axios.post(`${ML_SERVICE_URL}/predict/desempenho/turma`, {
+      turmaId
+    });
+    res.json(response.data);
+  } catch (error: any) {
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      next(error);
+    }
+  }
+});
+
 // ========== PADRÕES ==========
 
 // GET /ml/patterns/engagement
@@ -126,8 +233,7 @@ router.get('/patterns/engagement', authorize(Role.ADMIN, Role.PROF), async (req:
       ? `${ML_SERVICE_URL}/patterns/engagement?turmaId=${turmaId}`
       : `${ML_SERVICE_URL}/patterns/engagement`;
     
-    const response = await axios.get(url);
-    res.json(response.data);
+    await proxyGetCondicional(req, res, url);
   } catch (error: any) {
     if (error.response) {
       res.status(error.response.status).json(error.response.data);
@@ -146,8 +252,7 @@ router.get('/patterns/responses', authorize(Role.ADMIN, Role.PROF), async (req:
       return res.status(400).json({ error: 'questionarioId é obrigatório' });
     }
     
-    const response = await axios.get(`${ML_SERVICE_URL}/patterns/responses?questionarioId=${questionarioId}`);
-    res.json(response.data);
+    await proxyGetCondicional(req, res, `${ML_SERVICE_URL}/patterns/responses?questionarioId=${questionarioId}`);
   } catch (error: any) {
     if (error.response) {
       res.status(error.response.status).json(error.response.data);
@@ -159,10 +264,24 @@ router.get('/patterns/responses', authorize(Role.ADMIN, Role.PROF), async (req:
 
 // ========== MODELOS ==========
 
-// POST /ml/train - Treinar modelos (admin e professor)
+// POST /ml/train - Iniciar treinamento em segundo plano (admin e professor)
 router.post('/train', authorize(Role.ADMIN, Role.PROF), async (req: AuthRequest, res, next) => {
   try {
     const response = await axios.post(`${ML_SERVICE_URL}/train/models`);
+    res.status(response.status || 202).json(response.data);
+  } catch (error: any) {
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      next(error);
+    }
+  }
+});
+
+// GET /ml/train/jobs/:jobId - Status de um job de treinamento
+router.get('/train/jobs/:jobId', authorize(Role.ADMIN, Role.PROF), async (req: AuthRequest, res, next) => {
+  try {
+    const response = await axios.get(`${ML_SERVICE_URL}/train/jobs/${encodeURIComponent(req.params.jobId)}`);
     res.json(response.data);
   } catch (error: any) {
     if (error.response) {
@@ -3,6 +3,7 @@ import { z } from 'zod';
 import { PrismaClient, Role, Visibilidade, TipoPergunta } from '@prisma/client';
 import { PrismaClientKnownRequestError } from '@prisma/client/runtime/library';
 import { authenticate, authorize, AuthRequest } from '../middlewares/auth.middleware';
+import { invalidarCacheMl } from '../services/ml-cache.service';
 import ExcelJS from 'exceljs';
 import { ExcelExportService } from '../services/excel-export.service';
 import QRCode from 'qrcode';
@@ -293,6 +294,9 @@ router.delete('/questionarios/:id', async (req: AuthRequest, res, next) => {
       where: { id: req.params.id }
     });
 
+    // A exclusão remove as respostas em cascata
+    void invalidarCacheMl({ questionarioId: req.params.id, removido: true });
+
     res.status(204).send();
   } catch (error) {
     next(error);
@@ -407,6 +411,8 @@ router.delete('/perguntas/:id', async (req: AuthRequest, res, next) => {
       where: { id: req.params.id }
     });
 
+    void invalidarCacheMl({ questionarioId: pergunta.questionarioId, removido: true });
+
     res.status(204).send();
   } catch (error) {
     next(error);
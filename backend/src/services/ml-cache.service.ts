@@ -0,0 +1,27 @@
+/**
+ * Avisos ao serviço ML sobre mudanças em respostas
+ * Invalidam o cache de analytics e mantêm o rollup de agregados por aluno
+ */
+import axios from 'axios';
+
+// URL do serviço ML (pode ser configurada via env)
+const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:5000';
+
+interface InvalidacaoMl {
+  turmaId?: string | null;
+  alunoId?: string;
+  questionarioId?: string;
+  // Respostas removidas (exclusão de questionário, pergunta ou aluno):
+  // o serviço ML reconstrói o rollup em vez de só somar respostas novas
+  removido?: boolean;
+}
+
+// Falhas são ignoradas: nesse caso o cache expira pelo TTL e o rollup é
+// corrigido pela verificação periódica do serviço ML.
+export async function invalidarCacheMl(payload: InvalidacaoMl) {
+  try {
+    await axios.post(`${ML_SERVICE_URL}/cache/invalidate`, payload, { timeout: 2000 });
+  } catch {
+    // Serviço ML indisponível
+  }
+}
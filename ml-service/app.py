@@ -2,28 +2,376 @@
 Serviço de Machine Learning para Análise Preditiva
 Sistema de análise de desempenho e predição de risco de evasão
 """
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, make_response, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from datetime import date, datetime
+from decimal import Decimal
+import functools
+import hmac
 import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from dotenv import load_dotenv
 
-# Importar serviços
-from services.database import DatabaseService
-from services.ml_predictor import MLPredictor
-from services.analytics import AnalyticsService
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, json da biblioteca padrão
+    orjson = None
+
+# Serviços leves; DatabaseService, MLPredictor e AnalyticsService (pandas,
+# scikit-learn, joblib) são importados apenas quando usados pela primeira vez
+from services import compression, metrics, pagination, profiling
+from services.cache import ResultCache
+from services.etag import DataVersionTracker, etag_dados
+from services.training import TrainingJobManager
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
+
+_NAO_CRIADO = object()
+
+
+class Services:
+    """
+    Serviços usados pelas rotas (um conjunto por processo/worker).
+    
+    Cada serviço é criado no primeiro acesso: importar o app e responder
+    ``/health`` não carrega pandas, scikit-learn nem os modelos. Serviços
+    passados ao construtor (ex.: mocks nos testes) são usados como estão.
+    """
+
+    def __init__(self, db_service=_NAO_CRIADO, ml_predictor=_NAO_CRIADO,
+                 analytics_service=_NAO_CRIADO, result_cache=_NAO_CRIADO,
+                 training_jobs=_NAO_CRIADO, profile_store=_NAO_CRIADO):
+        informados = {
+            'db_service': db_service,
+            'ml_predictor': ml_predictor,
+            'analytics_service': analytics_service,
+            'result_cache': result_cache,
+            'training_jobs': training_jobs,
+            'profile_store': profile_store,
+        }
+        self._instancias = {nome: valor for nome, valor in informados.items() if valor is not _NAO_CRIADO}
+        self._lock = threading.RLock()
+
+    def _obter(self, nome: str, criar):
+        instancia = self._instancias.get(nome, _NAO_CRIADO)
+        if instancia is not _NAO_CRIADO:
+            return instancia
+        with self._lock:
+            if nome not in self._instancias:
+                self._instancias[nome] = criar()
+            return self._instancias[nome]
+
+    @property
+    def db_service(self):
+        def criar():
+            from services.database import DatabaseService
+            return DatabaseService()
+        return self._obter('db_service', criar)
+
+    @property
+    def ml_predictor(self):
+        def criar():
+            from services.ml_predictor import MLPredictor
+            return MLPredictor(self.db_service)
+        return self._obter('ml_predictor', criar)
+
+    @property
+    def analytics_service(self):
+        def criar():
+            from services.analytics import AnalyticsService
+            return AnalyticsService(self.db_service, cache=self.result_cache)
+        return self._obter('analytics_service', criar)
+
+    @property
+    def result_cache(self):
+        def criar():
+            cache_enabled = os.getenv('ML_CACHE_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+            return ResultCache() if cache_enabled else None
+        return self._obter('result_cache', criar)
+
+    @property
+    def training_jobs(self):
+        def criar():
+            # Treinamento roda em outro processo; ao concluir, recarrega os modelos
+            # salvos. O status fica em disco para ser consultado por qualquer worker
+            model_path = os.getenv('MODEL_PATH', './models')
+            return TrainingJobManager(
+                on_complete=lambda job: self.ml_predictor.load_models(),
+                state_dir=os.getenv('ML_TRAINING_STATE_DIR', os.path.join(model_path, 'jobs'))
+            )
+        return self._obter('training_jobs', criar)
+
+    @property
+    def data_versions(self):
+        return self._obter('data_versions', lambda: DataVersionTracker(self.result_cache))
+
+    @property
+    def profile_store(self):
+        return self._obter('profile_store', profiling.ProfileStore)
+
+    def warm_up(self):
+        """Criar os serviços de predição e analytics agora (preload no mestre do gunicorn)"""
+        self.ml_predictor
+        self.analytics_service
+
+
+def create_app(services: Services = None) -> Flask:
+    """
+    Criar a aplicação Flask.
+    
+    Os serviços são criados sob demanda. Com ``gunicorn --preload`` (ver
+    ``gunicorn.conf.py``) o mestre chama ``Services.warm_up`` antes do fork:
+    os modelos carregados pelo ``MLPredictor`` ficam compartilhados entre
+    os workers.
+    """
+    app = Flask(__name__)
+    app.json = _JSONProvider(app)
+    # Profiling sob demanda (header X-Profile ou ?profile=1); desligado por padrão
+    app.config['ML_PROFILING_ENABLED'] = os.getenv('ML_PROFILING_ENABLED', '0').lower() in ('1', 'true', 'yes', 'on')
+    app.config['ML_PROFILING_TOKEN'] = os.getenv('ML_PROFILING_TOKEN', '')
+    # ETag e 304 nas rotas de analytics e padrões
+    app.config['ML_ETAG_ENABLED'] = os.getenv('ML_ETAG_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+    # Compressão gzip/brotli das respostas a partir de ML_COMPRESSION_MIN_SIZE bytes
+    app.config['ML_COMPRESSION_ENABLED'] = os.getenv('ML_COMPRESSION_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+    app.config['ML_COMPRESSION_MIN_SIZE'] = int(os.getenv('ML_COMPRESSION_MIN_SIZE', '1024'))
+    app.config['ML_COMPRESSION_GZIP_LEVEL'] = int(os.getenv('ML_COMPRESSION_GZIP_LEVEL', '6'))
+    app.config['ML_COMPRESSION_BROTLI_QUALITY'] = int(os.getenv('ML_COMPRESSION_BROTLI_QUALITY', '4'))
+    # Tamanho máximo de página (limit) das listas paginadas
+    app.config['ML_MAX_PAGE_SIZE'] = int(os.getenv('ML_MAX_PAGE_SIZE', '500'))
+    CORS(app, expose_headers=['ETag', 'Server-Timing', 'X-Profile-Id'])
+    app.extensions['ml_services'] = services or Services()
+    app.register_blueprint(api)
+    app.before_request(_iniciar_medicao)
+    app.before_request(_iniciar_profiling)
+    # after_request roda na ordem inversa: o profiling fecha por último
+    app.after_request(_finalizar_profiling)
+    app.after_request(_registrar_medicao)
+    app.after_request(_comprimir)
+    app.teardown_request(_encerrar_profiling)
+    return app
+
+
+def _json_default(obj):
+    """Tipos que o DictCursor devolve e o JSON não conhece"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):  # escalares e arrays do numpy
+        return obj.tolist()
+    return DefaultJSONProvider.default(obj)
+
+
+class _JSONProvider(DefaultJSONProvider):
+    """
+    JSON das respostas, com a serialização cronometrada no profiling.
+
+    Com orjson instalado a serialização é feita por ele (datas em ISO 8601,
+    arrays do numpy e chaves não-string nativamente); sem ele, json da
+    biblioteca padrão. Nos dois casos ``Decimal`` vira número e datas saem
+    em ISO 8601, não no formato HTTP do Flask.
+    """
+
+    default = staticmethod(_json_default)
+
+    def _opcoes_orjson(self) -> int:
+        opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_json_default, option=self._opcoes_orjson()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        with profiling.etapa('serializacao', 'json'):
+            if orjson is None:
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            # bytes direto para a resposta, sem passar por str
+            corpo = orjson.dumps(obj, default=_json_default, option=self._opcoes_orjson())
+            return self._app.response_class(corpo, mimetype=self.mimetype)
+
+
+def _rota() -> str:
+    # Template da rota (/analytics/turma/<turma_id>), não a URL: cardinalidade fixa
+    return request.url_rule.rule if request.url_rule else 'nao_encontrada'
+
+
+def _iniciar_medicao():
+    g.inicio_requisicao = time.perf_counter()
+
+
+def _registrar_medicao(response):
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is not None:
+        metrics.registrar_requisicao(request.method, _rota(), response.status_code, time.perf_counter() - inicio)
+    return response
+
+
+def _profiling_autorizado() -> bool:
+    if not current_app.config['ML_PROFILING_ENABLED']:
+        return False
+    token = current_app.config['ML_PROFILING_TOKEN']
+    return not token or hmac.compare_digest(request.headers.get('X-Profile-Token', ''), token)
+
+
+def _iniciar_profiling():
+    modo = (request.headers.get('X-Profile') or request.args.get('profile') or '').lower()
+    if modo not in ('1', 'true', 'cprofile') or not _profiling_autorizado():
+        return
+    perfil = profiling.RequestProfile(request.method, request.full_path, cprofile=modo == 'cprofile')
+    g.perfil = perfil
+    profiling.ativar(perfil)
+    perfil.iniciar()
+
+
+def _finalizar_profiling(response):
+    perfil = g.pop('perfil', None)
+    if perfil is None:
+        return response
+    profiling.desativar()
+    relatorio = perfil.finalizar(_rota(), response.status_code)
+    try:
+        _services().profile_store.save(relatorio)
+    except OSError as e:
+        print(f"Erro ao salvar profile {relatorio['id']}: {e}")
+    response.headers['Server-Timing'] = profiling.server_timing(relatorio)
+    response.headers['X-Profile-Id'] = relatorio['id']
+    return response
+
+
+def _encerrar_profiling(exc=None):
+    # Requisição que terminou em exceção não passa pelo after_request
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        perfil.finalizar(_rota(), 500)
+    profiling.desativar()
+
+
+def _comprimir(response):
+    """Comprimir o corpo (br ou gzip, conforme Accept-Encoding) acima do tamanho mínimo"""
+    config = current_app.config
+    if (not config['ML_COMPRESSION_ENABLED']
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not compression.comprimivel(response.mimetype)):
+        return response
+    # O corpo pode variar com o Accept-Encoding mesmo quando sai sem compressão
+    response.vary.add('Accept-Encoding')
+    codificacao = compression.escolher_codificacao(request.accept_encodings, compression.codificacoes_disponiveis())
+    if codificacao is None:
+        return response
+    dados = response.get_data()
+    if len(dados) < config['ML_COMPRESSION_MIN_SIZE']:
+        return response
+
+    with profiling.etapa('compressao', codificacao) as extra:
+        comprimido = compression.comprimir(
+            dados, codificacao,
+            nivel_gzip=config['ML_COMPRESSION_GZIP_LEVEL'],
+            qualidade_brotli=config['ML_COMPRESSION_BROTLI_QUALITY'],
+        )
+        extra['bytes'] = len(dados)
+        extra['comprimido'] = len(comprimido)
+    response.set_data(comprimido)
+    response.headers['Content-Encoding'] = codificacao
+    # O ETag (fraco) continua valendo: o conteúdo é o mesmo em qualquer codificação
+    return response
+
 
-# Inicializar serviços
-db_service = DatabaseService()
-ml_predictor = MLPredictor(db_service)
-analytics_service = AnalyticsService(db_service)
+def _services() -> Services:
+    return current_app.extensions['ml_services']
+
+
+def _paginacao(origem) -> Dict[str, int]:
+    """
+    ``limit``/``offset`` informados pelo cliente (query string ou corpo JSON).
+    Retorna só os presentes; ValueError se algum não for inteiro válido
+    (1 <= limit <= ML_MAX_PAGE_SIZE, offset >= 0).
+    """
+    maximo = current_app.config['ML_MAX_PAGE_SIZE']
+    paginacao = {}
+    for nome, minimo, limite in (('limit', 1, maximo), ('offset', 0, None)):
+        valor = origem.get(nome)
+        if valor is None:
+            continue
+        if isinstance(valor, str) and valor.isdigit():
+            valor = int(valor)
+        if (isinstance(valor, bool) or not isinstance(valor, int) or valor < minimo
+                or (limite is not None and valor > limite)):
+            raise ValueError(f'limit deve ser um inteiro entre 1 e {maximo} e offset um inteiro >= 0')
+        paginacao[nome] = valor
+    return paginacao
+
+
+def _keyset(origem, limit_padrao: int) -> Tuple[int, Optional[tuple]]:
+    """
+    ``limit`` e posição do ``cursor`` (None na primeira página) de uma lista
+    paginada por keyset; ValueError se inválidos
+    """
+    paginacao = _paginacao(origem)
+    if 'offset' in paginacao:
+        raise ValueError('offset não se aplica à paginação por cursor')
+    cursor = origem.get('cursor')
+    if cursor is not None and not isinstance(cursor, str):
+        raise ValueError('cursor inválido')
+    apos = pagination.decodificar_cursor(cursor) if cursor else None
+    return paginacao.get('limit', limit_padrao), apos
+
+
+def _condicional(escopo):
+    """
+    GET condicional: ETag fraco derivado da versão dos dados do escopo
+    (``escopo(**view_args) -> (nome, id)``). Se o ``If-None-Match`` do
+    cliente ainda vale, responde 304 sem consultar o AnalyticsService.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if not current_app.config['ML_ETAG_ENABLED']:
+                return view(**kwargs)
+            services = _services()
+            nome, escopo_id = escopo(**kwargs)
+            try:
+                versao = services.db_service.get_data_version(nome, escopo_id)
+            except Exception as e:
+                print(f"Erro ao obter versão dos dados ({nome}): {e}")
+                return view(**kwargs)
+            services.data_versions.observar(nome, escopo_id, versao)
+            etag = etag_dados(request.full_path, versao)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                corpo = response.get_json(silent=True)
+                # Erros não recebem validador: o próximo pedido recalcula
+                if response.status_code != 200 or (isinstance(corpo, dict) and 'error' in corpo):
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
 
 # ========== HEALTH CHECK ==========
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health_check():
     """Verificar saúde do serviço"""
     return jsonify({
@@ -33,35 +381,58 @@ def health_check():
     })
 
 # ========== ANALYTICS ==========
-@app.route('/analytics/overview', methods=['GET'])
+@api.route('/analytics/overview', methods=['GET'])
+@_condicional(lambda: ('global', None))
 def get_overview():
     """Obter visão geral das métricas"""
     try:
-        overview = analytics_service.get_overview()
+        overview = _services().analytics_service.get_overview()
         return jsonify(overview)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/analytics/turma/<turma_id>', methods=['GET'])
+@api.route('/analytics/turma/<turma_id>', methods=['GET'])
+@_condicional(lambda turma_id: ('turma', turma_id))
 def get_turma_analytics(turma_id):
     """Obter análise de uma turma específica"""
     try:
-        analytics = analytics_service.get_turma_analytics(turma_id)
+        try:
+            paginacao = _paginacao(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        analytics = _services().analytics_service.get_turma_analytics(turma_id, **paginacao)
         return jsonify(analytics)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/analytics/aluno/<aluno_id>', methods=['GET'])
+@api.route('/analytics/aluno/<aluno_id>', methods=['GET'])
+@_condicional(lambda aluno_id: ('aluno', aluno_id))
 def get_aluno_analytics(aluno_id):
     """Obter análise de um aluno específico"""
     try:
-        analytics = analytics_service.get_aluno_analytics(aluno_id)
+        analytics = _services().analytics_service.get_aluno_analytics(aluno_id)
         return jsonify(analytics)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/analytics/aluno/<aluno_id>/respostas', methods=['GET'])
+@_condicional(lambda aluno_id: ('aluno', aluno_id))
+def get_aluno_respostas(aluno_id):
+    """Histórico de respostas de um aluno paginado por cursor (?limit=&cursor=)"""
+    try:
+        try:
+            limit, apos = _keyset(request.args, limit_padrao=20)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        respostas = _services().analytics_service.get_aluno_respostas(aluno_id, limit, apos)
+        return jsonify(respostas)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ========== PREDIÇÕES ==========
-@app.route('/predict/evasao', methods=['POST'])
+@api.route('/predict/evasao', methods=['POST'])
 def predict_evasao():
     """Predizer risco de evasão"""
     try:
@@ -70,13 +441,44 @@ def predict_evasao():
         
         if not turma_id:
             return jsonify({'error': 'turmaId é obrigatório'}), 400
+        try:
+            # Com "cursor" (null na primeira página): lista paginada por cadastro
+            if 'cursor' in data:
+                limit, apos = _keyset(data, limit_padrao=50)
+                return jsonify(_services().ml_predictor.predict_evasao_pagina(turma_id, limit, apos))
+            paginacao = _paginacao(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        predictions = ml_predictor.predict_evasao_turma(turma_id)
+        predictions = _services().ml_predictor.predict_evasao_turma(turma_id, **paginacao)
         return jsonify(predictions)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/predict/desempenho', methods=['POST'])
+@api.route('/predict/evasao/bulk', methods=['POST'])
+def predict_evasao_bulk():
+    """Predizer risco de evasão de várias turmas (lista de ids ou "all")"""
+    try:
+        data = request.get_json(silent=True) or {}
+        turma_ids = data.get('turmaIds')
+        
+        if turma_ids == 'all':
+            turma_ids = None
+        elif isinstance(turma_ids, list) and turma_ids and all(isinstance(t, str) and t for t in turma_ids):
+            turma_ids = list(dict.fromkeys(turma_ids))
+        else:
+            return jsonify({'error': 'turmaIds deve ser uma lista de ids ou "all"'}), 400
+        try:
+            paginacao = _paginacao(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        predictions = _services().ml_predictor.predict_evasao_bulk(turma_ids, **paginacao)
+        return jsonify(predictions)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/predict/desempenho', methods=['POST'])
 def predict_desempenho():
     """Predizer tendência de desempenho"""
     try:
@@ -86,55 +488,153 @@ def predict_desempenho():
         if not aluno_id:
             return jsonify({'error': 'alunoId é obrigatório'}), 400
         
-        prediction = ml_predictor.predict_desempenho_aluno(aluno_id)
+        prediction = _services().ml_predictor.predict_desempenho_aluno(aluno_id)
+        return jsonify(prediction)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/predict/desempenho/turma', methods=['POST'])
+def predict_desempenho_turma():
+    """Tendência de desempenho de todos os alunos de uma turma"""
+    try:
+        data = request.get_json()
+        turma_id = data.get('turmaId')
+        
+        if not turma_id:
+            return jsonify({'error': 'turmaId é obrigatório'}), 400
+        
+        prediction = _services().ml_predictor.predict_desempenho_turma(turma_id)
         return jsonify(prediction)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ========== PADRÕES ==========
-@app.route('/patterns/engagement', methods=['GET'])
+@api.route('/patterns/engagement', methods=['GET'])
+@_condicional(lambda: ('turma', request.args['turmaId']) if request.args.get('turmaId') else ('global', None))
 def get_engagement_patterns():
     """Identificar padrões de engajamento"""
     try:
         turma_id = request.args.get('turmaId')
-        patterns = analytics_service.get_engagement_patterns(turma_id)
+        patterns = _services().analytics_service.get_engagement_patterns(turma_id)
         return jsonify(patterns)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/patterns/responses', methods=['GET'])
+@api.route('/patterns/responses', methods=['GET'])
+@_condicional(lambda: ('questionario', request.args.get('questionarioId')))
 def get_response_patterns():
     """Identificar padrões de resposta"""
     try:
         questionario_id = request.args.get('questionarioId')
-        patterns = analytics_service.get_response_patterns(questionario_id)
+        patterns = _services().analytics_service.get_response_patterns(questionario_id)
         return jsonify(patterns)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ========== TREINAMENTO ==========
-@app.route('/train/models', methods=['POST'])
+@api.route('/train/models', methods=['POST'])
 def train_models():
-    """Treinar/retreinar modelos de ML"""
+    """Iniciar treinamento dos modelos em segundo plano (retorna o job)"""
     try:
-        result = ml_predictor.train_models()
-        return jsonify(result)
+        job, criado = _services().training_jobs.submit()
+        # Um treinamento já em andamento é reaproveitado em vez de duplicado
+        return jsonify({**job, 'reaproveitado': not criado}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/models/status', methods=['GET'])
+@api.route('/train/jobs/<job_id>', methods=['GET'])
+def get_training_job(job_id):
+    """Obter status, progresso e duração de um job de treinamento"""
+    job = _services().training_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(job)
+
+@api.route('/models/status', methods=['GET'])
 def get_models_status():
     """Obter status dos modelos"""
     try:
-        status = ml_predictor.get_models_status()
+        status = _services().ml_predictor.get_models_status()
         return jsonify(status)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ========== CACHE ==========
+@api.route('/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """
+    Invalidar resultados em cache após novas respostas (chamado pelo backend).
+    Com ``removido`` (respostas removidas, ex.: exclusão de questionário ou
+    aluno), o rollup é reconstruído na próxima leitura e o cache é limpo.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        services = _services()
+        removido = bool(data.get('removido'))
+        if services.db_service.rollup is not None:
+            if removido:
+                services.db_service.rollup.mark_rebuild()
+            else:
+                services.db_service.rollup.mark_stale()
+        removidas = 0
+        if services.result_cache is not None and removido:
+            removidas = services.result_cache.clear()
+        elif services.result_cache is not None:
+            removidas = services.result_cache.invalidate(
+                turma_id=data.get('turmaId'),
+                aluno_id=data.get('alunoId'),
+                questionario_id=data.get('questionarioId')
+            )
+        return jsonify({'success': True, 'entradasRemovidas': removidas})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Obter contadores de hit/miss do cache de analytics"""
+    result_cache = _services().result_cache
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **result_cache.stats()})
+
+# ========== ROLLUP ==========
+@api.route('/rollup/rebuild', methods=['POST'])
+def rebuild_rollup():
+    """Recalcular do zero o rollup de agregados por aluno"""
+    try:
+        rollup = _services().db_service.rollup
+        if rollup is None:
+            return jsonify({'error': 'Rollup desabilitado (ML_ROLLUP_ENABLED=0)'}), 400
+        processadas = rollup.rebuild()
+        return jsonify({'success': True, 'respostasProcessadas': processadas})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ========== MONITORAMENTO ==========
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    corpo, content_type = metrics.exportar()
+    return Response(corpo, content_type=content_type)
+
+@api.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Obter o relatório de uma requisição perfilada (id do header X-Profile-Id)"""
+    relatorio = _services().profile_store.load(profile_id) if _profiling_autorizado() else None
+    if relatorio is None:
+        return jsonify({'error': 'Profile não encontrado'}), 404
+    return jsonify(relatorio)
+
+@api.route('/database/pool', methods=['GET'])
+def get_pool_stats():
+    """Obter estatísticas do pool de conexões com o banco"""
+    return jsonify(_services().db_service.get_pool_stats())
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     # Em produção (Docker/EC2) não podemos forçar debug=True.
     # Permite controlar via variável de ambiente.
     debug = os.getenv('FLASK_DEBUG', '0').lower() in ('1', 'true', 'yes', 'on')
-    app.run(host='0.0.0.0', port=port, debug=debug)
+    # Servidor de desenvolvimento; em produção use gunicorn (wsgi.py)
+    create_app().run(host='0.0.0.0', port=port, debug=debug)
 
@@ -0,0 +1,6 @@
+"""
+Benchmarks do ML Service
+
+Executar a partir de ``ml-service/``, por exemplo:
+    python -m benchmarks.bench_alunos_query
+"""
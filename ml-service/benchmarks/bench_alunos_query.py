@@ -0,0 +1,118 @@
+"""
+Benchmark de get_alunos_data: JOIN direto x agregação prévia
+
+A versão antiga fazia LEFT JOIN de alunos_turmas e respostas no mesmo nível,
+gerando turmas x respostas linhas por aluno antes do GROUP BY. A versão atual
+agrega cada tabela por aluno em uma tabela derivada. O benchmark mede, sobre
+um dataset sintético:
+
+- linhas intermediárias produzidas pelos JOINs antes da agregação
+- tempo de execução das duas queries (melhor de N)
+- se os resultados coincidem
+
+Uso:
+    python -m benchmarks.bench_alunos_query --alunos 2000 --turmas-por-aluno 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.sqlite_shim import SQLiteDatabaseService
+from benchmarks.synthetic import generate
+
+QUERY_ANTIGA = """
+    SELECT
+        u.id, u.nome, u.email, u.criado_em,
+        COUNT(DISTINCT at.turma_id) as total_turmas,
+        COUNT(DISTINCT r.questionario_id) as questionarios_respondidos,
+        AVG(CASE WHEN r.valor_num IS NOT NULL THEN r.valor_num END) as media_notas
+    FROM users u
+    LEFT JOIN alunos_turmas at ON u.id = at.aluno_id
+    LEFT JOIN respostas r ON u.id = r.aluno_id
+    WHERE u.role = 'ALUNO' AND u.ativo = 1
+    GROUP BY u.id, u.nome, u.email, u.criado_em
+    ORDER BY u.criado_em DESC
+"""
+
+LINHAS_JOIN_ANTIGO = """
+    SELECT COUNT(*) as linhas
+    FROM users u
+    LEFT JOIN alunos_turmas at ON u.id = at.aluno_id
+    LEFT JOIN respostas r ON u.id = r.aluno_id
+    WHERE u.role = 'ALUNO' AND u.ativo = 1
+"""
+
+LINHAS_AGREGACAO_PREVIA = """
+    SELECT
+        (SELECT COUNT(*) FROM alunos_turmas)
+        + (SELECT COUNT(*) FROM respostas)
+        + (SELECT COUNT(*) FROM users WHERE role = 'ALUNO' AND ativo = 1) as linhas
+"""
+
+
+def _melhor_tempo(fn, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def _mesmo_resultado(antigo, novo) -> bool:
+    por_id = {a['id']: a for a in novo}
+    for a in antigo:
+        b = por_id.get(a['id'])
+        if b is None or a['questionarios_respondidos'] != b['questionarios_respondidos']:
+            return False
+        if a['total_turmas'] != b['total_turmas']:
+            return False
+        if (a['media_notas'] is None) != (b['media_notas'] is None):
+            return False
+        if a['media_notas'] is not None and abs(a['media_notas'] - b['media_notas']) > 1e-9:
+            return False
+    return len(antigo) == len(novo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--alunos', type=int, default=2000)
+    parser.add_argument('--turmas', type=int, default=30)
+    parser.add_argument('--turmas-por-aluno', type=int, default=3)
+    parser.add_argument('--questionarios-por-turma', type=int, default=6)
+    parser.add_argument('--perguntas', type=int, default=8)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        db = SQLiteDatabaseService(path)
+        with db.pool.connection() as conn:
+            contagens = generate(
+                conn.raw, alunos=args.alunos, turmas=args.turmas,
+                turmas_por_aluno=args.turmas_por_aluno,
+                questionarios_por_turma=args.questionarios_por_turma,
+                perguntas_por_questionario=args.perguntas
+            )
+        print('Dataset:', ', '.join(f'{k}={v}' for k, v in contagens.items()))
+
+        linhas_antigo = db.execute_query(LINHAS_JOIN_ANTIGO)[0]['linhas']
+        linhas_novo = db.execute_query(LINHAS_AGREGACAO_PREVIA)[0]['linhas']
+
+        antigo = db.execute_query(QUERY_ANTIGA)
+        novo = db.get_alunos_data()
+
+        t_antigo = _melhor_tempo(lambda: db.execute_query(QUERY_ANTIGA), args.repeticoes)
+        t_novo = _melhor_tempo(db.get_alunos_data, args.repeticoes)
+
+        print()
+        print(f'{"":28}{"JOIN direto":>14}{"agregação prévia":>20}')
+        print(f'{"linhas antes do GROUP BY":28}{linhas_antigo:>14,}{linhas_novo:>20,}')
+        print(f'{"tempo (melhor de %d)" % args.repeticoes:28}{t_antigo * 1000:>12.1f}ms{t_novo * 1000:>18.1f}ms')
+        print(f'\nSpeedup: {t_antigo / t_novo:.1f}x | resultados iguais: {_mesmo_resultado(antigo, novo)}')
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
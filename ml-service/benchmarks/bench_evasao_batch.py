@@ -0,0 +1,103 @@
+"""
+Benchmark de predict_evasao_turma: predição por aluno x em lote
+
+A versão antiga preparava as features, normalizava e chamava
+``predict_proba`` uma vez por aluno. A versão atual monta uma matriz para a
+turma inteira e faz uma única chamada ao scaler e ao modelo. O benchmark
+treina o RandomForest do serviço com alunos sintéticos e mede, para cada
+tamanho de turma:
+
+- tempo da predição linha a linha (melhor de N)
+- tempo da predição em lote (melhor de N)
+- se as probabilidades coincidem
+
+Uso:
+    python -m benchmarks.bench_evasao_batch --tamanhos 10 100 1000 10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+from services.ml_predictor import MLPredictor
+
+
+def _alunos_sinteticos(n: int, rng: random.Random):
+    agora = datetime.now()
+    alunos = []
+    for i in range(n):
+        respondeu = rng.random() > 0.1
+        alunos.append({
+            'id': f'aluno-{i}',
+            'nome': f'Aluno {i}',
+            'criado_em': agora - timedelta(days=rng.randrange(30, 400)),
+            'questionarios_respondidos': rng.randrange(0, 12) if respondeu else 0,
+            'media_notas': rng.uniform(2, 10) if respondeu else None,
+            'ultima_resposta': agora - timedelta(days=rng.randrange(0, 90)) if respondeu else None,
+            'dias_ativo': rng.randrange(0, 200) if respondeu else None,
+        })
+    return alunos
+
+
+def _predicao_por_linha(predictor: MLPredictor, alunos):
+    probs = []
+    for aluno in alunos:
+        features = predictor.prepare_evasao_features(aluno)
+        features_scaled = predictor.scaler.transform(features)
+        probs.append(predictor.evasao_model.predict_proba(features_scaled)[0][1])
+    return np.array(probs)
+
+
+def _predicao_em_lote(predictor: MLPredictor, alunos):
+    features = predictor.prepare_evasao_features_batch(alunos)
+    return predictor.evasao_model.predict_proba(predictor.scaler.transform(features))[:, 1]
+
+
+def _melhor_tempo(fn, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--treino', type=int, default=500, help='alunos usados no treinamento')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['MODEL_PATH'] = tmp
+        db = MagicMock()
+        treino_frame = pd.DataFrame(_alunos_sinteticos(args.treino, rng))
+        db.iter_alunos_data.side_effect = lambda *a, **k: iter([treino_frame])
+        predictor = MLPredictor(db)
+        treino = predictor.train_models()
+        if not treino.get('success'):
+            raise SystemExit(f'Falha no treinamento: {treino}')
+
+        print(f'{"alunos":>8}{"por linha":>14}{"em lote":>12}{"speedup":>10}  iguais')
+        for n in args.tamanhos:
+            alunos = _alunos_sinteticos(n, rng)
+            # a versão por linha é lenta demais para repetir em turmas grandes
+            rep_linha = args.repeticoes if n <= 1000 else 1
+
+            iguais = np.allclose(_predicao_por_linha(predictor, alunos), _predicao_em_lote(predictor, alunos))
+            t_linha = _melhor_tempo(lambda: _predicao_por_linha(predictor, alunos), rep_linha)
+            t_lote = _melhor_tempo(lambda: _predicao_em_lote(predictor, alunos), args.repeticoes)
+
+            print(f'{n:>8,}{t_linha * 1000:>12.1f}ms{t_lote * 1000:>10.1f}ms{t_linha / t_lote:>9.1f}x  {iguais}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de memória: linhas em dict x DataFrame colunar x leitura em blocos
+
+``execute_query`` devolve uma lista de dicts (um dict por linha, com as
+chaves repetidas); ``query_frame`` lê tuplas e monta colunas tipadas (ids
+como ``category``, datas como ``datetime64``, números como ``float64``);
+``iter_frames`` lê com cursor sem buffer e entrega um DataFrame por bloco,
+que aqui é reduzido a uma soma e descartado, como no treinamento. O
+benchmark lê a tabela ``respostas`` de um dataset sintético pelos três
+caminhos e mede, por 100 mil linhas:
+
+- memória retida pelo resultado (tracemalloc, após a leitura)
+- pico de memória durante a leitura
+- tempo de leitura
+
+Uso:
+    python -m benchmarks.bench_frame_memory --alunos 3000 --chunk-size 5000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.sqlite_shim import SQLiteDatabaseService
+from benchmarks.synthetic import generate
+
+QUERY = """
+    SELECT id, questionario_id, pergunta_id, aluno_id, turma_id,
+           valor_num, valor_opcao, criado_em
+    FROM respostas
+"""
+
+DTYPES = {
+    'id': 'string',
+    'questionario_id': 'category',
+    'pergunta_id': 'category',
+    'aluno_id': 'category',
+    'turma_id': 'category',
+    'valor_num': 'float',
+    'valor_opcao': 'category',
+    'criado_em': 'datetime',
+}
+
+
+def _medir(fn):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = fn()
+    duracao = time.perf_counter() - inicio
+    retida, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, retida, pico, duracao
+
+
+def _ler_em_blocos(db, chunk_size: int) -> int:
+    linhas = 0
+    soma = 0.0
+    for frame in db.iter_frames(QUERY, dtypes=DTYPES, chunk_size=chunk_size):
+        linhas += len(frame)
+        soma += frame['valor_num'].sum()
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--alunos', type=int, default=3000)
+    parser.add_argument('--turmas', type=int, default=30)
+    parser.add_argument('--turmas-por-aluno', type=int, default=3)
+    parser.add_argument('--questionarios-por-turma', type=int, default=6)
+    parser.add_argument('--perguntas', type=int, default=8)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        db = SQLiteDatabaseService(path)
+        with db.pool.connection() as conn:
+            contagens = generate(
+                conn.raw, alunos=args.alunos, turmas=args.turmas,
+                turmas_por_aluno=args.turmas_por_aluno,
+                questionarios_por_turma=args.questionarios_por_turma,
+                perguntas_por_questionario=args.perguntas
+            )
+        print('Dataset:', ', '.join(f'{k}={v}' for k, v in contagens.items()))
+
+        linhas, retida_dict, pico_dict, t_dict = _medir(lambda: db.execute_query(QUERY))
+        n = len(linhas)
+        del linhas
+        frame, retida_frame, pico_frame, t_frame = _medir(lambda: db.query_frame(QUERY, dtypes=DTYPES))
+        assert len(frame) == n
+        del frame
+        lidas, retida_stream, pico_stream, t_stream = _medir(lambda: _ler_em_blocos(db, args.chunk_size))
+        assert lidas == n
+        db.close()
+
+    escala = 100_000 / n
+    mb = 1024 * 1024
+    print(f'\nPor 100 mil linhas de respostas ({n:,} lidas):')
+    print(f'{"":22}{"list[dict]":>14}{"DataFrame":>14}{"em blocos":>14}')
+    print(f'{"memória retida":22}{retida_dict * escala / mb:>12.1f}MB{retida_frame * escala / mb:>12.1f}MB'
+          f'{retida_stream * escala / mb:>12.1f}MB')
+    print(f'{"pico na leitura":22}{pico_dict * escala / mb:>12.1f}MB{pico_frame * escala / mb:>12.1f}MB'
+          f'{pico_stream * escala / mb:>12.1f}MB')
+    print(f'{"tempo de leitura":22}{t_dict * escala * 1000:>12.0f}ms{t_frame * escala * 1000:>12.0f}ms'
+          f'{t_stream * escala * 1000:>12.0f}ms')
+    print(f'\nRedução da memória retida: {retida_dict / retida_frame:.1f}x')
+    print(f'Pico da leitura em blocos ({args.chunk_size:,} linhas): {pico_stream / mb:.1f}MB no total, '
+          f'independente do tamanho da tabela')
+
+
+if __name__ == '__main__':
+    main()
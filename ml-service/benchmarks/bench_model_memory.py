@@ -0,0 +1,165 @@
+"""
+Benchmark de memória dos modelos por worker
+
+Cada worker do serviço carrega o RandomForest (100 árvores, profundidade 10),
+o GradientBoosting e o scaler. O benchmark treina os modelos do serviço com
+alunos sintéticos, publica a versão em um registro temporário e sobe 1, 4 e
+8 workers (fork, como o gunicorn) em cada modo:
+
+- sem modelos: referência (bibliotecas importadas, nenhum modelo)
+- load:        cada worker faz ``joblib.load`` da versão atual
+- mmap:        cada worker carrega com ``mmap_mode='r'``
+- preload:     o processo mestre carrega antes do fork (``gunicorn --preload``)
+- preload+mmap
+
+Depois de uma predição em cada worker (para tocar todas as árvores), mede
+em ``/proc/<pid>/smaps_rollup``:
+
+- RSS médio por worker (conta páginas compartilhadas em todos)
+- USS médio por worker (páginas exclusivas do processo)
+- PSS somado dos workers e do mestre (memória real do conjunto)
+
+Somente Linux.
+
+Uso:
+    python -m benchmarks.bench_model_memory --workers 1 4 8 --alunos 20000
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from services.ml_predictor import MLPredictor
+
+MODOS = [
+    ('sem modelos', False, False),
+    ('load', False, False),
+    ('mmap', False, True),
+    ('preload', True, False),
+    ('preload+mmap', True, True),
+]
+
+
+def _alunos_sinteticos(n: int, seed: int):
+    rng = random.Random(seed)
+    agora = datetime.now()
+    alunos = []
+    for i in range(n):
+        respondeu = rng.random() > 0.1
+        alunos.append({
+            'id': f'aluno-{i}',
+            'nome': f'Aluno {i}',
+            'criado_em': agora - timedelta(days=rng.randrange(30, 400)),
+            'questionarios_respondidos': rng.randrange(0, 12) if respondeu else 0,
+            'media_notas': rng.uniform(2, 10) if respondeu else None,
+            'ultima_resposta': agora - timedelta(days=rng.randrange(0, 90)) if respondeu else None,
+            'dias_ativo': rng.randrange(0, 200) if respondeu else None,
+        })
+    return alunos
+
+
+def _treinar(n: int):
+    # Em um processo separado: o mestre não fica com os modelos do treino
+    db = MagicMock()
+    frame = pd.DataFrame(_alunos_sinteticos(n, 42))
+    db.iter_alunos_data.side_effect = lambda *a, **k: iter([frame])
+    resultado = MLPredictor(db).train_models()
+    if not resultado.get('success'):
+        raise SystemExit(f'Falha no treinamento: {resultado}')
+
+
+def _memoria(pid: int):
+    valores = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) >= 3 and partes[-1] == 'kB':
+                valores[partes[0].rstrip(':')] = int(partes[1]) * 1024
+    uss = valores.get('Private_Clean', 0) + valores.get('Private_Dirty', 0)
+    return valores.get('Rss', 0), valores.get('Pss', 0), uss
+
+
+def _worker(conn, predictor, carregar: bool, alunos):
+    if carregar:
+        predictor = MLPredictor(MagicMock())
+    if predictor is not None:
+        bundle = predictor._bundle
+        predictor._predict_evasao_modelo(alunos, bundle)
+        bundle.desempenho_model.predict(bundle.scaler.transform(predictor.prepare_evasao_features_batch(alunos)))
+    conn.send('pronto')
+    conn.recv()
+
+
+def _medir(ctx, n_workers: int, modo: str, preload: bool, mmap: bool, alunos):
+    os.environ['ML_MODEL_MMAP'] = '1' if mmap else '0'
+    predictor = MLPredictor(MagicMock()) if preload else None
+    gc.collect()
+    gc.freeze()
+
+    processos = []
+    for _ in range(n_workers):
+        conn, conn_filho = ctx.Pipe()
+        p = ctx.Process(target=_worker, args=(conn_filho, predictor, modo != 'sem modelos' and not preload, alunos))
+        p.start()
+        processos.append((p, conn))
+    for _, conn in processos:
+        conn.recv()
+
+    medidas = [_memoria(p.pid) for p, _ in processos]
+    pss_mestre = _memoria(os.getpid())[1]
+
+    for p, conn in processos:
+        conn.send('sair')
+        p.join()
+    gc.unfreeze()
+    del predictor
+    gc.collect()
+
+    rss = sum(m[0] for m in medidas) / n_workers
+    uss = sum(m[2] for m in medidas) / n_workers
+    pss_total = sum(m[1] for m in medidas) + pss_mestre
+    return rss, uss, pss_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--alunos', type=int, default=20000, help='alunos usados no treinamento')
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        raise SystemExit('Este benchmark precisa de /proc/<pid>/smaps_rollup (Linux)')
+
+    ctx = multiprocessing.get_context('fork')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['MODEL_PATH'] = tmp
+        treino = ctx.Process(target=_treinar, args=(args.alunos,))
+        treino.start()
+        treino.join()
+        if treino.exitcode != 0:
+            raise SystemExit('Falha no treinamento')
+
+        tamanho = sum(
+            os.path.getsize(os.path.join(raiz, nome))
+            for raiz, _, nomes in os.walk(tmp) for nome in nomes if nome.endswith('.pkl')
+        )
+        print(f'Modelos publicados: {tamanho / 1024 / 1024:.1f}MB em disco')
+
+        alunos = _alunos_sinteticos(200, 7)
+        mb = 1024 * 1024
+        print(f'\n{"workers":>8}  {"modo":<14}{"RSS/worker":>12}{"USS/worker":>12}{"PSS total":>12}')
+        for n in args.workers:
+            for modo, preload, mmap in MODOS:
+                rss, uss, pss = _medir(ctx, n, modo, preload, mmap, alunos)
+                print(f'{n:>8}  {modo:<14}{rss / mb:>10.1f}MB{uss / mb:>10.1f}MB{pss / mb:>10.1f}MB')
+            print()
+
+
+if __name__ == '__main__':
+    main()
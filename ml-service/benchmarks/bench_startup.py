@@ -0,0 +1,77 @@
+"""
+Benchmark de inicialização do serviço (python -X importtime)
+
+Importar o ``app`` deve carregar apenas Flask e os serviços leves; pandas,
+scikit-learn e joblib só entram na primeira predição/treinamento. O
+benchmark roda cada cenário em um processo novo e mostra, a partir do
+``-X importtime``:
+
+- tempo acumulado de importação do ``app``
+- tempo até a primeira resposta de ``/health``
+- tempo de inicialização dos serviços de predição (``Services.warm_up``)
+- os módulos mais lentos de cada cenário
+
+Uso:
+    python -m benchmarks.bench_startup --top 8
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CENARIOS = [
+    ('import app', 'import app'),
+    ('/health', "from app import create_app; create_app().test_client().get('/health')"),
+    ('warm_up', 'from app import create_app; create_app().extensions["ml_services"].warm_up()'),
+]
+
+BIBLIOTECAS_PESADAS = ('pandas', 'sklearn', 'joblib', 'numpy')
+
+
+def importtime(codigo: str) -> Tuple[Dict[str, Tuple[int, int]], float]:
+    """
+    Executar ``codigo`` em um processo novo com ``-X importtime``.
+
+    Retorna ({módulo: (próprio_us, acumulado_us)}, duração total em segundos).
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    # Sem MySQL: o pool não abre conexões enquanto nenhuma query é feita
+    env.setdefault('MODEL_PATH', os.path.join(RAIZ, 'models'))
+    inicio = time.perf_counter()
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=RAIZ, env=env, capture_output=True, text=True, check=True
+    )
+    duracao = time.perf_counter() - inicio
+
+    modulos = {}
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        modulos[nome.strip()] = (int(proprio), int(acumulado))
+    return modulos, duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=8, help='módulos mais lentos exibidos por cenário')
+    args = parser.parse_args()
+
+    for titulo, codigo in CENARIOS:
+        modulos, duracao = importtime(codigo)
+        importacao = sum(proprio for proprio, _ in modulos.values()) / 1000
+        pesadas = [nome for nome in BIBLIOTECAS_PESADAS if nome in modulos]
+        print(f'\n{titulo}: {duracao * 1000:.0f}ms no processo, {importacao:.0f}ms em imports, '
+              f'{len(modulos)} módulos; pesadas: {", ".join(pesadas) or "nenhuma"}')
+        raizes = {nome: acumulado for nome, (_, acumulado) in modulos.items() if '.' not in nome}
+        for nome, acumulado in sorted(raizes.items(), key=lambda x: -x[1])[:args.top]:
+            print(f'  {acumulado / 1000:>8.1f}ms  {nome}')
+
+
+if __name__ == '__main__':
+    main()
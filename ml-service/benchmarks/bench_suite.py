@@ -0,0 +1,302 @@
+"""
+Suíte de benchmarks do ML Service: todas as rotas e todas as consultas
+
+Gera (ou reaproveita) um dataset sintético em SQLite na escala pedida,
+treina os modelos nesse dataset e mede, com o cache de analytics desligado:
+
+- cada consulta do ``DatabaseService`` (latência e linhas retornadas)
+- cada endpoint, pelo test client do Flask (latência, status e bytes)
+
+Cada item roda ``--repeticoes`` vezes após um aquecimento; o relatório traz
+mínimo, mediana, p95 e média em ms. ``--saida`` grava o relatório em JSON e
+``--comparar`` confronta a mediana com um relatório anterior, apontando
+regressões acima de ``--limite`` e de ``--minimo-ms`` (e saindo com código
+1), para anexar ao review de mudanças de performance. Rotas que respondem
+``{"error": ...}`` aparecem com o erro no relatório.
+
+Escalas (respostas aproximadas): 1k, 10k, 100k e 1m. Os datasets ficam em
+``--dados`` e são reaproveitados entre execuções com a mesma escala e seed.
+
+Uso:
+    python -m benchmarks.bench_suite --escala 100k --saida base.json
+    python -m benchmarks.bench_suite --escala 100k --comparar base.json --limite 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.sqlite_shim import SQLiteDatabaseService
+from benchmarks.synthetic import generate
+
+# respostas ≈ alunos x 2 turmas x 4 questionários x 8 perguntas x ~0,6 de engajamento
+ESCALAS = {
+    '1k': {'alunos': 30, 'turmas': 4},
+    '10k': {'alunos': 300, 'turmas': 10},
+    '100k': {'alunos': 3000, 'turmas': 40},
+    '1m': {'alunos': 30000, 'turmas': 200},
+}
+
+
+def preparar_dataset(diretorio: str, escala: str, seed: int = 42) -> Tuple[str, Dict[str, int]]:
+    """Gerar o SQLite da escala (ou reaproveitar o existente); retorna (caminho, contagens)"""
+    path = os.path.join(diretorio, f'bench-{escala}-{seed}.sqlite3')
+    db = SQLiteDatabaseService(path)
+    try:
+        with db.pool.connection() as conn:
+            existe = conn.raw.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'respostas'"
+            ).fetchone()
+            if existe:
+                contagens = {
+                    tabela: conn.raw.execute(f'SELECT COUNT(*) FROM {tabela}').fetchone()[0]
+                    for tabela in ('users', 'turmas', 'alunos_turmas', 'questionarios', 'perguntas', 'respostas')
+                }
+            else:
+                contagens = generate(conn.raw, seed=seed, **ESCALAS[escala])
+    finally:
+        db.close()
+    return path, contagens
+
+
+def _amostras(db) -> Dict[str, str]:
+    """Turma, aluno e questionário com mais respostas (pior caso de cada rota)"""
+    with db.pool.connection() as conn:
+        def maior(coluna):
+            return conn.raw.execute(
+                f'SELECT {coluna} FROM respostas GROUP BY {coluna} ORDER BY COUNT(*) DESC, {coluna} LIMIT 1'
+            ).fetchone()[0]
+        return {
+            'turma_id': maior('turma_id'),
+            'aluno_id': maior('aluno_id'),
+            'questionario_id': maior('questionario_id'),
+        }
+
+
+def _consultas(db, amostra: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    turma_id = amostra['turma_id']
+    return [
+        ('get_alunos_data', lambda: db.get_alunos_data()),
+        ('get_alunos_data[turma]', lambda: db.get_alunos_data(turma_id)),
+        ('get_alunos_data[frame]', lambda: db.get_alunos_data(as_frame=True)),
+        ('get_respostas_aluno', lambda: db.get_respostas_aluno(amostra['aluno_id'])),
+        ('get_resumo_respostas_aluno', lambda: db.get_resumo_respostas_aluno(amostra['aluno_id'])),
+        ('get_respostas_aluno_page', lambda: db.get_respostas_aluno_page(amostra['aluno_id'], 10)),
+        ('get_series_notas[turma]', lambda: db.get_series_notas(100, turma_id=turma_id)),
+        ('get_questionarios_stats', lambda: db.get_questionarios_stats()),
+        ('get_perguntas_stats', lambda: db.get_perguntas_stats(amostra['questionario_id'])),
+        ('get_engagement_data', lambda: db.get_engagement_data()),
+        ('get_engagement_data[turma]', lambda: db.get_engagement_data(turma_id)),
+        ('get_student_features[turma]', lambda: db.get_student_features(turma_id)),
+        ('get_student_features_bulk', lambda: db.get_student_features_bulk()),
+        ('iter_alunos_data', lambda: sum(len(bloco) for bloco in db.iter_alunos_data())),
+    ]
+
+
+def _endpoints(amostra: Dict[str, str]) -> List[Tuple[str, str, str, Dict[str, Any]]]:
+    return [
+        ('health', 'GET', '/health', None),
+        ('analytics_overview', 'GET', '/analytics/overview', None),
+        ('analytics_turma', 'GET', f"/analytics/turma/{amostra['turma_id']}", None),
+        ('analytics_aluno', 'GET', f"/analytics/aluno/{amostra['aluno_id']}", None),
+        ('predict_evasao', 'POST', '/predict/evasao', {'turmaId': amostra['turma_id']}),
+        ('predict_evasao_bulk', 'POST', '/predict/evasao/bulk', {'turmaIds': 'all'}),
+        ('predict_desempenho', 'POST', '/predict/desempenho', {'alunoId': amostra['aluno_id']}),
+        ('patterns_engagement', 'GET', '/patterns/engagement', None),
+        ('patterns_engagement_turma', 'GET', f"/patterns/engagement?turmaId={amostra['turma_id']}", None),
+        ('patterns_responses', 'GET', f"/patterns/responses?questionarioId={amostra['questionario_id']}", None),
+        ('models_status', 'GET', '/models/status', None),
+    ]
+
+
+def _linhas(resultado) -> int:
+    if isinstance(resultado, int):
+        return resultado
+    return len(resultado)
+
+
+def medir(fn: Callable[[], Any], repeticoes: int, aquecimento: int = 1) -> Tuple[Dict[str, float], Any]:
+    """Tempos em ms de ``repeticoes`` execuções de ``fn``; retorna (estatísticas, último resultado)"""
+    resultado = None
+    for _ in range(aquecimento):
+        resultado = fn()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos = np.array(tempos)
+    estatisticas = {
+        'minMs': round(float(tempos.min()), 3),
+        'p50Ms': round(float(np.percentile(tempos, 50)), 3),
+        'p95Ms': round(float(np.percentile(tempos, 95)), 3),
+        'mediaMs': round(float(tempos.mean()), 3),
+        'repeticoes': repeticoes,
+    }
+    return estatisticas, resultado
+
+
+def _ambiente() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+def executar(escala: str, diretorio: str, repeticoes: int = 5, seed: int = 42,
+             rollup: bool = False) -> Dict[str, Any]:
+    """Preparar o dataset, treinar os modelos e medir consultas e endpoints"""
+    path, contagens = preparar_dataset(diretorio, escala, seed)
+    # Modelos da escala ao lado do dataset; o MLPredictor lê MODEL_PATH ao ser criado
+    model_path_anterior = os.environ.get('MODEL_PATH')
+    os.environ['MODEL_PATH'] = os.path.join(diretorio, f'models-{escala}-{seed}')
+
+    from app import Services, create_app
+    from services.ml_predictor import MLPredictor
+
+    db = SQLiteDatabaseService(path, rollup=rollup)
+    try:
+        if rollup:
+            db.rollup.rebuild()
+        if not os.path.exists(os.path.join(os.environ['MODEL_PATH'], 'CURRENT')):
+            treino = MLPredictor(db).train_models()
+            if not treino.get('success'):
+                raise RuntimeError(f'Falha no treinamento: {treino}')
+
+        amostra = _amostras(db)
+        consultas = {}
+        for nome, fn in _consultas(db, amostra):
+            estatisticas, resultado = medir(fn, repeticoes)
+            consultas[nome] = {**estatisticas, 'linhas': _linhas(resultado)}
+
+        client = create_app(Services(db_service=db, result_cache=None)).test_client()
+        endpoints = {}
+        for nome, metodo, caminho, corpo in _endpoints(amostra):
+            estatisticas, resposta = medir(lambda: client.open(caminho, method=metodo, json=corpo), repeticoes)
+            corpo_resposta = resposta.get_json(silent=True)
+            endpoints[nome] = {
+                **estatisticas,
+                'rota': f'{metodo} {caminho.split("?")[0]}',
+                'status': resposta.status_code,
+                'bytes': len(resposta.get_data()),
+                # As rotas de analytics devolvem 200 com {'error': ...} quando falham
+                'erro': corpo_resposta.get('error') if isinstance(corpo_resposta, dict) else None,
+            }
+    finally:
+        db.close()
+        if model_path_anterior is None:
+            os.environ.pop('MODEL_PATH', None)
+        else:
+            os.environ['MODEL_PATH'] = model_path_anterior
+
+    return {
+        'escala': escala,
+        'seed': seed,
+        'rollup': rollup,
+        'criadoEm': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': _ambiente(),
+        'contagens': contagens,
+        'consultas': consultas,
+        'endpoints': endpoints,
+    }
+
+
+def comparar(atual: Dict[str, Any], base: Dict[str, Any], limite: float = 0.2,
+             minimo_ms: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    Variação da mediana de cada consulta/endpoint presente nos dois relatórios.
+
+    ``regressao`` indica mediana mais lenta que a base por mais de ``limite``
+    (fração, 0.2 = 20%) e por mais de ``minimo_ms`` em valor absoluto, para
+    que o ruído de itens de poucos milissegundos não conte como regressão.
+    """
+    linhas = []
+    for grupo in ('consultas', 'endpoints'):
+        for nome, medida in atual[grupo].items():
+            anterior = base.get(grupo, {}).get(nome)
+            if anterior is None:
+                continue
+            variacao = (medida['p50Ms'] - anterior['p50Ms']) / anterior['p50Ms'] if anterior['p50Ms'] else 0.0
+            linhas.append({
+                'grupo': grupo,
+                'nome': nome,
+                'baseMs': anterior['p50Ms'],
+                'atualMs': medida['p50Ms'],
+                'variacao': round(variacao, 4),
+                'regressao': variacao > limite and medida['p50Ms'] - anterior['p50Ms'] > minimo_ms,
+            })
+    return linhas
+
+
+def _imprimir(relatorio: Dict[str, Any]):
+    contagens = ', '.join(f'{k}={v}' for k, v in relatorio['contagens'].items())
+    print(f"Escala {relatorio['escala']} (seed {relatorio['seed']}, rollup {'on' if relatorio['rollup'] else 'off'}): {contagens}")
+    for grupo, extra in (('consultas', 'linhas'), ('endpoints', 'bytes')):
+        print(f'\n{grupo:<30}{"min":>10}{"p50":>10}{"p95":>10}{"media":>10}{extra:>10}')
+        for nome, m in relatorio[grupo].items():
+            sufixo = f'{m[extra]:>10}' if grupo == 'consultas' or m['status'] == 200 else f'{"HTTP " + str(m["status"]):>10}'
+            if m.get('erro'):
+                sufixo += f'  erro: {m["erro"]}'
+            print(f'{nome:<30}{m["minMs"]:>8.1f}ms{m["p50Ms"]:>8.1f}ms{m["p95Ms"]:>8.1f}ms{m["mediaMs"]:>8.1f}ms{sufixo}')
+
+
+def _imprimir_comparacao(linhas: List[Dict[str, Any]], limite: float, minimo_ms: float):
+    print(f'\nComparação da mediana com a base (regressão acima de {limite:.0%} e de {minimo_ms:g}ms)')
+    print(f'{"":<30}{"base":>10}{"atual":>10}{"variação":>10}')
+    for linha in linhas:
+        marca = '  <-- regressão' if linha['regressao'] else ''
+        print(f'{linha["nome"]:<30}{linha["baseMs"]:>8.1f}ms{linha["atualMs"]:>8.1f}ms{linha["variacao"]:>+10.1%}{marca}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', choices=list(ESCALAS), default='10k')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rollup', action='store_true', help='ler agregados das tabelas de rollup')
+    parser.add_argument('--dados', default=os.path.join(tempfile.gettempdir(), 'ml-service-bench'),
+                        help='diretório dos datasets e modelos reaproveitados')
+    parser.add_argument('--saida', help='gravar o relatório em JSON')
+    parser.add_argument('--comparar', help='relatório JSON anterior usado como base')
+    parser.add_argument('--limite', type=float, default=0.2, help='variação da mediana considerada regressão')
+    parser.add_argument('--minimo-ms', type=float, default=1.0, help='diferença absoluta mínima para regressão')
+    args = parser.parse_args()
+
+    os.makedirs(args.dados, exist_ok=True)
+    relatorio = executar(args.escala, args.dados, args.repeticoes, args.seed, args.rollup)
+    _imprimir(relatorio)
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        if (base['escala'], base['seed'], base['rollup']) != (relatorio['escala'], relatorio['seed'], relatorio['rollup']):
+            print('\nAviso: a base foi gerada com outra escala/seed/rollup')
+        linhas = comparar(relatorio, base, args.limite, args.minimo_ms)
+        _imprimir_comparacao(linhas, args.limite, args.minimo_ms)
+        if any(linha['regressao'] for linha in linhas):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
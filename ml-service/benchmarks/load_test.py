@@ -0,0 +1,195 @@
+"""
+Teste de carga: servidor de desenvolvimento do Flask x gunicorn
+
+Sobe o serviço sobre um dataset sintético em SQLite (com modelos treinados
+nesse dataset) e dispara requisições concorrentes contra
+``GET /analytics/overview`` e ``POST /predict/evasao`` durante um tempo fixo,
+medindo por endpoint:
+
+- requisições por segundo
+- latência p50 / p95 / p99
+- erros (status diferente de 200 ou falha de conexão)
+
+Por padrão compara ``python app.py`` (processo único do Flask) com o
+gunicorn configurado por ``gunicorn.conf.py``. O cache de analytics fica
+desligado para medir o processamento de cada requisição (``--cache`` liga).
+Com ``--url``, apenas dispara a carga contra um serviço já em execução.
+
+Uso:
+    python -m benchmarks.load_test --workers 4 --threads 4 --concorrencia 32 --duracao 15
+    python -m benchmarks.load_test --url http://localhost:5000 --turma-id <uuid>
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.sqlite_shim import SQLiteDatabaseService
+from benchmarks.synthetic import generate
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _aguardar_servidor(url: str, timeout: float = 60):
+    alvo = urlparse(url)
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            conn = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f'Servidor não respondeu em {url}')
+
+
+def _preparar_dataset(tmp: str, args) -> str:
+    """Gerar o dataset e treinar os modelos; retorna um turma_id para /predict/evasao"""
+    path = os.path.join(tmp, 'bench.sqlite3')
+    db = SQLiteDatabaseService(path)
+    with db.pool.connection() as conn:
+        contagens = generate(conn.raw, alunos=args.alunos, turmas=args.turmas)
+        turma_id = conn.raw.execute('SELECT id FROM turmas ORDER BY id LIMIT 1').fetchone()[0]
+    print('Dataset:', ', '.join(f'{k}={v}' for k, v in contagens.items()))
+
+    from services.ml_predictor import MLPredictor
+    treino = MLPredictor(db).train_models()
+    if not treino.get('success'):
+        raise SystemExit(f'Falha no treinamento: {treino}')
+    db.close()
+    return turma_id
+
+
+def _iniciar_servidor(modo: str, tmp: str, args):
+    porta = _porta_livre()
+    env = dict(
+        os.environ,
+        BENCH_SQLITE_PATH=os.path.join(tmp, 'bench.sqlite3'),
+        PORT=str(porta),
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_ACCESS_LOG='',
+        ML_CACHE_ENABLED='1' if args.cache else '0',
+    )
+    if modo == 'gunicorn':
+        comando = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'benchmarks.load_test_app:app']
+    else:
+        comando = [sys.executable, '-m', 'benchmarks.load_test_app']
+    log = open(os.path.join(tmp, f'{modo}.log'), 'w')
+    processo = subprocess.Popen(comando, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{porta}'
+    _aguardar_servidor(url)
+    return processo, url
+
+
+def _carga(url: str, turma_id: str, concorrencia: int, duracao: float):
+    alvo = urlparse(url)
+    requisicoes = [
+        ('overview', 'GET', '/analytics/overview', None),
+        ('evasao', 'POST', '/predict/evasao', json.dumps({'turmaId': turma_id})),
+    ]
+    resultados = {nome: {'latencias': [], 'erros': 0} for nome, *_ in requisicoes}
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao
+
+    def cliente(indice: int):
+        conn = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=60)
+        locais = {nome: ([], 0) for nome in resultados}
+        i = indice
+        while time.monotonic() < fim:
+            nome, metodo, caminho, corpo = requisicoes[i % len(requisicoes)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                conn.request(metodo, caminho, body=corpo, headers={'Content-Type': 'application/json'})
+                resposta = conn.getresponse()
+                resposta.read()
+                ok = resposta.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=60)
+                ok = False
+            latencias, erros = locais[nome]
+            if ok:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                locais[nome] = (latencias, erros + 1)
+        conn.close()
+        with lock:
+            for nome, (latencias, erros) in locais.items():
+                resultados[nome]['latencias'].extend(latencias)
+                resultados[nome]['erros'] += erros
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resultados
+
+
+def _imprimir(titulo: str, resultados, duracao: float):
+    print(f'\n{titulo}')
+    print(f'{"endpoint":<12}{"req/s":>10}{"p50":>10}{"p95":>10}{"p99":>10}{"erros":>8}')
+    for nome, r in resultados.items():
+        lat = np.array(r['latencias']) * 1000
+        if len(lat):
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        else:
+            p50 = p95 = p99 = float('nan')
+        print(f'{nome:<12}{len(lat) / duracao:>10.1f}{p50:>8.1f}ms{p95:>8.1f}ms{p99:>8.1f}ms{r["erros"]:>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='serviço já em execução (não sobe servidor)')
+    parser.add_argument('--turma-id', help='turma usada em /predict/evasao (com --url)')
+    parser.add_argument('--modos', nargs='+', choices=['dev', 'gunicorn'], default=['dev', 'gunicorn'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concorrencia', type=int, default=32)
+    parser.add_argument('--duracao', type=float, default=15)
+    parser.add_argument('--alunos', type=int, default=2000)
+    parser.add_argument('--turmas', type=int, default=30)
+    parser.add_argument('--cache', action='store_true', help='manter o cache de analytics ligado')
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.turma_id:
+            raise SystemExit('--turma-id é obrigatório com --url')
+        _aguardar_servidor(args.url)
+        _imprimir(args.url, _carga(args.url, args.turma_id, args.concorrencia, args.duracao), args.duracao)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['MODEL_PATH'] = os.path.join(tmp, 'models')
+        turma_id = _preparar_dataset(tmp, args)
+        for modo in args.modos:
+            processo, url = _iniciar_servidor(modo, tmp, args)
+            try:
+                resultados = _carga(url, turma_id, args.concorrencia, args.duracao)
+            finally:
+                processo.terminate()
+                processo.wait(timeout=60)
+            titulo = ('servidor de desenvolvimento do Flask (1 processo)' if modo == 'dev'
+                      else f'gunicorn ({args.workers} workers x {args.threads} threads, preload)')
+            _imprimir(titulo, resultados, args.duracao)
+
+
+if __name__ == '__main__':
+    main()
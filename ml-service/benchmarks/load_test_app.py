@@ -0,0 +1,15 @@
+"""
+Aplicação do ML Service sobre um dataset SQLite (usada por load_test)
+
+    BENCH_SQLITE_PATH=/tmp/bench.sqlite3 gunicorn -c gunicorn.conf.py benchmarks.load_test_app:app
+"""
+import os
+
+from app import Services, create_app
+from benchmarks.sqlite_shim import SQLiteDatabaseService
+
+app = create_app(Services(db_service=SQLiteDatabaseService(os.environ['BENCH_SQLITE_PATH'])))
+
+if __name__ == '__main__':
+    # Servidor de desenvolvimento do Flask, como no antigo `python app.py`
+    app.run(host='127.0.0.1', port=int(os.getenv('PORT', 5000)))
@@ -0,0 +1,137 @@
+"""
+DatabaseService sobre SQLite
+
+Substituto local do MySQL para benchmarks e testes: reaproveita as queries
+reais do ``DatabaseService`` traduzindo os poucos trechos específicos do
+MySQL (placeholders, ``DATEDIFF``, ``NOW(3)``, upserts) e devolvendo linhas
+como dicts, como o ``DictCursor`` do PyMySQL.
+"""
+import re
+import sqlite3
+from datetime import datetime
+
+import pymysql
+
+from services.database import DatabaseService, ConnectionPool
+from services.rollup import AlunoStatsRollup
+
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(' '))
+
+_DATETIME_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d+)?$')
+
+
+def _to_datetime(value):
+    if isinstance(value, str) and _DATETIME_RE.match(value):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _datediff(a, b):
+    if a is None or b is None:
+        return None
+    return (datetime.fromisoformat(a[:10]) - datetime.fromisoformat(b[:10])).days
+
+
+_TRADUCOES = [
+    (re.compile(r'NOW\(3\)\s*-\s*INTERVAL\s+%s\s+SECOND'), "datetime('now', '-' || %s || ' seconds')"),
+    (re.compile(r'NOW\(3\)'), "datetime('now')"),
+    (re.compile(r'INSERT IGNORE'), 'INSERT OR IGNORE'),
+    (re.compile(r'ON DUPLICATE KEY UPDATE'), 'ON CONFLICT DO UPDATE SET'),
+    (re.compile(r'\bVALUES\((\w+)\)'), r'excluded.\1'),
+    (re.compile(r'\bGREATEST\('), 'MAX('),
+    (re.compile(r'\bLEAST\('), 'MIN('),
+    (re.compile(r'\s+FOR UPDATE'), ''),
+]
+
+
+def translate(query: str) -> str:
+    """Traduzir o dialeto MySQL usado pelo serviço para SQLite"""
+    for padrao, substituto in _TRADUCOES:
+        query = padrao.sub(substituto, query)
+    return query.replace('%s', '?')
+
+
+class _Cursor:
+    def __init__(self, conn: sqlite3.Connection, as_dict: bool = True):
+        self._cursor = conn.cursor()
+        self._as_dict = as_dict
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, params=()):
+        self._cursor.execute(translate(query), tuple(params or ()))
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def _row(self, values):
+        if not self._as_dict:
+            return tuple(_to_datetime(v) for v in values)
+        nomes = [d[0] for d in self._cursor.description]
+        return {n: _to_datetime(v) for n, v in zip(nomes, values)}
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def fetchmany(self, size):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._row(row) if row is not None else None
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Conexão SQLite com a interface mínima usada do PyMySQL"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.create_function('DATEDIFF', 2, _datediff, deterministic=True)
+        self.open = True
+
+    def cursor(self, cursor_class=None):
+        as_dict = cursor_class is None or issubclass(cursor_class, pymysql.cursors.DictCursorMixin)
+        return _Cursor(self._conn, as_dict)
+
+    def ping(self, reconnect=False):
+        self._conn.execute('SELECT 1')
+
+    def begin(self):
+        self._conn.execute('BEGIN')
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self.open = False
+        self._conn.close()
+
+    @property
+    def raw(self) -> sqlite3.Connection:
+        return self._conn
+
+
+class SQLiteDatabaseService(DatabaseService):
+    """DatabaseService apontando para um arquivo SQLite"""
+
+    def __init__(self, path: str, rollup: bool = False):
+        self.path = path
+        self.config = {'database': path}
+        self.pool = ConnectionPool(self.get_connection, min_size=1, max_size=4)
+        self.stream_chunk_size = 5000
+        self.rollup = AlunoStatsRollup(self, refresh_interval=0, lag=0) if rollup else None
+
+    def get_connection(self):
+        return SQLiteConnection(self.path)
@@ -0,0 +1,206 @@
+"""
+Gerador de dados sintéticos
+
+Cria o subconjunto do schema usado pelo ML Service (users, turmas,
+alunos_turmas, questionarios, perguntas, respostas e as tabelas de rollup
+ml_*) em uma conexão SQLite e o popula com dados realistas: alunos em várias
+turmas, questionários por turma, engajamento variável por aluno e respostas
+espalhadas no último ano.
+"""
+import random
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict
+
+SCHEMA = """
+    CREATE TABLE users (
+        id TEXT PRIMARY KEY,
+        nome TEXT NOT NULL,
+        email TEXT NOT NULL,
+        role TEXT NOT NULL,
+        ativo INTEGER NOT NULL DEFAULT 1,
+        criado_em DATETIME NOT NULL,
+        atualizado_em DATETIME NOT NULL
+    );
+    CREATE TABLE turmas (
+        id TEXT PRIMARY KEY,
+        nome TEXT NOT NULL,
+        ano INTEGER NOT NULL,
+        professor_id TEXT NOT NULL,
+        ativo INTEGER NOT NULL DEFAULT 1,
+        criado_em DATETIME NOT NULL
+    );
+    CREATE TABLE alunos_turmas (
+        id TEXT PRIMARY KEY,
+        aluno_id TEXT NOT NULL,
+        turma_id TEXT NOT NULL,
+        criado_em DATETIME NOT NULL,
+        UNIQUE (aluno_id, turma_id)
+    );
+    CREATE INDEX idx_at_aluno ON alunos_turmas (aluno_id);
+    CREATE INDEX idx_at_turma ON alunos_turmas (turma_id);
+    CREATE TABLE questionarios (
+        id TEXT PRIMARY KEY,
+        titulo TEXT NOT NULL,
+        turma_id TEXT,
+        ativo INTEGER NOT NULL DEFAULT 1,
+        criado_em DATETIME NOT NULL
+    );
+    CREATE TABLE perguntas (
+        id TEXT PRIMARY KEY,
+        questionario_id TEXT NOT NULL,
+        ordem INTEGER NOT NULL,
+        tipo TEXT NOT NULL,
+        enunciado TEXT NOT NULL
+    );
+    CREATE INDEX idx_p_questionario ON perguntas (questionario_id);
+    CREATE TABLE respostas (
+        id TEXT PRIMARY KEY,
+        questionario_id TEXT NOT NULL,
+        pergunta_id TEXT NOT NULL,
+        aluno_id TEXT NOT NULL,
+        turma_id TEXT,
+        valor_texto TEXT,
+        valor_num INTEGER,
+        valor_bool INTEGER,
+        valor_opcao TEXT,
+        criado_em DATETIME NOT NULL
+    );
+    CREATE INDEX idx_r_questionario ON respostas (questionario_id, criado_em);
+    CREATE INDEX idx_r_pergunta ON respostas (pergunta_id);
+    CREATE INDEX idx_r_aluno ON respostas (aluno_id, criado_em);
+    CREATE INDEX idx_r_turma ON respostas (turma_id);
+    CREATE INDEX idx_r_criado_em ON respostas (criado_em);
+    CREATE TABLE ml_aluno_stats (
+        aluno_id TEXT NOT NULL,
+        turma_id TEXT NOT NULL DEFAULT '',
+        total_respostas INTEGER NOT NULL DEFAULT 0,
+        soma_notas INTEGER NOT NULL DEFAULT 0,
+        total_notas INTEGER NOT NULL DEFAULT 0,
+        primeira_resposta DATETIME,
+        ultima_resposta DATETIME,
+        PRIMARY KEY (aluno_id, turma_id)
+    );
+    CREATE TABLE ml_aluno_questionarios (
+        aluno_id TEXT NOT NULL,
+        questionario_id TEXT NOT NULL,
+        PRIMARY KEY (aluno_id, questionario_id)
+    );
+    CREATE TABLE ml_rollup_state (
+        nome TEXT PRIMARY KEY,
+        watermark DATETIME NOT NULL,
+        atualizado_em DATETIME NOT NULL
+    );
+"""
+
+TIPOS = ['ESCALA', 'ESCALA', 'UNICA', 'BOOLEAN', 'TEXTO']
+OPCOES = ['Ótimo', 'Bom', 'Regular', 'Ruim']
+
+
+def _fmt(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def generate(conn: sqlite3.Connection, alunos: int = 200, turmas: int = 10,
+             turmas_por_aluno: int = 2, questionarios_por_turma: int = 4,
+             perguntas_por_questionario: int = 8, seed: int = 42) -> Dict[str, int]:
+    """
+    Criar o schema e popular com dados sintéticos.
+
+    O total de respostas fica em torno de
+    ``alunos * turmas_por_aluno * questionarios_por_turma * perguntas_por_questionario * 0.6``
+    (cada aluno responde, em média, 60% dos questionários das suas turmas).
+
+    Retorna a contagem de linhas por tabela.
+    """
+    rng = random.Random(seed)
+    agora = datetime(2025, 6, 30, 12, 0, 0)
+    inicio = agora - timedelta(days=365)
+
+    def uid():
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+
+    def data_aleatoria(depois_de: datetime = inicio) -> datetime:
+        span = max(int((agora - depois_de).total_seconds()), 1)
+        return depois_de + timedelta(seconds=rng.randrange(span))
+
+    conn.executescript(SCHEMA)
+
+    professor_id = uid()
+    users = [(professor_id, 'Professor', 'prof@example.com', 'PROF', 1, _fmt(inicio), _fmt(inicio))]
+    alunos_ids = []
+    for i in range(alunos):
+        aluno_id = uid()
+        alunos_ids.append(aluno_id)
+        ativo = 0 if rng.random() < 0.05 else 1
+        criado_em = _fmt(data_aleatoria())
+        users.append((aluno_id, f'Aluno {i}', f'aluno{i}@example.com', 'ALUNO', ativo, criado_em, criado_em))
+    conn.executemany('INSERT INTO users VALUES (?, ?, ?, ?, ?, ?, ?)', users)
+
+    turmas_ids = [uid() for _ in range(turmas)]
+    conn.executemany(
+        'INSERT INTO turmas VALUES (?, ?, ?, ?, 1, ?)',
+        [(t, f'Turma {i}', 2025, professor_id, _fmt(inicio)) for i, t in enumerate(turmas_ids)]
+    )
+
+    matriculas = {}
+    vinculos = []
+    for aluno_id in alunos_ids:
+        escolhidas = rng.sample(turmas_ids, min(turmas_por_aluno, turmas))
+        matriculas[aluno_id] = escolhidas
+        vinculos.extend((uid(), aluno_id, t, _fmt(inicio)) for t in escolhidas)
+    conn.executemany('INSERT INTO alunos_turmas VALUES (?, ?, ?, ?)', vinculos)
+
+    questionarios = []
+    perguntas = {}
+    linhas_perguntas = []
+    for turma_id in turmas_ids:
+        for j in range(questionarios_por_turma):
+            q_id = uid()
+            criado = data_aleatoria()
+            questionarios.append((q_id, f'Questionário {j}', turma_id, 1, _fmt(criado)))
+            perguntas[q_id] = []
+            for ordem in range(perguntas_por_questionario):
+                p_id = uid()
+                tipo = TIPOS[ordem % len(TIPOS)]
+                perguntas[q_id].append((p_id, tipo))
+                linhas_perguntas.append((p_id, q_id, ordem, tipo, f'Pergunta {ordem}'))
+    conn.executemany('INSERT INTO questionarios VALUES (?, ?, ?, ?, ?)', questionarios)
+    conn.executemany('INSERT INTO perguntas VALUES (?, ?, ?, ?, ?)', linhas_perguntas)
+
+    questionarios_por_turma_idx = {}
+    for q_id, _, turma_id, _, criado in questionarios:
+        questionarios_por_turma_idx.setdefault(turma_id, []).append((q_id, datetime.fromisoformat(criado)))
+
+    respostas = []
+    for aluno_id in alunos_ids:
+        engajamento = rng.betavariate(2, 1.3)  # maioria engajada, cauda de pouco engajados
+        nivel = rng.uniform(3, 9)               # nota "típica" do aluno
+        for turma_id in matriculas[aluno_id]:
+            for q_id, criado in questionarios_por_turma_idx[turma_id]:
+                if rng.random() > engajamento:
+                    continue
+                quando = _fmt(data_aleatoria(criado))
+                for p_id, tipo in perguntas[q_id]:
+                    valor_num = valor_opcao = valor_texto = valor_bool = None
+                    if tipo == 'ESCALA':
+                        valor_num = max(0, min(10, int(round(rng.gauss(nivel, 1.5)))))
+                    elif tipo == 'UNICA':
+                        valor_opcao = rng.choice(OPCOES)
+                    elif tipo == 'BOOLEAN':
+                        valor_bool = int(rng.random() < 0.7)
+                    else:
+                        valor_texto = 'Comentário livre'
+                    respostas.append((uid(), q_id, p_id, aluno_id, turma_id,
+                                      valor_texto, valor_num, valor_bool, valor_opcao, quando))
+        if len(respostas) >= 50000:
+            conn.executemany('INSERT INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', respostas)
+            respostas = []
+    conn.executemany('INSERT INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', respostas)
+    conn.commit()
+
+    return {
+        tabela: conn.execute(f'SELECT COUNT(*) FROM {tabela}').fetchone()[0]
+        for tabela in ('users', 'turmas', 'alunos_turmas', 'questionarios', 'perguntas', 'respostas')
+    }
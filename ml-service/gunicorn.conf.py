@@ -0,0 +1,73 @@
+"""
+Configuração do gunicorn para o ML Service
+Todos os valores podem ser ajustados por variáveis de ambiente
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+
+def _env_bool(nome: str, padrao: str) -> bool:
+    return os.getenv(nome, padrao).lower() in ('1', 'true', 'yes', 'on')
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+
+# Analytics e predições são CPU-bound (pandas/numpy/sklearn): um worker por
+# CPU; as threads cobrem a espera pelo MySQL dentro de cada worker
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Criar a aplicação (e carregar os modelos) no mestre, antes do fork: os
+# workers compartilham as páginas dos modelos por copy-on-write. Com preload,
+# um HUP reinicia os workers mas não recarrega o código; novos modelos são
+# aplicados sem reinício pelo registro de modelos
+preload_app = _env_bool('GUNICORN_PRELOAD', '1')
+
+# Requisição mais lenta que isso derruba o worker; no reload (HUP/TERM) os
+# workers têm graceful_timeout segundos para terminar as requisições em curso
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Reciclar workers periodicamente (0 = desativado)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 50)) if max_requests else 0
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None  # vazio desativa
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+# Métricas do Prometheus agregadas entre workers: cada processo grava seus
+# valores neste diretório (precisa estar definido antes de importar o app)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'ml-service-metrics'))
+
+
+def on_starting(server):
+    # Valores de uma execução anterior não podem ser somados aos desta
+    diretorio = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.makedirs(diretorio, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Os serviços são criados sob demanda; no preload, criá-los (e carregar
+    # os modelos) no mestre para que os workers herdem as páginas no fork
+    services = server.app.wsgi().extensions.get('ml_services')
+    if services is not None:
+        services.warm_up()
+    # Objetos criados no preload vão para a geração permanente do GC: as
+    # coletas nos workers não tocam essas páginas e o copy-on-write se mantém
+    gc.collect()
+    gc.freeze()
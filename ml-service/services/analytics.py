@@ -5,24 +5,43 @@ Análises estatísticas e identificação de padrões
 from typing import Dict, List, Any
 from datetime import datetime, timedelta
 import numpy as np
+import pandas as pd
+
+from services.cache import cached, GLOBAL_TAG
+from services.pagination import fatiar_pagina
+from services.profiling import medir_etapa
+from services.stats import FAIXAS_ENGAJAMENTO, FAIXAS_NOTAS, faixas, pagina, resumo, ultimos_k
+from services.trends import JANELA_NOTAS, classificar, tendencias_do_frame
+
+def _coluna(df: pd.DataFrame, coluna: str, nulos: float = np.nan) -> np.ndarray:
+    """Coluna numérica do frame como float64, com nulos substituídos por ``nulos``"""
+    if coluna not in df.columns:
+        return np.full(len(df), nulos, dtype=float)
+    return pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=float, na_value=nulos)
+
 
 class AnalyticsService:
-    def __init__(self, db_service):
+    def __init__(self, db_service, cache=None):
         self.db = db_service
+        self.cache = cache
     
+    @medir_etapa('analytics')
+    @cached('overview', lambda: [GLOBAL_TAG])
     def get_overview(self) -> Dict[str, Any]:
         """Obter visão geral das métricas do sistema"""
         try:
-            alunos = self.db.get_alunos_data()
+            alunos = self.db.get_alunos_data(as_frame=True)
             questionarios = self.db.get_questionarios_stats()
             
             total_alunos = len(alunos)
             total_questionarios = len(questionarios)
             
-            # Calcular médias
-            alunos_ativos = sum(1 for a in alunos if a.get('questionarios_respondidos', 0) > 0)
-            media_respostas = np.mean([a.get('questionarios_respondidos', 0) for a in alunos]) if alunos else 0
-            media_notas = np.mean([a.get('media_notas', 0) or 0 for a in alunos if a.get('media_notas')]) if alunos else 0
+            # Calcular médias (notas nulas ou zeradas não entram)
+            respondidos = _coluna(alunos, 'questionarios_respondidos', 0)
+            notas = _coluna(alunos, 'media_notas')
+            alunos_ativos = int(np.count_nonzero(respondidos > 0))
+            media_respostas = resumo(respondidos)['media']
+            media_notas = resumo(notas, notas != 0)['media']
             
             # Taxa de engajamento
             taxa_engajamento = (alunos_ativos / total_alunos * 100) if total_alunos > 0 else 0
@@ -41,13 +60,20 @@ class AnalyticsService:
                 'error': str(e)
             }
     
-    def get_turma_analytics(self, turma_id: str) -> Dict[str, Any]:
-        """Análise detalhada de uma turma"""
+    @medir_etapa('analytics')
+    @cached('turma', lambda turma_id, **_: [f'turma:{turma_id}'])
+    def get_turma_analytics(self, turma_id: str, limit: int = 5, offset: int = 0) -> Dict[str, Any]:
+        """
+        Análise detalhada de uma turma.
+
+        ``topAlunos`` e ``alunosEmRisco`` são páginas de ``limit`` alunos a
+        partir das duas pontas do ranking por questionários respondidos
+        (``offset`` conta a partir de cada ponta).
+        """
         try:
-            alunos = self.db.get_alunos_data(turma_id)
-            engagement = self.db.get_engagement_data(turma_id)
+            alunos = self.db.get_student_features(turma_id, as_frame=True)
             
-            if not alunos:
+            if alunos.empty:
                 return {
                     'turmaId': turma_id,
                     'message': 'Turma não encontrada ou sem alunos'
@@ -55,45 +81,22 @@ class AnalyticsService:
             
             # Estatísticas básicas
             total_alunos = len(alunos)
-            alunos_ativos = sum(1 for a in alunos if a.get('questionarios_respondidos', 0) > 0)
-            
-            # Distribuição de notas
-            notas = [a.get('media_notas', 0) or 0 for a in alunos if a.get('media_notas')]
-            if notas:
-                distribuicao_notas = {
-                    'excelente': sum(1 for n in notas if n >= 8),
-                    'bom': sum(1 for n in notas if 6 <= n < 8),
-                    'regular': sum(1 for n in notas if 4 <= n < 6),
-                    'baixo': sum(1 for n in notas if n < 4)
-                }
-                media_notas = round(np.mean(notas), 2)
-                mediana_notas = round(np.median(notas), 2)
-            else:
-                distribuicao_notas = {
-                    'excelente': 0,
-                    'bom': 0,
-                    'regular': 0,
-                    'baixo': 0
-                }
-                media_notas = 0
-                mediana_notas = 0
+            respondidos = _coluna(alunos, 'questionarios_respondidos', 0)
+            alunos_ativos = int(np.count_nonzero(respondidos > 0))
             
-            # Análise de engajamento
-            engagement_dict = {e['aluno_id']: e for e in engagement}
+            # Distribuição de notas (notas nulas ou zeradas não entram)
+            notas = _coluna(alunos, 'media_notas')
+            estatisticas_notas = resumo(notas, notas != 0, mediana=True, faixas_de=FAIXAS_NOTAS)
+            distribuicao_notas = estatisticas_notas['faixas']
+            media_notas = round(estatisticas_notas['media'], 2)
+            mediana_notas = round(estatisticas_notas['mediana'], 2)
             
-            alunos_detalhados = []
-            for aluno in alunos:
-                eng = engagement_dict.get(aluno['id'], {})
-                alunos_detalhados.append({
-                    'id': aluno['id'],
-                    'nome': aluno['nome'],
-                    'questionariosRespondidos': aluno.get('questionarios_respondidos', 0),
-                    'mediaNotas': round(aluno.get('media_notas', 0) or 0, 2),
-                    'diasAtivo': eng.get('dias_ativo', 0) or 0
-                })
-            
-            # Ordenar por engajamento
-            alunos_detalhados.sort(key=lambda x: x['questionariosRespondidos'], reverse=True)
+            # Análise de engajamento: ranking por questionários respondidos
+            # (estável, maior primeiro) só nas pontas, sem ordenar a turma toda
+            topo = pagina(respondidos, limit, offset)
+            fim = ultimos_k(respondidos, offset + limit)
+            fim = fim[:max(len(fim) - offset, 0)]
+            detalhes = {i: self._detalhar_aluno(alunos, i) for i in dict.fromkeys([*topo, *fim])}
             
             return {
                 'turmaId': turma_id,
@@ -103,8 +106,8 @@ class AnalyticsService:
                 'mediaNotas': media_notas,
                 'medianaNotas': mediana_notas,
                 'distribuicaoNotas': distribuicao_notas,
-                'topAlunos': alunos_detalhados[:5],
-                'alunosEmRisco': alunos_detalhados[-5:]
+                'topAlunos': [detalhes[i] for i in topo],
+                'alunosEmRisco': [detalhes[i] for i in fim]
             }
         except Exception as e:
             print(f"Erro em get_turma_analytics: {e}")
@@ -113,24 +116,46 @@ class AnalyticsService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def _detalhar_aluno(alunos: pd.DataFrame, i: int) -> Dict[str, Any]:
+        """Resumo de um aluno (linha ``i`` do frame de features) para a resposta JSON"""
+        linha = alunos.iloc[i]
+        media = linha.get('media_notas')
+        dias_ativo = linha.get('dias_ativo')
+        return {
+            'id': linha['id'],
+            'nome': linha['nome'],
+            'questionariosRespondidos': int(linha.get('questionarios_respondidos', 0) or 0),
+            'mediaNotas': round(float(media), 2) if pd.notna(media) else 0,
+            'diasAtivo': int(dias_ativo) if pd.notna(dias_ativo) else 0
+        }
+    
+    @medir_etapa('analytics')
+    @cached('aluno', lambda aluno_id: [f'aluno:{aluno_id}'])
     def get_aluno_analytics(self, aluno_id: str) -> Dict[str, Any]:
-        """Análise detalhada de um aluno"""
+        """
+        Análise detalhada de um aluno.
+
+        Os agregados vêm de uma consulta agrupada, a tendência das últimas
+        ``JANELA_NOTAS`` notas e o histórico recente de uma página de 10
+        respostas: o custo não cresce com o histórico.
+        """
         try:
-            respostas = self.db.get_respostas_aluno(aluno_id)
+            resumo_respostas = self.db.get_resumo_respostas_aluno(aluno_id)
             
-            if not respostas:
+            if not resumo_respostas or not resumo_respostas['total_respostas']:
                 return {
                     'alunoId': aluno_id,
                     'message': 'Aluno não possui respostas registradas'
                 }
             
             # Estatísticas básicas
-            total_respostas = len(respostas)
-            questionarios_unicos = len(set(r['questionario_id'] for r in respostas))
+            total_respostas = resumo_respostas['total_respostas']
+            questionarios_unicos = resumo_respostas['questionarios_respondidos']
             
             # Análise temporal
-            primeira_resposta = min(r['criado_em'] for r in respostas)
-            ultima_resposta = max(r['criado_em'] for r in respostas)
+            primeira_resposta = resumo_respostas['primeira_resposta']
+            ultima_resposta = resumo_respostas['ultima_resposta']
             
             if isinstance(primeira_resposta, str):
                 primeira_resposta = datetime.fromisoformat(primeira_resposta.replace('Z', '+00:00'))
@@ -140,12 +165,11 @@ class AnalyticsService:
             dias_ativo = (ultima_resposta - primeira_resposta).days
             
             # Análise de notas
-            notas = [r['valor_num'] for r in respostas if r.get('valor_num') is not None]
-            if notas:
-                media_notas = round(np.mean(notas), 2)
-                melhor_nota = max(notas)
-                pior_nota = min(notas)
-                tendencia_notas = self._calcular_tendencia(notas)
+            if resumo_respostas['total_notas']:
+                media_notas = round(float(resumo_respostas['media_notas']), 2)
+                melhor_nota = resumo_respostas['melhor_nota']
+                pior_nota = resumo_respostas['pior_nota']
+                tendencia_notas = self._calcular_tendencia(aluno_id)
             else:
                 media_notas = None
                 melhor_nota = None
@@ -153,15 +177,8 @@ class AnalyticsService:
                 tendencia_notas = 'sem_dados'
             
             # Histórico recente (últimas 10 respostas)
-            respostas_recentes = sorted(respostas, key=lambda r: r['criado_em'], reverse=True)[:10]
-            historico_recente = [
-                {
-                    'data': r['criado_em'].isoformat() if hasattr(r['criado_em'], 'isoformat') else str(r['criado_em']),
-                    'questionario': r.get('questionario_titulo', 'N/A'),
-                    'valor': r.get('valor_num') or r.get('valor_texto') or r.get('valor_opcao')
-                }
-                for r in respostas_recentes
-            ]
+            respostas_recentes = self.db.get_respostas_aluno_page(aluno_id, 10)
+            historico_recente = [self._item_historico(r) for r in respostas_recentes]
             
             return {
                 'alunoId': aluno_id,
@@ -183,52 +200,77 @@ class AnalyticsService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def _item_historico(r: Dict[str, Any]) -> Dict[str, Any]:
+        """Resposta do histórico do aluno no formato da resposta JSON"""
+        return {
+            'data': r['criado_em'].isoformat() if hasattr(r['criado_em'], 'isoformat') else str(r['criado_em']),
+            'questionario': r.get('questionario_titulo', 'N/A'),
+            'valor': r.get('valor_num') or r.get('valor_texto') or r.get('valor_opcao')
+        }
+    
+    @medir_etapa('analytics')
+    def get_aluno_respostas(self, aluno_id: str, limit: int = 20, apos=None) -> Dict[str, Any]:
+        """
+        Histórico de respostas de um aluno, da mais recente para a mais
+        antiga, em páginas de ``limit``. ``proximoCursor`` (None na última
+        página) continua a partir da última resposta devolvida.
+        """
+        try:
+            linhas = self.db.get_respostas_aluno_page(aluno_id, limit + 1, apos)
+            pagina, proximo = fatiar_pagina(linhas, limit)
+            return {
+                'alunoId': aluno_id,
+                'respostas': [
+                    {'id': r['id'], 'pergunta': r.get('enunciado'), **self._item_historico(r)}
+                    for r in pagina
+                ],
+                'proximoCursor': proximo
+            }
+        except Exception as e:
+            print(f"Erro em get_aluno_respostas: {e}")
+            return {
+                'alunoId': aluno_id,
+                'error': str(e)
+            }
+    
+    @medir_etapa('analytics')
+    @cached('engagement', lambda turma_id=None: [f'turma:{turma_id}' if turma_id else GLOBAL_TAG])
     def get_engagement_patterns(self, turma_id: str = None) -> Dict[str, Any]:
         """Identificar padrões de engajamento"""
         try:
-            engagement = self.db.get_engagement_data(turma_id)
+            engagement = self.db.get_engagement_data(turma_id, as_frame=True)
             
-            if not engagement:
+            if engagement.empty:
                 return {
                     'message': 'Sem dados de engajamento disponíveis'
                 }
             
-            # Classificar alunos por nível de engajamento
-            alto_engajamento = []
-            medio_engajamento = []
-            baixo_engajamento = []
-            
-            for aluno in engagement:
-                questionarios = aluno.get('questionarios_respondidos', 0)
-                
-                if questionarios >= 5:
-                    alto_engajamento.append(aluno['aluno_nome'])
-                elif questionarios >= 2:
-                    medio_engajamento.append(aluno['aluno_nome'])
-                else:
-                    baixo_engajamento.append(aluno['aluno_nome'])
+            # Classificar alunos por nível de engajamento (0 baixo, 1 médio, 2 alto)
+            questionarios = _coluna(engagement, 'questionarios_respondidos', 0)
+            nivel = faixas(questionarios, FAIXAS_ENGAJAMENTO[0])
+            nomes = engagement['aluno_nome'].to_numpy()
+            alto_engajamento = nomes[nivel == 2].tolist()
+            medio_engajamento = nomes[nivel == 1].tolist()
+            baixo_engajamento = nomes[nivel == 0].tolist()
             
             # Padrões temporais
-            alunos_com_dados = [a for a in engagement if a.get('dias_ativo') is not None]
-            if alunos_com_dados:
-                media_dias_ativo = round(np.mean([a['dias_ativo'] for a in alunos_com_dados]), 2)
-            else:
-                media_dias_ativo = 0
+            media_dias_ativo = round(resumo(_coluna(engagement, 'dias_ativo'))['media'], 2)
             
             return {
                 'totalAlunos': len(engagement),
                 'altoEngajamento': {
                     'total': len(alto_engajamento),
-                    'percentual': round(len(alto_engajamento) / len(engagement) * 100, 2) if engagement else 0,
+                    'percentual': round(len(alto_engajamento) / len(engagement) * 100, 2),
                     'alunos': alto_engajamento[:10]  # Top 10
                 },
                 'medioEngajamento': {
                     'total': len(medio_engajamento),
-                    'percentual': round(len(medio_engajamento) / len(engagement) * 100, 2) if engagement else 0
+                    'percentual': round(len(medio_engajamento) / len(engagement) * 100, 2)
                 },
                 'baixoEngajamento': {
                     'total': len(baixo_engajamento),
-                    'percentual': round(len(baixo_engajamento) / len(engagement) * 100, 2) if engagement else 0,
+                    'percentual': round(len(baixo_engajamento) / len(engagement) * 100, 2),
                     'alunos': baixo_engajamento[:10]  # Top 10
                 },
                 'mediaDiasAtivo': media_dias_ativo,
@@ -240,48 +282,53 @@ class AnalyticsService:
                 'error': str(e)
             }
     
+    @medir_etapa('analytics')
+    @cached('responses', lambda questionario_id: [f'questionario:{questionario_id}'])
     def get_response_patterns(self, questionario_id: str) -> Dict[str, Any]:
         """Identificar padrões nas respostas de um questionário"""
         try:
-            query = """
-                SELECT 
-                    p.enunciado,
-                    p.tipo,
-                    COUNT(r.id) as total_respostas,
-                    AVG(CASE WHEN r.valor_num IS NOT NULL THEN r.valor_num END) as media,
-                    GROUP_CONCAT(r.valor_opcao) as opcoes_escolhidas
-                FROM perguntas p
-                LEFT JOIN respostas r ON p.id = r.pergunta_id
-                WHERE p.questionario_id = %s
-                GROUP BY p.id, p.enunciado, p.tipo
-                ORDER BY p.ordem
-            """
-            
-            patterns = self.db.execute_query(query, (questionario_id,))
-            
+            linhas = self.db.get_perguntas_stats(questionario_id)
+
+            # Linhas por (pergunta, opção) já na ordem das perguntas: agrupa em uma passada
+            perguntas = {}
+            for linha in linhas:
+                pergunta = perguntas.get(linha['pergunta_id'])
+                if pergunta is None:
+                    pergunta = perguntas[linha['pergunta_id']] = {
+                        'enunciado': linha['enunciado'],
+                        'tipo': linha['tipo'],
+                        'total': 0,
+                        'soma_num': 0.0,
+                        'total_num': 0,
+                        'distribuicao': {},
+                    }
+                total = int(linha['total_respostas'] or 0)
+                pergunta['total'] += total
+                if linha['total_num']:
+                    pergunta['soma_num'] += float(linha['soma_num'])
+                    pergunta['total_num'] += int(linha['total_num'])
+                if linha['valor_opcao'] is not None and total:
+                    pergunta['distribuicao'][linha['valor_opcao']] = total
+
             analise_perguntas = []
-            for p in patterns:
+            for pergunta in perguntas.values():
                 item = {
-                    'enunciado': p['enunciado'],
-                    'tipo': p['tipo'],
-                    'totalRespostas': p['total_respostas'] or 0
+                    'enunciado': pergunta['enunciado'],
+                    'tipo': pergunta['tipo'],
+                    'totalRespostas': pergunta['total']
                 }
-                
-                if p['media'] is not None:
-                    item['media'] = round(float(p['media']), 2)
-                
-                if p['opcoes_escolhidas']:
-                    # Contar opções mais escolhidas
-                    opcoes = p['opcoes_escolhidas'].split(',')
-                    from collections import Counter
-                    distribuicao = Counter(opcoes)
-                    item['distribuicao'] = dict(distribuicao)
-                
+
+                if pergunta['total_num']:
+                    item['media'] = round(pergunta['soma_num'] / pergunta['total_num'], 2)
+
+                if pergunta['distribuicao']:
+                    item['distribuicao'] = pergunta['distribuicao']
+
                 analise_perguntas.append(item)
-            
+
             return {
                 'questionarioId': questionario_id,
-                'totalPerguntas': len(patterns),
+                'totalPerguntas': len(perguntas),
                 'analise': analise_perguntas
             }
         except Exception as e:
@@ -291,25 +338,17 @@ class AnalyticsService:
                 'error': str(e)
             }
     
-    def _calcular_tendencia(self, valores: List[float]) -> str:
-        """Calcular tendência de uma série temporal"""
-        if len(valores) < 3:
+    def _calcular_tendencia(self, aluno_id: str) -> str:
+        """
+        Tendência das últimas notas do aluno pela inclinação de Theil–Sen
+        no tempo: a variação ajustada no período acima de 0.5 ponto é
+        crescente, abaixo de -0.5 decrescente
+        """
+        notas = self.db.get_series_notas(JANELA_NOTAS, aluno_id=aluno_id)
+        _, tendencias = tendencias_do_frame(notas)
+        if not len(tendencias['total']):
             return 'dados_insuficientes'
-        
-        primeira_metade = valores[:len(valores)//2]
-        segunda_metade = valores[len(valores)//2:]
-        
-        media_primeira = np.mean(primeira_metade)
-        media_segunda = np.mean(segunda_metade)
-        
-        diferenca = media_segunda - media_primeira
-        
-        if diferenca > 0.5:
-            return 'crescente'
-        elif diferenca < -0.5:
-            return 'decrescente'
-        else:
-            return 'estavel'
+        return classificar(tendencias, limiar=0.5)[0]
     
     def _generate_engagement_insights(self, alto: int, medio: int, baixo: int) -> List[str]:
         """Gerar insights sobre engajamento"""
@@ -0,0 +1,189 @@
+"""
+Cache de resultados do AnalyticsService
+TTL por endpoint, limite LRU e invalidação por turma/aluno/questionário
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from services.metrics import CACHE_CONSULTAS
+
+# TTL padrão (segundos) por endpoint; sobrescrito por ML_CACHE_TTL_<ENDPOINT>
+DEFAULT_TTLS = {
+    'overview': 60,
+    'turma': 60,
+    'aluno': 60,
+    'engagement': 60,
+    'responses': 120,
+}
+
+GLOBAL_TAG = 'global'
+
+
+class ResultCache:
+    """
+    Cache LRU thread-safe em memória.
+
+    Cada entrada guarda o instante de expiração e um conjunto de tags
+    (``global``, ``turma:<id>``, ``aluno:<id>``, ``questionario:<id>``) usado
+    para invalidação seletiva quando chegam novas respostas.
+    """
+
+    def __init__(self, max_entries: int = None, ttls: Dict[str, float] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('ML_CACHE_MAX_ENTRIES', 512))
+        self.ttls = dict(DEFAULT_TTLS)
+        for endpoint in self.ttls:
+            env = os.getenv(f'ML_CACHE_TTL_{endpoint.upper()}')
+            if env is not None:
+                self.ttls[endpoint] = float(env)
+        self.ttls.update(ttls or {})
+
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any, Tuple[str, ...]]]' = OrderedDict()
+        self._tags: Dict[str, set] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, endpoint: str, key: Tuple) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._counters[endpoint]['hits'] += 1
+                CACHE_CONSULTAS.labels(endpoint, 'hit').inc()
+                return True, entry[1]
+            if entry is not None:
+                self._remove_locked(key)
+            self._counters[endpoint]['misses'] += 1
+            CACHE_CONSULTAS.labels(endpoint, 'miss').inc()
+            return False, None
+
+    def set(self, endpoint: str, key: Tuple, value: Any, tags: Iterable[str]):
+        ttl = self.ttls.get(endpoint, 60)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._evictions += 1
+
+    def _remove_locked(self, key: Tuple):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remover entradas marcadas com qualquer uma das tags (aceita prefixo terminado em ':')"""
+        removidas = 0
+        with self._lock:
+            for tag in tags:
+                if tag.endswith(':'):
+                    alvo = [t for t in self._tags if t.startswith(tag)]
+                else:
+                    alvo = [tag]
+                for t in alvo:
+                    for key in list(self._tags.get(t, ())):
+                        if key in self._entries:
+                            self._remove_locked(key)
+                            removidas += 1
+            self._invalidations += removidas
+        return removidas
+
+    def invalidate(self, turma_id: str = None, aluno_id: str = None, questionario_id: str = None) -> int:
+        """
+        Invalidar resultados afetados por uma nova resposta.
+
+        Agregados globais sempre são invalidados. Sem turma informada, uma
+        resposta de aluno pode afetar qualquer turma dele, então todas as
+        entradas de turma são removidas. Sem nenhum escopo, limpa tudo.
+        """
+        if not (turma_id or aluno_id or questionario_id):
+            return self.clear()
+
+        tags = [GLOBAL_TAG]
+        if turma_id:
+            tags.append(f'turma:{turma_id}')
+        elif aluno_id:
+            tags.append('turma:')
+        if aluno_id:
+            tags.append(f'aluno:{aluno_id}')
+        if questionario_id:
+            tags.append(f'questionario:{questionario_id}')
+        return self.invalidate_tags(tags)
+
+    def clear(self) -> int:
+        with self._lock:
+            removidas = len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+            self._invalidations += removidas
+        return removidas
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de hit/miss por endpoint e ocupação do cache"""
+        with self._lock:
+            endpoints = {}
+            total_hits = total_misses = 0
+            for endpoint, c in self._counters.items():
+                total = c['hits'] + c['misses']
+                endpoints[endpoint] = {
+                    **c,
+                    'hitRate': round(c['hits'] / total, 4) if total else 0,
+                    'ttl': self.ttls.get(endpoint),
+                }
+                total_hits += c['hits']
+                total_misses += c['misses']
+            total = total_hits + total_misses
+            return {
+                'entradas': len(self._entries),
+                'maxEntradas': self.max_entries,
+                'hits': total_hits,
+                'misses': total_misses,
+                'hitRate': round(total_hits / total, 4) if total else 0,
+                'evictions': self._evictions,
+                'invalidacoes': self._invalidations,
+                'endpoints': endpoints,
+            }
+
+
+def cached(endpoint: str, tags: Callable[..., List[str]]):
+    """
+    Decorator para métodos de serviço com atributo ``cache`` (ResultCache ou None).
+
+    A chave é o endpoint mais os argumentos (posicionais e nomeados). Resultados
+    com ``error`` não são armazenados. Os valores são compartilhados entre
+    requisições e não devem ser modificados por quem os recebe.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return fn(self, *args, **kwargs)
+            key = (endpoint,) + args + tuple(sorted(kwargs.items()))
+            hit, value = cache.get(endpoint, key)
+            if hit:
+                return value
+            value = fn(self, *args, **kwargs)
+            if not (isinstance(value, dict) and 'error' in value):
+                cache.set(endpoint, key, value, tags(*args, **kwargs))
+            return value
+        return wrapper
+    return decorator
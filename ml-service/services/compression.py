@@ -0,0 +1,46 @@
+"""
+Compressão das respostas HTTP (gzip / brotli) negociada pelo Accept-Encoding
+"""
+import gzip
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, só gzip
+    brotli = None
+
+# Tipos que valem a pena comprimir (JSON das rotas e texto do /metrics)
+TIPOS_COMPRIMIVEIS = ('application/json', 'text/')
+
+
+def codificacoes_disponiveis() -> list:
+    """Codificações suportadas, em ordem de preferência do servidor"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def escolher_codificacao(accept_encodings, disponiveis: Iterable[str]) -> Optional[str]:
+    """
+    Melhor codificação aceita pelo cliente (``request.accept_encodings``).
+    Respeita os pesos ``q`` do cliente; no empate vale a ordem de ``disponiveis``.
+    """
+    return accept_encodings.best_match(list(disponiveis))
+
+
+def comprimivel(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith(TIPOS_COMPRIMIVEIS)
+
+
+def comprimir(dados: bytes, codificacao: str, nivel_gzip: int = 6, qualidade_brotli: int = 4) -> bytes:
+    """
+    Comprimir o corpo da resposta.
+
+    Os níveis padrão privilegiam latência: brotli 4 já comprime JSON melhor
+    que gzip 6 em tempo parecido; as qualidades altas (10-11) são para
+    conteúdo estático, não para respostas geradas a cada pedido.
+    """
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=qualidade_brotli, mode=brotli.MODE_TEXT)
+    if codificacao == 'gzip':
+        # mtime=0: mesma entrada gera os mesmos bytes
+        return gzip.compress(dados, compresslevel=nivel_gzip, mtime=0)
+    raise ValueError(f'Codificação não suportada: {codificacao}')
@@ -3,7 +3,364 @@ Serviço de conexão com o banco de dados
 """
 import pymysql
 import os
-from typing import List, Dict, Any
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple, Union
+
+from services.metrics import medir_consulta
+from services.pagination import filtro_keyset
+from services.rollup import AlunoStatsRollup
+
+if TYPE_CHECKING:
+    # pandas só é importado ao montar o primeiro DataFrame
+    import pandas as pd
+
+# Tipos das colunas de agregados por aluno no modo colunar (as_frame=True)
+ALUNO_FRAME_DTYPES = {
+    'id': 'category',
+    'aluno_id': 'category',
+    'turma_id': 'category',
+    'criado_em': 'datetime',
+    'primeira_resposta': 'datetime',
+    'ultima_resposta': 'datetime',
+    'total_turmas': 'int',
+    'questionarios_respondidos': 'int',
+    'total_respostas': 'int',
+    'media_notas': 'float',
+    'dias_ativo': 'float',
+}
+
+# Versão dos dados por escopo (ver get_data_version). Os COUNT/MAX em respostas
+# usam os índices (aluno_id, criado_em) e (questionario_id, criado_em)
+VERSAO_DADOS_SQL = {
+    'global': """
+        SELECT
+            (SELECT COUNT(*) FROM respostas) as respostas,
+            (SELECT MAX(criado_em) FROM respostas) as ultima_resposta,
+            (SELECT COUNT(*) FROM users WHERE role = 'ALUNO') as alunos,
+            (SELECT SUM(ativo) FROM users WHERE role = 'ALUNO') as alunos_ativos,
+            (SELECT MAX(atualizado_em) FROM users WHERE role = 'ALUNO') as ultimo_aluno,
+            (SELECT COUNT(*) FROM alunos_turmas) as matriculas,
+            (SELECT COUNT(*) FROM questionarios) as questionarios,
+            (SELECT COUNT(*) FROM perguntas) as perguntas
+    """,
+    # Os agregados de turma consideram todas as respostas dos alunos matriculados.
+    # Os campos de users (ativo, nome...) também aparecem nos corpos: desativar
+    # ou renomear um aluno muda a soma de ``ativo`` ou o ``atualizado_em``
+    'turma': """
+        SELECT
+            COUNT(*) as respostas,
+            MAX(r.criado_em) as ultima_resposta,
+            (SELECT COUNT(*) FROM alunos_turmas WHERE turma_id = %s) as matriculas,
+            (SELECT MAX(criado_em) FROM alunos_turmas WHERE turma_id = %s) as ultima_matricula,
+            (SELECT SUM(u.ativo) FROM users u JOIN alunos_turmas m ON m.aluno_id = u.id
+             WHERE m.turma_id = %s) as alunos_ativos,
+            (SELECT MAX(u.atualizado_em) FROM users u JOIN alunos_turmas m ON m.aluno_id = u.id
+             WHERE m.turma_id = %s) as ultimo_aluno
+        FROM respostas r
+        WHERE r.aluno_id IN (SELECT aluno_id FROM alunos_turmas WHERE turma_id = %s)
+    """,
+    'aluno': """
+        SELECT
+            COUNT(*) as respostas,
+            MAX(criado_em) as ultima_resposta,
+            (SELECT ativo FROM users WHERE id = %s) as ativo,
+            (SELECT atualizado_em FROM users WHERE id = %s) as atualizado_em
+        FROM respostas
+        WHERE aluno_id = %s
+    """,
+    'questionario': """
+        SELECT
+            COUNT(*) as respostas,
+            MAX(criado_em) as ultima_resposta,
+            (SELECT COUNT(*) FROM perguntas WHERE questionario_id = %s) as perguntas
+        FROM respostas
+        WHERE questionario_id = %s
+    """,
+}
+
+# Estado do rollup: o watermark e ``atualizado_em`` (que muda a cada rodada que
+# soma respostas e no rebuild) determinam o conteúdo de ``ml_aluno_stats``
+_WATERMARK_ROLLUP = f"(SELECT watermark FROM ml_rollup_state WHERE nome = '{AlunoStatsRollup.NOME}')"
+_ESTADO_ROLLUP = f"""{_WATERMARK_ROLLUP} as rollup_watermark,
+            (SELECT atualizado_em FROM ml_rollup_state WHERE nome = '{AlunoStatsRollup.NOME}') as rollup_atualizado_em"""
+
+# Versão dos escopos cujos endpoints leem agregados de ``ml_aluno_stats``,
+# usada com o rollup ativo: acompanha o rollup e não as respostas mais novas
+# que o watermark. O global não varre respostas (O(alunos), como o corpo);
+# as rotas do aluno leem ``respostas`` direto e ficam com a versão ao vivo
+VERSAO_DADOS_ROLLUP_SQL = {
+    'global': f"""
+        SELECT
+            {_ESTADO_ROLLUP},
+            (SELECT COUNT(*) FROM users WHERE role = 'ALUNO') as alunos,
+            (SELECT SUM(ativo) FROM users WHERE role = 'ALUNO') as alunos_ativos,
+            (SELECT MAX(atualizado_em) FROM users WHERE role = 'ALUNO') as ultimo_aluno,
+            (SELECT COUNT(*) FROM alunos_turmas) as matriculas,
+            (SELECT COUNT(*) FROM questionarios) as questionarios,
+            (SELECT COUNT(*) FROM perguntas) as perguntas
+    """,
+    'turma': f"""
+        SELECT
+            COUNT(*) as respostas,
+            MAX(r.criado_em) as ultima_resposta,
+            (SELECT COUNT(*) FROM alunos_turmas WHERE turma_id = %s) as matriculas,
+            (SELECT MAX(criado_em) FROM alunos_turmas WHERE turma_id = %s) as ultima_matricula,
+            (SELECT SUM(u.ativo) FROM users u JOIN alunos_turmas m ON m.aluno_id = u.id
+             WHERE m.turma_id = %s) as alunos_ativos,
+            (SELECT MAX(u.atualizado_em) FROM users u JOIN alunos_turmas m ON m.aluno_id = u.id
+             WHERE m.turma_id = %s) as ultimo_aluno,
+            {_ESTADO_ROLLUP}
+        FROM respostas r
+        WHERE r.aluno_id IN (SELECT aluno_id FROM alunos_turmas WHERE turma_id = %s)
+          AND r.criado_em <= {_WATERMARK_ROLLUP}
+    """,
+}
+
+COLUNAS_STUDENT_FEATURES = """
+                u.id, u.nome, u.email, u.criado_em,
+                COALESCE(t.total_turmas, 0) as total_turmas,
+                COALESCE(r.questionarios_respondidos, 0) as questionarios_respondidos,
+                r.media_notas,
+                COALESCE(r.total_respostas, 0) as total_respostas,
+                r.primeira_resposta,
+                r.ultima_resposta,
+                DATEDIFF(r.ultima_resposta, r.primeira_resposta) as dias_ativo
+"""
+
+COLUNAS_ALUNOS_DATA = """
+                u.id, u.nome, u.email, u.criado_em,
+                COALESCE(t.total_turmas, 0) as total_turmas,
+                COALESCE(r.questionarios_respondidos, 0) as questionarios_respondidos,
+                r.media_notas
+"""
+
+
+def _converter_coluna(serie: 'pd.Series', tipo: str) -> 'pd.Series':
+    import pandas as pd
+
+    if tipo == 'datetime':
+        return pd.to_datetime(serie)
+    if tipo == 'float':
+        return pd.to_numeric(serie, errors='coerce').astype('float64')
+    if tipo == 'int':
+        return pd.to_numeric(serie, errors='coerce').fillna(0).astype('int64')
+    return serie.astype(tipo)
+
+
+def to_frame(linhas: Sequence[Sequence], colunas: List[str], dtypes: Dict[str, str] = None) -> 'pd.DataFrame':
+    """
+    Montar um DataFrame a partir de linhas em tupla.
+
+    ``Decimal`` vira float; ``dtypes`` mapeia coluna para ``datetime``,
+    ``float``, ``int`` (nulos viram 0) ou qualquer dtype do pandas
+    (ex.: ``category`` para ids repetidos).
+    """
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(list(linhas), columns=colunas, coerce_float=True)
+    for coluna, tipo in (dtypes or {}).items():
+        if coluna in df.columns:
+            df[coluna] = _converter_coluna(df[coluna], tipo)
+    return df
+
+
+class _PooledConnection:
+    """Conexão física mantida pelo pool, com os instantes de criação e último uso"""
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Pool de conexões limitado e thread-safe.
+
+    - ``min_size``: conexões ociosas preservadas mesmo após ``idle_timeout``
+    - ``max_size``: limite de conexões abertas ao mesmo tempo
+    - ``idle_timeout``: segundos até uma conexão ociosa excedente ser fechada
+    - ``max_lifetime``: segundos até uma conexão ser reciclada (evita conexões
+      derrubadas pelo ``wait_timeout`` do MySQL)
+    - ``ping_interval``: conexões ociosas há mais tempo que isso passam por
+      ``ping()`` antes de serem entregues
+    - ``checkout_timeout``: tempo máximo de espera por uma conexão livre
+    """
+
+    def __init__(self, connect: Callable, min_size: int = 1, max_size: int = 10,
+                 idle_timeout: float = 300, max_lifetime: float = 3600,
+                 ping_interval: float = 5, checkout_timeout: float = 10):
+        if max_size < 1:
+            raise ValueError('max_size deve ser >= 1')
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()  # LIFO: conexões quentes são reutilizadas primeiro
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            'criadas': 0,
+            'fechadas': 0,
+            'checkouts': 0,
+            'esperas': 0,
+            'timeouts': 0,
+            'falhasHealthCheck': 0,
+            'recicladas': 0,
+            'expiradasOciosas': 0,
+        }
+
+    # ---- ciclo de vida das conexões ----
+    def _open(self) -> _PooledConnection:
+        conn = self._connect()
+        with self._cond:
+            self._stats['criadas'] += 1
+        return _PooledConnection(conn)
+
+    def _close(self, entry: _PooledConnection):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        self._stats['fechadas'] += 1
+
+    def _evict_idle_locked(self, now: float):
+        """Fechar conexões ociosas expiradas acima do mínimo (lock já adquirido)"""
+        # As mais antigas ficam no início da deque
+        while self._idle and self._size > self.min_size:
+            entry = self._idle[0]
+            if now - entry.last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._stats['expiradasOciosas'] += 1
+            self._close(entry)
+
+    def _check(self, entry: _PooledConnection, now: float) -> str:
+        """Verificar idade e saúde de uma conexão antes de entregá-la.
+
+        Retorna o nome da estatística de descarte, ou string vazia se utilizável.
+        """
+        if now - entry.created_at >= self.max_lifetime:
+            return 'recicladas'
+        if now - entry.last_used >= self.ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                return 'falhasHealthCheck'
+        return ''
+
+    def acquire(self) -> _PooledConnection:
+        """Obter uma conexão do pool (bloqueia até ``checkout_timeout``)"""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            entry = None
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError('Pool de conexões encerrado')
+                waited = False
+                while True:
+                    now = time.monotonic()
+                    self._evict_idle_locked(now)
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1  # reserva a vaga antes de conectar fora do lock
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise TimeoutError(
+                            f'Nenhuma conexão livre após {self.checkout_timeout}s '
+                            f'(max_size={self.max_size})'
+                        )
+                    if not waited:
+                        self._stats['esperas'] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                self._stats['checkouts'] += 1
+
+            if entry is None:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            motivo = self._check(entry, time.monotonic())
+            if not motivo:
+                return entry
+
+            # Conexão velha ou quebrada: descarta e tenta novamente
+            with self._cond:
+                self._stats[motivo] += 1
+                self._size -= 1
+                self._close(entry)
+                self._cond.notify()
+
+    def release(self, entry: _PooledConnection, discard: bool = False):
+        """Devolver a conexão ao pool (ou descartá-la se estiver inválida)"""
+        now = time.monotonic()
+        with self._cond:
+            expired = now - entry.created_at >= self.max_lifetime
+            if discard or expired or self._closed or not entry.conn.open:
+                self._size -= 1
+                if expired and not discard:
+                    self._stats['recicladas'] += 1
+                self._close(entry)
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager que entrega uma conexão e a devolve ao final"""
+        entry = self.acquire()
+        discard = False
+        try:
+            yield entry.conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # Erros de conexão/protocolo: a conexão não é mais confiável
+            discard = True
+            raise
+        finally:
+            self.release(entry, discard=discard)
+
+    def close(self):
+        """Fechar todas as conexões ociosas e impedir novos checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._size -= 1
+                self._close(self._idle.pop())
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool para monitoramento"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'tamanho': self._size,
+                'ociosas': idle,
+                'emUso': self._size - idle,
+                'minSize': self.min_size,
+                'maxSize': self.max_size,
+                **self._stats,
+            }
+
 
 class DatabaseService:
     def __init__(self):
@@ -14,51 +371,122 @@ class DatabaseService:
             'password': os.getenv('DB_PASSWORD', ''),
             'database': os.getenv('DB_NAME', 'vida_mais'),
             'charset': 'utf8mb4',
-            'cursorclass': pymysql.cursors.DictCursor
+            'cursorclass': pymysql.cursors.DictCursor,
+            # Conexões reutilizadas não podem manter uma transação aberta,
+            # senão o snapshot do InnoDB congela e as leituras ficam obsoletas
+            'autocommit': True
         }
-    
+        self.pool = ConnectionPool(
+            self.get_connection,
+            min_size=int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+            max_size=int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+            max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+            ping_interval=float(os.getenv('DB_POOL_PING_INTERVAL', 5)),
+            checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', 10))
+        )
+        self.stream_chunk_size = int(os.getenv('DB_STREAM_CHUNK_SIZE', 5000))
+        rollup_enabled = os.getenv('ML_ROLLUP_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+        self.rollup = AlunoStatsRollup(self) if rollup_enabled else None
+
     def get_connection(self):
         """Criar conexão com o banco"""
         return pymysql.connect(**self.config)
-    
+
+    @medir_consulta
     def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
         """Executar query e retornar resultados"""
-        connection = self.get_connection()
-        try:
+        with self.pool.connection() as connection:
             with connection.cursor() as cursor:
                 cursor.execute(query, params or ())
                 result = cursor.fetchall()
             return result
-        finally:
-            connection.close()
-    
-    def get_alunos_data(self, turma_id: str = None) -> List[Dict]:
-        """Obter dados dos alunos (users com role ALUNO)"""
-        query = """
-            SELECT 
-                u.id, u.nome, u.email, u.criado_em,
-                COUNT(DISTINCT at.turma_id) as total_turmas,
-                COUNT(DISTINCT r.questionario_id) as questionarios_respondidos,
-                AVG(CASE WHEN r.valor_num IS NOT NULL THEN r.valor_num END) as media_notas
-            FROM users u
-            LEFT JOIN alunos_turmas at ON u.id = at.aluno_id
-            LEFT JOIN respostas r ON u.id = r.aluno_id
-            WHERE u.role = 'ALUNO' AND u.ativo = 1
+
+    @medir_consulta
+    def query_frame(self, query: str, params: tuple = None, dtypes: Dict[str, str] = None) -> 'pd.DataFrame':
         """
-        
-        if turma_id:
-            query += " AND at.turma_id = %s"
-            params = (turma_id,)
-        else:
-            params = None
-        
-        query += """
-            GROUP BY u.id, u.nome, u.email, u.criado_em
-            ORDER BY u.criado_em DESC
+        Executar query e retornar um DataFrame colunar.
+
+        As linhas são lidas como tuplas (sem um dict por linha) e convertidas
+        coluna a coluna conforme ``dtypes`` (ver ``to_frame``).
         """
-        
-        return self.execute_query(query, params)
+        with self.pool.connection() as connection:
+            with connection.cursor(pymysql.cursors.Cursor) as cursor:
+                cursor.execute(query, params or ())
+                colunas = [d[0] for d in cursor.description]
+                linhas = cursor.fetchall()
+        return to_frame(linhas, colunas, dtypes)
+
+    def iter_query(self, query: str, params: tuple = None, chunk_size: int = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Executar query com cursor sem buffer (``SSDictCursor``) e produzir
+        as linhas em blocos de ``chunk_size`` (padrão ``DB_STREAM_CHUNK_SIZE``).
+
+        Só um bloco fica em memória por vez. A conexão fica presa ao gerador
+        até o fim da leitura; se ele for abandonado antes disso, a conexão é
+        descartada em vez de voltar ao pool com resultados pendentes.
+        """
+        for _, linhas in self._stream(query, params, pymysql.cursors.SSDictCursor, chunk_size):
+            yield linhas
+
+    def iter_frames(self, query: str, params: tuple = None, dtypes: Dict[str, str] = None,
+                    chunk_size: int = None) -> Iterator['pd.DataFrame']:
+        """Como ``iter_query``, mas cada bloco é um DataFrame tipado (ver ``to_frame``)"""
+        for colunas, linhas in self._stream(query, params, pymysql.cursors.SSCursor, chunk_size):
+            yield to_frame(linhas, colunas, dtypes)
+
+    def _stream(self, query: str, params: tuple, cursor_class, chunk_size: int = None) -> Iterator[Tuple[List[str], list]]:
+        chunk_size = chunk_size or self.stream_chunk_size
+        entry = self.pool.acquire()
+        consumido = False
+        try:
+            cursor = entry.conn.cursor(cursor_class)
+            cursor.execute(query, params or ())
+            colunas = [d[0] for d in cursor.description]
+            while True:
+                linhas = cursor.fetchmany(chunk_size)
+                if not linhas:
+                    break
+                yield colunas, linhas
+            cursor.close()
+            consumido = True
+        finally:
+            self.pool.release(entry, discard=not consumido)
+
+    @medir_consulta
+    def execute(self, query: str, params: tuple = None) -> int:
+        """Executar instrução de escrita e retornar o número de linhas afetadas"""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                return cursor.execute(query, params or ())
+
+    @contextmanager
+    def transaction(self):
+        """Executar várias instruções em uma única transação (commit ao final)"""
+        with self.pool.connection() as connection:
+            connection.begin()
+            try:
+                with connection.cursor() as cursor:
+                    yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Obter estatísticas do pool de conexões"""
+        return self.pool.stats()
+
+    def close(self):
+        """Encerrar o pool de conexões"""
+        self.pool.close()
+
+    @medir_consulta
+    def get_alunos_data(self, turma_id: str = None, as_frame: bool = False) -> Union[List[Dict], 'pd.DataFrame']:
+        """Obter dados dos alunos (users com role ALUNO)"""
+        return self._query_alunos_agregados(COLUNAS_ALUNOS_DATA, turma_id, as_frame=as_frame)
     
+    @medir_consulta
     def get_respostas_aluno(self, aluno_id: str) -> List[Dict]:
         """Obter todas as respostas de um aluno"""
         query = """
@@ -76,6 +504,86 @@ class DatabaseService:
         """
         return self.execute_query(query, (aluno_id,))
     
+    @medir_consulta
+    def get_resumo_respostas_aluno(self, aluno_id: str) -> Dict:
+        """
+        Agregados do histórico de respostas de um aluno em uma única linha:
+        contagens, primeira/última resposta e média/mínimo/máximo de
+        ``valor_num``, sem trazer as respostas do banco. Aluno sem respostas:
+        ``total_respostas`` 0 e os demais campos nulos.
+        """
+        query = """
+            SELECT
+                COUNT(*) as total_respostas,
+                COUNT(DISTINCT questionario_id) as questionarios_respondidos,
+                MIN(criado_em) as primeira_resposta,
+                MAX(criado_em) as ultima_resposta,
+                COUNT(valor_num) as total_notas,
+                AVG(valor_num) as media_notas,
+                MAX(valor_num) as melhor_nota,
+                MIN(valor_num) as pior_nota
+            FROM respostas
+            WHERE aluno_id = %s
+        """
+        return self.execute_query(query, (aluno_id,))[0]
+    
+    @medir_consulta
+    def get_series_notas(self, ultimas: int, aluno_id: str = None, turma_id: str = None) -> 'pd.DataFrame':
+        """
+        Séries de notas (``aluno_id``, ``criado_em``, ``valor_num``) de um aluno
+        ou de todos os alunos de uma turma, em um frame colunar ordenado por
+        aluno e data: só as ``ultimas`` notas de cada aluno (ROW_NUMBER por
+        aluno do mais recente para o mais antigo), sem joins nem textos.
+        """
+        if aluno_id is not None:
+            filtro, params = 'r.aluno_id = %s', (aluno_id,)
+        else:
+            filtro = 'r.aluno_id IN (SELECT aluno_id FROM alunos_turmas WHERE turma_id = %s)'
+            params = (turma_id,)
+        query = f"""
+            SELECT aluno_id, criado_em, valor_num
+            FROM (
+                SELECT
+                    r.id, r.aluno_id, r.criado_em, r.valor_num,
+                    ROW_NUMBER() OVER (PARTITION BY r.aluno_id ORDER BY r.criado_em DESC, r.id DESC) as recencia
+                FROM respostas r
+                WHERE {filtro} AND r.valor_num IS NOT NULL
+            ) notas
+            WHERE recencia <= %s
+            ORDER BY aluno_id, criado_em, id
+        """
+        return self.query_frame(query, (*params, ultimas),
+                                {'aluno_id': 'category', 'criado_em': 'datetime', 'valor_num': 'float'})
+    
+    @medir_consulta
+    def get_respostas_aluno_page(self, aluno_id: str, limit: int,
+                                 apos: Optional[Tuple[Any, str]] = None) -> List[Dict]:
+        """
+        Página das respostas de um aluno, da mais recente para a mais antiga
+        (colunas de ``get_respostas_aluno``).
+
+        Keyset em ``(criado_em, id)``: ``apos`` é a posição da última linha
+        da página anterior. Lê no máximo ``limit`` linhas pelo índice
+        ``(aluno_id, criado_em)``, qualquer que seja o tamanho do histórico.
+        """
+        filtro, params = filtro_keyset('r', apos)
+        query = f"""
+            SELECT 
+                r.*,
+                p.tipo as pergunta_tipo,
+                p.enunciado,
+                q.titulo as questionario_titulo,
+                q.criado_em as questionario_data
+            FROM respostas r
+            JOIN perguntas p ON r.pergunta_id = p.id
+            JOIN questionarios q ON r.questionario_id = q.id
+            WHERE r.aluno_id = %s{filtro}
+            ORDER BY r.criado_em DESC, r.id DESC
+            LIMIT %s
+        """
+        return self.execute_query(query, (aluno_id, *params, limit))
+    
+    @medir_consulta
     def get_questionarios_stats(self) -> List[Dict]:
         """Obter estatísticas dos questionários"""
         query = """
@@ -94,30 +602,251 @@ class DatabaseService:
             ORDER BY q.criado_em DESC
         """
         return self.execute_query(query)
-    
-    def get_engagement_data(self, turma_id: str = None) -> List[Dict]:
-        """Obter dados de engajamento (users com role ALUNO)"""
+
+    @medir_consulta
+    def get_perguntas_stats(self, questionario_id: str) -> List[Dict]:
+        """
+        Respostas das perguntas de um questionário agrupadas por opção escolhida.
+
+        Uma linha por (pergunta, ``valor_opcao``), na ordem das perguntas:
+        ``total_respostas``, ``soma_num`` e ``total_num`` (para a média de
+        ``valor_num``). Respostas sem opção caem na linha com ``valor_opcao``
+        nulo; pergunta sem respostas aparece uma vez, com contagem 0.
+        """
         query = """
-            SELECT 
+            SELECT
+                p.id as pergunta_id,
+                p.enunciado,
+                p.tipo,
+                r.valor_opcao,
+                COUNT(r.id) as total_respostas,
+                SUM(r.valor_num) as soma_num,
+                COUNT(r.valor_num) as total_num
+            FROM perguntas p
+            LEFT JOIN respostas r ON p.id = r.pergunta_id
+            WHERE p.questionario_id = %s
+            GROUP BY p.id, p.enunciado, p.tipo, p.ordem, r.valor_opcao
+            ORDER BY p.ordem, p.id, total_respostas DESC
+        """
+        return self.execute_query(query, (questionario_id,))
+
+    @medir_consulta
+    def get_engagement_data(self, turma_id: str = None, as_frame: bool = False) -> Union[List[Dict], 'pd.DataFrame']:
+        """Obter dados de engajamento (users com role ALUNO)"""
+        return self._query_alunos_agregados("""
                 u.id as aluno_id,
                 u.nome as aluno_nome,
-                COUNT(DISTINCT r.questionario_id) as questionarios_respondidos,
-                COUNT(r.id) as total_respostas,
-                MIN(r.criado_em) as primeira_resposta,
-                MAX(r.criado_em) as ultima_resposta,
-                DATEDIFF(MAX(r.criado_em), MIN(r.criado_em)) as dias_ativo
-            FROM users u
-            LEFT JOIN respostas r ON u.id = r.aluno_id
-            WHERE u.role = 'ALUNO' AND u.ativo = 1
+                COALESCE(r.questionarios_respondidos, 0) as questionarios_respondidos,
+                COALESCE(r.total_respostas, 0) as total_respostas,
+                r.primeira_resposta,
+                r.ultima_resposta,
+                DATEDIFF(r.ultima_resposta, r.primeira_resposta) as dias_ativo
+        """, turma_id, as_frame=as_frame)
+
+    @medir_consulta
+    def get_student_features(self, turma_id: str = None, as_frame: bool = False) -> Union[List[Dict], 'pd.DataFrame']:
+        """
+        Obter, em uma única consulta, o perfil completo de cada aluno:
+        dados cadastrais, turmas, questionários respondidos, média de notas
+        e atividade (primeira/última resposta, dias ativo, total de respostas).
+        """
+        return self._query_alunos_agregados(COLUNAS_STUDENT_FEATURES, turma_id, as_frame=as_frame)
+
+    @medir_consulta
+    def get_student_features_bulk(self, turma_ids: List[str] = None,
+                                  as_frame: bool = False) -> Union[List[Dict], 'pd.DataFrame']:
+        """
+        Perfil de alunos de várias turmas em uma única consulta.
+
+        Retorna uma linha por matrícula (``turma_id`` + colunas de
+        ``get_student_features``); um aluno em duas turmas aparece duas vezes.
+        Sem ``turma_ids``, considera todas as turmas ativas.
+        """
+        return self._query_alunos_agregados("""
+                m.turma_id,
+                u.id, u.nome, u.email, u.criado_em,
+                COALESCE(t.total_turmas, 0) as total_turmas,
+                COALESCE(r.questionarios_respondidos, 0) as questionarios_respondidos,
+                r.media_notas,
+                COALESCE(r.total_respostas, 0) as total_respostas,
+                r.primeira_resposta,
+                r.ultima_resposta,
+                DATEDIFF(r.ultima_resposta, r.primeira_resposta) as dias_ativo
+        """, turma_ids=turma_ids, por_turma=True, as_frame=as_frame)
+
+    @medir_consulta
+    def get_student_features_page(self, turma_id: str, limit: int,
+                                  apos: Optional[Tuple[Any, str]] = None) -> List[Dict]:
         """
-        
+        Página dos alunos de uma turma (colunas de ``get_student_features``),
+        do cadastro mais recente para o mais antigo.
+
+        Keyset em ``(u.criado_em, u.id)``: primeiro escolhe os ``limit``
+        alunos da página, depois agrega turmas e respostas só desses alunos;
+        o custo não cresce com o histórico do restante da turma.
+        """
+        filtro, params = filtro_keyset('u', apos)
+        ids = self.execute_query(f"""
+            SELECT u.id
+            FROM alunos_turmas m
+            JOIN users u ON u.id = m.aluno_id
+            WHERE m.turma_id = %s AND u.role = 'ALUNO' AND u.ativo = 1{filtro}
+            ORDER BY u.criado_em DESC, u.id DESC
+            LIMIT %s
+        """, (turma_id, *params, limit))
+        if not ids:
+            return []
+        return self._query_alunos_agregados(COLUNAS_STUDENT_FEATURES, aluno_ids=[linha['id'] for linha in ids])
+
+    @medir_consulta
+    def get_data_version(self, escopo: str, escopo_id: str = None) -> Tuple:
+        """
+        Versão barata dos dados que alimentam os endpoints de analytics de um
+        escopo (``global``, ``turma``, ``aluno`` ou ``questionario``): contagens
+        e último ``criado_em`` das tabelas envolvidas, mais ``ativo`` e
+        ``atualizado_em`` dos alunos. Muda a cada resposta, matrícula ou
+        questionário novo, a cada aluno desativado ou editado (e nas exclusões,
+        pela contagem).
+
+        Com o rollup em uso, os escopos de ``VERSAO_DADOS_ROLLUP_SQL`` seguem
+        o estado do rollup (watermark e ``atualizado_em``, que muda também no
+        rebuild): a versão avança junto com os agregados que o corpo da
+        resposta vai ler, nunca antes deles.
+        """
+        usa_rollup = escopo in VERSAO_DADOS_ROLLUP_SQL and self.rollup is not None and self.rollup.ensure_fresh()
+        query = (VERSAO_DADOS_ROLLUP_SQL if usa_rollup else VERSAO_DADOS_SQL)[escopo]
+        params = (escopo_id,) * query.count('%s')
+        linha = self.execute_query(query, params)[0]
+        return tuple(linha.values())
+
+    @medir_consulta
+    def iter_alunos_data(self, chunk_size: int = None) -> Iterator['pd.DataFrame']:
+        """
+        Dados de todos os alunos (colunas de ``get_alunos_data``) lidos em
+        blocos de DataFrame por cursor sem buffer, para varreduras completas
+        como o treinamento.
+        """
+        query, params = self._alunos_agregados_sql(COLUNAS_ALUNOS_DATA, ordenar=False)
+        yield from self.iter_frames(query, params, ALUNO_FRAME_DTYPES, chunk_size)
+
+    def _query_alunos_agregados(self, colunas: str, turma_id: str = None,
+                                turma_ids: List[str] = None, por_turma: bool = False,
+                                as_frame: bool = False, aluno_ids: List[str] = None) -> Union[List[Dict], 'pd.DataFrame']:
+        """Executar a consulta de ``_alunos_agregados_sql`` (lista de dicts ou DataFrame)"""
+        query, params = self._alunos_agregados_sql(colunas, turma_id, turma_ids, por_turma, aluno_ids=aluno_ids)
+        if as_frame:
+            return self.query_frame(query, params, ALUNO_FRAME_DTYPES)
+        return self.execute_query(query, params)
+
+    def _alunos_agregados_sql(self, colunas: str, turma_id: str = None, turma_ids: List[str] = None,
+                              por_turma: bool = False, ordenar: bool = True,
+                              aluno_ids: List[str] = None) -> Tuple[str, tuple]:
+        """
+        Consultar alunos ativos junto com agregados de turmas (``t``) e de
+        respostas (``r``).
+
+        Cada tabela é agregada por aluno em uma tabela derivada antes do JOIN
+        com ``users``: o custo fica linear no número de respostas, sem a
+        multiplicação turmas x respostas de um JOIN direto. Com ``turma_id``,
+        as tabelas derivadas só agregam os alunos daquela turma.
+
+        Quando o rollup ``ml_aluno_stats`` está disponível, os agregados de
+        respostas vêm dele (O(alunos)); caso contrário, de ``respostas``.
+
+        Com ``por_turma``, cada matrícula (``m``) em ``turma_ids`` (ou em
+        qualquer turma ativa, se vazio) vira uma linha, com ``m.turma_id``
+        disponível nas colunas.
+
+        Com ``aluno_ids`` (ex.: uma página de alunos), apenas esses alunos
+        são agregados e retornados, em vez dos de uma turma.
+
+        Retorna a query e os parâmetros.
+        """
+        if aluno_ids:
+            placeholders = ', '.join(['%s'] * len(aluno_ids))
+            filtro_alunos = f"WHERE aluno_id IN ({placeholders})"
+            query = self._alunos_agregados_select(colunas, filtro_alunos, "users u")
+            query += f" AND u.id IN ({placeholders})"
+            if ordenar:
+                query += " ORDER BY u.criado_em DESC, u.id DESC"
+            return query, tuple(aluno_ids) * (query.count('%s') // len(aluno_ids))
+
         if turma_id:
+            turma_ids = [turma_id]
+        if turma_ids:
+            placeholders = ', '.join(['%s'] * len(turma_ids))
+            filtro_turmas = f"turma_id IN ({placeholders})"
+        elif por_turma:
+            filtro_turmas = "turma_id IN (SELECT id FROM turmas WHERE ativo = 1)"
+        else:
+            filtro_turmas = ""
+        filtro_alunos = f"WHERE aluno_id IN (SELECT aluno_id FROM alunos_turmas WHERE {filtro_turmas})" if filtro_turmas else ""
+        matriculas = f"alunos_turmas m JOIN users u ON u.id = m.aluno_id AND m.{filtro_turmas}" if por_turma else "users u"
+        query = self._alunos_agregados_select(colunas, filtro_alunos, matriculas)
+
+        if turma_id and not por_turma:
             query += " AND EXISTS (SELECT 1 FROM alunos_turmas at WHERE at.aluno_id = u.id AND at.turma_id = %s)"
-            params = (turma_id,)
+
+        if ordenar:
+            query += " ORDER BY m.turma_id, u.criado_em DESC" if por_turma else " ORDER BY u.criado_em DESC"
+
+        # Os únicos parâmetros são os ids de turma, repetidos em cada filtro
+        params = tuple(turma_ids) * (query.count('%s') // len(turma_ids)) if turma_ids else None
+        return query, params
+
+    def _alunos_agregados_select(self, colunas: str, filtro_alunos: str, matriculas: str) -> str:
+        """SELECT de ``_alunos_agregados_sql`` com as tabelas derivadas filtradas por ``filtro_alunos``"""
+        if self.rollup is not None and self.rollup.ensure_fresh():
+            respostas_por_aluno = f"""
+                SELECT
+                    s.aluno_id,
+                    COALESCE(q.questionarios_respondidos, 0) as questionarios_respondidos,
+                    s.soma_notas * 1.0 / NULLIF(s.total_notas, 0) as media_notas,
+                    s.total_respostas,
+                    s.primeira_resposta,
+                    s.ultima_resposta
+                FROM (
+                    SELECT
+                        aluno_id,
+                        SUM(total_respostas) as total_respostas,
+                        SUM(soma_notas) as soma_notas,
+                        SUM(total_notas) as total_notas,
+                        MIN(primeira_resposta) as primeira_resposta,
+                        MAX(ultima_resposta) as ultima_resposta
+                    FROM ml_aluno_stats
+                    {filtro_alunos}
+                    GROUP BY aluno_id
+                ) s
+                LEFT JOIN (
+                    SELECT aluno_id, COUNT(*) as questionarios_respondidos
+                    FROM ml_aluno_questionarios
+                    {filtro_alunos}
+                    GROUP BY aluno_id
+                ) q ON q.aluno_id = s.aluno_id
+            """
         else:
-            params = None
-        
-        query += " GROUP BY u.id, u.nome"
-        
-        return self.execute_query(query, params)
+            respostas_por_aluno = f"""
+                SELECT
+                    aluno_id,
+                    COUNT(DISTINCT questionario_id) as questionarios_respondidos,
+                    AVG(valor_num) as media_notas,
+                    COUNT(*) as total_respostas,
+                    MIN(criado_em) as primeira_resposta,
+                    MAX(criado_em) as ultima_resposta
+                FROM respostas
+                {filtro_alunos}
+                GROUP BY aluno_id
+            """
 
+        return f"""
+            SELECT {colunas}
+            FROM {matriculas}
+            LEFT JOIN (
+                SELECT aluno_id, COUNT(*) as total_turmas
+                FROM alunos_turmas
+                {filtro_alunos}
+                GROUP BY aluno_id
+            ) t ON t.aluno_id = u.id
+            LEFT JOIN ({respostas_por_aluno}) r ON r.aluno_id = u.id
+            WHERE u.role = 'ALUNO' AND u.ativo = 1
+        """
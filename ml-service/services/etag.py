@@ -0,0 +1,54 @@
+"""
+Validadores HTTP (ETag) dos endpoints de analytics
+A versão dos dados de cada escopo vem de DatabaseService.get_data_version
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from services.cache import GLOBAL_TAG
+
+# Tag do ResultCache afetada por cada escopo de versão
+TAGS_ESCOPO = {
+    'global': lambda _: GLOBAL_TAG,
+    'turma': lambda escopo_id: f'turma:{escopo_id}',
+    'aluno': lambda escopo_id: f'aluno:{escopo_id}',
+    'questionario': lambda escopo_id: f'questionario:{escopo_id}',
+}
+
+
+def etag_dados(recurso: str, versao: Tuple) -> str:
+    """ETag de um recurso (caminho + query) na versão dos dados informada"""
+    conteudo = '|'.join([recurso, *(str(v) for v in versao)])
+    return hashlib.sha1(conteudo.encode()).hexdigest()[:20]
+
+
+class DataVersionTracker:
+    """
+    Última versão dos dados vista por escopo neste processo.
+
+    O ``ResultCache`` é local a cada worker e o ``POST /cache/invalidate`` só
+    chega a um deles. Quando a versão de um escopo muda (ou é vista pela
+    primeira vez), as entradas do escopo são removidas antes de responder:
+    o corpo servido nunca é mais antigo que o ETag calculado.
+    """
+
+    def __init__(self, cache=None, max_escopos: int = 4096):
+        self.cache = cache
+        self.max_escopos = max_escopos
+        self._versoes: 'OrderedDict[Tuple[str, Optional[str]], Tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observar(self, escopo: str, escopo_id: Optional[str], versao: Tuple) -> bool:
+        """Registrar a versão atual; retorna True se mudou desde a última vista"""
+        chave = (escopo, escopo_id)
+        with self._lock:
+            mudou = self._versoes.get(chave) != versao
+            self._versoes[chave] = versao
+            self._versoes.move_to_end(chave)
+            while len(self._versoes) > self.max_escopos:
+                self._versoes.popitem(last=False)
+        if mudou and self.cache is not None:
+            self.cache.invalidate_tags([TAGS_ESCOPO[escopo](escopo_id)])
+        return mudou
@@ -0,0 +1,153 @@
+"""
+Métricas do serviço no formato Prometheus
+Latência por rota, por consulta ao banco e por inferência; cache e treinamento
+"""
+import contextvars
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+)
+
+from services import profiling
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_LINHAS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+BUCKETS_TREINAMENTO = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+HTTP_LATENCIA = Histogram(
+    'ml_http_request_duration_seconds', 'Latência das requisições HTTP por rota',
+    ['method', 'route', 'status'], buckets=BUCKETS_LATENCIA
+)
+DB_LATENCIA = Histogram(
+    'ml_db_query_duration_seconds', 'Latência das consultas por método do DatabaseService',
+    ['metodo'], buckets=BUCKETS_LATENCIA
+)
+DB_LINHAS = Histogram(
+    'ml_db_query_rows', 'Linhas retornadas por método do DatabaseService',
+    ['metodo'], buckets=BUCKETS_LINHAS
+)
+DB_ERROS = Counter(
+    'ml_db_query_errors_total', 'Consultas que terminaram em exceção', ['metodo']
+)
+INFERENCIA_LATENCIA = Histogram(
+    'ml_model_inference_duration_seconds', 'Latência de uma chamada de inferência (features + scaler + modelo)',
+    ['modelo'], buckets=BUCKETS_LATENCIA
+)
+INFERENCIA_LOTE = Histogram(
+    'ml_model_inference_batch_size', 'Alunos por chamada de inferência',
+    ['modelo'], buckets=BUCKETS_LINHAS
+)
+CACHE_CONSULTAS = Counter(
+    'ml_cache_requests_total', 'Consultas ao cache de analytics por endpoint e resultado (hit/miss)',
+    ['endpoint', 'resultado']
+)
+TREINAMENTO_DURACAO = Histogram(
+    'ml_training_duration_seconds', 'Duração dos jobs de treinamento por status final',
+    ['status'], buckets=BUCKETS_TREINAMENTO
+)
+
+# Consulta instrumentada em andamento: chamadas internas (ex.: get_alunos_data
+# -> execute_query) não são contadas de novo
+_consulta_ativa = contextvars.ContextVar('ml_consulta_ativa', default=False)
+
+
+def _contar_linhas(resultado) -> int:
+    # execute() devolve o número de linhas afetadas
+    if isinstance(resultado, int):
+        return resultado
+    try:
+        return len(resultado)
+    except TypeError:
+        return 0
+
+
+def medir_consulta(fn):
+    """
+    Decorator para métodos do DatabaseService: latência, linhas e erros com
+    o nome do método como label. Em geradores, mede do primeiro ao último
+    bloco e soma as linhas de todos eles.
+    """
+    metodo = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gerador(*args, **kwargs):
+            inicio = time.perf_counter()
+            linhas = 0
+            blocos = fn(*args, **kwargs)
+            try:
+                while True:
+                    # No profiling, só o tempo de produzir cada bloco conta como banco
+                    with profiling.etapa('db', metodo) as etapa:
+                        try:
+                            bloco = next(blocos)
+                        except StopIteration:
+                            break
+                        etapa['linhas'] = _contar_linhas(bloco)
+                    linhas += etapa['linhas']
+                    yield bloco
+            except GeneratorExit:
+                raise
+            except Exception:
+                DB_ERROS.labels(metodo).inc()
+                raise
+            finally:
+                blocos.close()
+                DB_LATENCIA.labels(metodo).observe(time.perf_counter() - inicio)
+                DB_LINHAS.labels(metodo).observe(linhas)
+        return gerador
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _consulta_ativa.get():
+            return fn(*args, **kwargs)
+        token = _consulta_ativa.set(True)
+        inicio = time.perf_counter()
+        with profiling.etapa('db', metodo) as etapa:
+            try:
+                resultado = fn(*args, **kwargs)
+            except Exception:
+                DB_ERROS.labels(metodo).inc()
+                raise
+            finally:
+                _consulta_ativa.reset(token)
+                DB_LATENCIA.labels(metodo).observe(time.perf_counter() - inicio)
+            etapa['linhas'] = _contar_linhas(resultado)
+        DB_LINHAS.labels(metodo).observe(etapa['linhas'])
+        return resultado
+    return wrapper
+
+
+@contextmanager
+def medir_inferencia(modelo: str, tamanho_lote: int):
+    inicio = time.perf_counter()
+    with profiling.etapa('modelo', modelo) as etapa:
+        etapa['lote'] = tamanho_lote
+        yield
+    INFERENCIA_LATENCIA.labels(modelo).observe(time.perf_counter() - inicio)
+    INFERENCIA_LOTE.labels(modelo).observe(tamanho_lote)
+
+
+def registrar_requisicao(method: str, route: str, status: int, duracao: float):
+    HTTP_LATENCIA.labels(method, route, str(status)).observe(duracao)
+
+
+def exportar():
+    """
+    Texto de exposição e content type.
+
+    Com ``PROMETHEUS_MULTIPROC_DIR`` (gunicorn com vários workers) agrega
+    os valores gravados por todos os processos; senão, os do processo atual.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -4,255 +4,370 @@ Modelos de classificação e regressão
 """
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-import joblib
 import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Tuple
+
+from services.metrics import medir_inferencia
+from services.model_registry import ModelBundle, ModelRegistry
+from services.profiling import medir_etapa
+from services.pagination import fatiar_pagina
+from services.stats import pagina
+from services.trends import JANELA_NOTAS, ROTULOS_DESEMPENHO, classificar, tendencias_do_frame
+
+def _to_datetime64(valor) -> np.datetime64:
+    """Converter datetime/ISO string (com ou sem fuso) para datetime64 ingênuo; None vira NaT"""
+    if valor is None or valor != valor or valor == '':
+        return np.datetime64('NaT')
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    return np.datetime64(valor.replace(tzinfo=None), 's')
+
+
+def _coluna_float(df: pd.DataFrame, coluna: str, padrao: float) -> np.ndarray:
+    """Coluna numérica como float64 (Decimal convertido), com nulos/ausente substituídos pelo padrão"""
+    if coluna not in df.columns:
+        return np.full(len(df), padrao, dtype=float)
+    valores = pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valores[np.isnan(valores)] = padrao
+    return valores
+
+
+def _coluna_datetime64(df: pd.DataFrame, coluna: str) -> np.ndarray:
+    """Coluna de datas como datetime64[s] ingênuo (fuso descartado); nulos/ausente viram NaT"""
+    if coluna not in df.columns:
+        return np.full(len(df), np.datetime64('NaT'), dtype='datetime64[s]')
+    serie = df[coluna]
+    if isinstance(serie.dtype, pd.DatetimeTZDtype):
+        serie = serie.dt.tz_localize(None)
+    if pd.api.types.is_datetime64_dtype(serie.dtype):
+        return serie.to_numpy(dtype='datetime64[s]')
+    return np.array([_to_datetime64(v) for v in serie], dtype='datetime64[s]')
+
+
+def _dias_desde(hoje: np.datetime64, datas: np.ndarray, padrao: float) -> np.ndarray:
+    """Dias inteiros (arredondados para baixo, como timedelta.days) entre cada data e hoje"""
+    presentes = ~np.isnat(datas)
+    dias = np.full(len(datas), padrao, dtype=float)
+    dias[presentes] = (hoje - datas[presentes]) // np.timedelta64(1, 'D')
+    return dias
+
 
 class MLPredictor:
     def __init__(self, db_service):
         self.db = db_service
         self.model_path = os.getenv('MODEL_PATH', './models')
         os.makedirs(self.model_path, exist_ok=True)
+        self.registry = ModelRegistry(self.model_path)
+        # Intervalo mínimo (s) entre verificações do ponteiro CURRENT
+        self.reload_interval = float(os.getenv('ML_MODEL_RELOAD_INTERVAL', 2))
         
-        # Modelos
-        self.evasao_model = None
-        self.desempenho_model = None
-        self.scaler = StandardScaler()
+        # Modelos (trocados juntos, como um único bundle). O scikit-learn só é
+        # importado ao carregar um modelo salvo ou ao treinar
+        self._bundle = ModelBundle()
+        self._pointer_state = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
         
         # Carregar modelos se existirem
         self.load_models()
     
+    # Acesso aos modelos do bundle atual; atribuir cria um novo bundle
+    @property
+    def evasao_model(self):
+        return self._bundle.evasao_model
+    
+    @evasao_model.setter
+    def evasao_model(self, model):
+        self._bundle = self._bundle.replace(evasao_model=model)
+    
+    @property
+    def desempenho_model(self):
+        return self._bundle.desempenho_model
+    
+    @desempenho_model.setter
+    def desempenho_model(self, model):
+        self._bundle = self._bundle.replace(desempenho_model=model)
+    
+    @property
+    def scaler(self):
+        return self._bundle.scaler
+    
+    @scaler.setter
+    def scaler(self, scaler):
+        self._bundle = self._bundle.replace(scaler=scaler)
+    
     def load_models(self):
-        """Carregar modelos salvos"""
+        """Carregar a versão atual do registro (ou os arquivos do layout antigo)"""
         try:
-            evasao_path = os.path.join(self.model_path, 'evasao_model.pkl')
-            desempenho_path = os.path.join(self.model_path, 'desempenho_model.pkl')
-            scaler_path = os.path.join(self.model_path, 'scaler.pkl')
-            
-            if os.path.exists(evasao_path):
-                self.evasao_model = joblib.load(evasao_path)
-            if os.path.exists(desempenho_path):
-                self.desempenho_model = joblib.load(desempenho_path)
-            if os.path.exists(scaler_path):
-                self.scaler = joblib.load(scaler_path)
+            state = self.registry.pointer_state()
+            self._bundle = self.registry.load()
+            self._pointer_state = state
         except Exception as e:
             print(f"Erro ao carregar modelos: {e}")
+        self._last_check = time.monotonic()
     
-    def save_models(self):
-        """Salvar modelos treinados"""
+    def refresh_models(self) -> ModelBundle:
+        """
+        Retornar o bundle atual, recarregando se outra versão foi publicada.
+        
+        A verificação é um ``stat`` do CURRENT, feito no máximo a cada
+        ``reload_interval`` segundos; outros processos (workers, job de
+        treinamento) passam a usar a nova versão sem reiniciar.
+        """
+        agora = time.monotonic()
+        if agora - self._last_check < self.reload_interval:
+            return self._bundle
+        # Apenas uma thread recarrega; as demais seguem com o bundle atual
+        if not self._reload_lock.acquire(blocking=False):
+            return self._bundle
         try:
-            if self.evasao_model:
-                joblib.dump(self.evasao_model, os.path.join(self.model_path, 'evasao_model.pkl'))
-            if self.desempenho_model:
-                joblib.dump(self.desempenho_model, os.path.join(self.model_path, 'desempenho_model.pkl'))
-            joblib.dump(self.scaler, os.path.join(self.model_path, 'scaler.pkl'))
+            self._last_check = agora
+            if self.registry.pointer_state() != self._pointer_state:
+                self.load_models()
+        finally:
+            self._reload_lock.release()
+        return self._bundle
+    
+    def save_models(self, metricas: Dict[str, Any] = None):
+        """Publicar os modelos atuais como uma nova versão"""
+        try:
+            self._bundle = self.registry.publish(self._bundle, metricas)
+            self._pointer_state = self.registry.pointer_state()
         except Exception as e:
             print(f"Erro ao salvar modelos: {e}")
     
     def prepare_evasao_features(self, aluno_data: Dict) -> np.array:
-        """Preparar features para predição de evasão"""
-        # Features:
-        # 1. Dias desde última resposta
-        # 2. Taxa de resposta (questionários respondidos / total disponível)
-        # 3. Média de notas
-        # 4. Variação de engajamento (tendência)
-        # 5. Dias desde o cadastro
-        
-        hoje = datetime.now()
+        """Preparar features para predição de evasão (um aluno, shape 1 x 5)"""
+        return self.prepare_evasao_features_batch([aluno_data])
+    
+    def prepare_evasao_features_batch(self, alunos: List[Dict]) -> np.ndarray:
+        """Preparar a matriz de features de evasão (n_alunos x 5) a partir de dicts"""
+        return self.prepare_evasao_features_frame(pd.DataFrame.from_records(alunos))
+    
+    def prepare_evasao_features_frame(self, alunos: pd.DataFrame) -> np.ndarray:
+        """
+        Preparar a matriz de features de evasão (n_alunos x 5) de uma vez.
         
-        # Calcular dias desde última resposta
-        ultima_resposta = aluno_data.get('ultima_resposta')
-        if ultima_resposta:
-            if isinstance(ultima_resposta, str):
-                ultima_resposta = datetime.fromisoformat(ultima_resposta.replace('Z', '+00:00'))
-            dias_sem_resposta = (hoje - ultima_resposta).days
-        else:
-            dias_sem_resposta = 999  # Valor alto para quem nunca respondeu
+        Colunas:
+        1. Dias desde última resposta (999 para quem nunca respondeu)
+        2. Taxa de resposta (questionários respondidos / total disponível)
+        3. Média de notas (5.0 quando ausente)
+        4. Dias desde o cadastro
+        5. Engajamento por dia ativo
+        """
+        hoje = np.datetime64(datetime.now(), 's')
         
-        # Taxa de resposta
-        questionarios_respondidos = aluno_data.get('questionarios_respondidos', 0)
-        total_questionarios = aluno_data.get('total_questionarios_disponiveis', 1)
-        taxa_resposta = questionarios_respondidos / max(total_questionarios, 1)
-        
-        # Média de notas
-        media_notas = aluno_data.get('media_notas', 5.0) or 5.0
-        
-        # Dias desde cadastro
-        criado_em = aluno_data.get('criado_em')
-        if criado_em:
-            if isinstance(criado_em, str):
-                criado_em = datetime.fromisoformat(criado_em.replace('Z', '+00:00'))
-            dias_cadastrado = (hoje - criado_em).days
-        else:
-            dias_cadastrado = 0
+        questionarios_respondidos = _coluna_float(alunos, 'questionarios_respondidos', 0)
+        total_questionarios = _coluna_float(alunos, 'total_questionarios_disponiveis', 1)
+        media_notas = _coluna_float(alunos, 'media_notas', 5.0)
+        media_notas[media_notas == 0] = 5.0
+        dias_ativo = _coluna_float(alunos, 'dias_ativo', 0)
         
-        # Tendência de engajamento (simplificado)
-        dias_ativo = aluno_data.get('dias_ativo', 0) or 0
-        if dias_ativo > 0:
-            engajamento_por_dia = questionarios_respondidos / dias_ativo
-        else:
-            engajamento_por_dia = 0
+        dias_sem_resposta = _dias_desde(hoje, _coluna_datetime64(alunos, 'ultima_resposta'), 999)
+        dias_cadastrado = _dias_desde(hoje, _coluna_datetime64(alunos, 'criado_em'), 0)
+        taxa_resposta = questionarios_respondidos / np.maximum(total_questionarios, 1)
+        engajamento_por_dia = np.divide(
+            questionarios_respondidos, dias_ativo,
+            out=np.zeros(len(alunos)), where=dias_ativo > 0
+        )
         
-        features = np.array([
+        return np.column_stack([
             dias_sem_resposta,
             taxa_resposta,
             media_notas,
             dias_cadastrado,
             engajamento_por_dia
-        ]).reshape(1, -1)
-        
-        return features
+        ]).reshape(len(alunos), 5)
     
-    def predict_evasao_turma(self, turma_id: str) -> Dict[str, Any]:
-        """Predizer risco de evasão para alunos de uma turma"""
+    @medir_etapa('ml')
+    def predict_evasao_turma(self, turma_id: str, limit: int = None, offset: int = 0) -> Dict[str, Any]:
+        """
+        Predizer risco de evasão para alunos de uma turma.
+
+        ``predictions`` vem ordenado por risco (maior primeiro); com ``limit``
+        e ``offset`` só a página pedida é montada. As contagens por nível
+        de risco consideram sempre a turma inteira.
+        """
         try:
+            bundle = self.refresh_models()
             # Se não há modelo treinado, usar heurística
-            if not self.evasao_model:
-                return self._heuristic_evasao_prediction(turma_id)
+            if not bundle.evasao_model:
+                return self._heuristic_evasao_prediction(turma_id, limit, offset)
             
-            # Obter dados dos alunos
-            alunos = self.db.get_alunos_data(turma_id)
-            engagement = self.db.get_engagement_data(turma_id)
+            # Obter dados e engajamento dos alunos em uma única consulta
+            alunos = self.db.get_student_features(turma_id)
             
-            # Combinar dados
-            engagement_dict = {e['aluno_id']: e for e in engagement}
+            riscos, niveis = self._riscos_evasao_modelo(alunos, bundle)
             
-            predictions = []
-            for aluno in alunos:
-                aluno_id = aluno['id']
-                engagement_data = engagement_dict.get(aluno_id, {})
-                
-                # Combinar dados
-                aluno_completo = {**aluno, **engagement_data}
-                
-                # Preparar features
-                features = self.prepare_evasao_features(aluno_completo)
-                features_scaled = self.scaler.transform(features)
-                
-                # Predição
-                risco_prob = self.evasao_model.predict_proba(features_scaled)[0][1]
-                
-                # Classificar risco
-                if risco_prob > 0.7:
-                    nivel_risco = 'alto'
-                elif risco_prob > 0.4:
-                    nivel_risco = 'medio'
-                else:
-                    nivel_risco = 'baixo'
-                
-                predictions.append({
-                    'alunoId': aluno_id,
-                    'alunoNome': aluno['nome'],
-                    'riscoEvasao': round(risco_prob * 100, 2),
-                    'nivelRisco': nivel_risco,
-                    'fatores': self._get_evasao_factors(aluno_completo)
-                })
+            # Ordenar por risco (maior primeiro): seleção parcial da página
+            indices = pagina(riscos, limit, offset)
+            predictions = self._predictions_modelo(alunos, riscos, niveis, indices)
             
-            # Ordenar por risco (maior primeiro)
-            predictions.sort(key=lambda x: x['riscoEvasao'], reverse=True)
-            
-            return {
-                'turmaId': turma_id,
-                'totalAlunos': len(predictions),
-                'alunosRiscoAlto': sum(1 for p in predictions if p['nivelRisco'] == 'alto'),
-                'alunosRiscoMedio': sum(1 for p in predictions if p['nivelRisco'] == 'medio'),
-                'alunosRiscoBaixo': sum(1 for p in predictions if p['nivelRisco'] == 'baixo'),
-                'predictions': predictions
-            }
+            return self._resumo_evasao(turma_id, niveis.tolist(), predictions, limit, offset)
         
         except Exception as e:
             print(f"Erro na predição de evasão: {e}")
-            return self._heuristic_evasao_prediction(turma_id)
+            return self._heuristic_evasao_prediction(turma_id, limit, offset)
+    
+    @medir_etapa('ml')
+    def predict_evasao_pagina(self, turma_id: str, limit: int = 50, apos=None) -> Dict[str, Any]:
+        """
+        Predizer risco de evasão de uma página de alunos da turma, na ordem
+        de cadastro (mais recentes primeiro), sem ler a turma inteira.
+
+        Só os ``limit`` alunos da página são consultados e preditos;
+        ``proximoCursor`` (None na última página) continua a lista.
+        """
+        linhas = self.db.get_student_features_page(turma_id, limit + 1, apos)
+        alunos, proximo = fatiar_pagina(linhas, limit)
+        
+        bundle = self.refresh_models()
+        metodo = 'heuristica'
+        if bundle.evasao_model:
+            try:
+                riscos, niveis = self._riscos_evasao_modelo(alunos, bundle)
+                predictions = self._predictions_modelo(alunos, riscos, niveis, range(len(alunos)))
+                metodo = 'modelo'
+            except Exception as e:
+                print(f"Erro na predição de evasão paginada: {e}")
+        if metodo == 'heuristica':
+            predictions = self._heuristic_evasao_predictions(alunos)
+        
+        return {
+            'turmaId': turma_id,
+            'predictions': predictions,
+            'proximoCursor': proximo,
+            'metodo': metodo
+        }
+    
+    @medir_etapa('ml')
+    def predict_evasao_bulk(self, turma_ids: List[str] = None, limit: int = None,
+                            offset: int = 0) -> Dict[str, Any]:
+        """
+        Predizer risco de evasão para várias turmas de uma vez.
+        
+        Busca as features de todas as turmas em uma única consulta e faz uma
+        única chamada ao modelo; o resultado de cada turma tem o mesmo formato
+        de ``predict_evasao_turma`` (``limit``/``offset`` valem por turma).
+        Sem ``turma_ids``, usa todas as turmas ativas.
+        """
+        linhas = self.db.get_student_features_bulk(turma_ids)
+        
+        # Índices das linhas de cada turma, na ordem pedida
+        grupos = {turma_id: [] for turma_id in (turma_ids or [])}
+        for i, linha in enumerate(linhas):
+            grupos.setdefault(linha['turma_id'], []).append(i)
+        
+        bundle = self.refresh_models()
+        riscos = niveis = None
+        if bundle.evasao_model:
+            try:
+                riscos, niveis = self._riscos_evasao_modelo(linhas, bundle)
+            except Exception as e:
+                print(f"Erro na predição de evasão em lote: {e}")
+        
+        turmas = []
+        for turma_id, indices in grupos.items():
+            if riscos is not None:
+                indices = np.asarray(indices, dtype=np.intp)
+                selecionados = indices[pagina(riscos[indices], limit, offset)]
+                resumo = self._resumo_evasao(
+                    turma_id, niveis[indices].tolist(),
+                    self._predictions_modelo(linhas, riscos, niveis, selecionados), limit, offset
+                )
+            else:
+                predictions = self._heuristic_evasao_predictions([linhas[i] for i in indices])
+                resumo = self._resumo_evasao(
+                    turma_id, [p['nivelRisco'] for p in predictions],
+                    self._paginar(predictions, limit, offset), limit, offset
+                )
+                resumo['metodo'] = 'heuristica'
+            turmas.append(resumo)
+        
+        return {
+            'totalTurmas': len(turmas),
+            'totalAlunos': len({linha['id'] for linha in linhas}),
+            'metodo': 'modelo' if riscos is not None else 'heuristica',
+            'turmas': turmas
+        }
+    
+    def _predict_evasao_modelo(self, alunos: List[Dict], bundle: ModelBundle) -> List[Dict]:
+        """Predição com o modelo para todos os alunos em lote (mesma ordem da entrada)"""
+        riscos, niveis = self._riscos_evasao_modelo(alunos, bundle)
+        return self._predictions_modelo(alunos, riscos, niveis, range(len(alunos)))
+    
+    def _riscos_evasao_modelo(self, alunos: List[Dict], bundle: ModelBundle) -> Tuple[np.ndarray, np.ndarray]:
+        """Risco (%) e nível de risco de cada aluno, preditos em lote (mesma ordem da entrada)"""
+        if not alunos:
+            return np.empty(0), np.empty(0, dtype=str)
+        
+        # Features, normalização e predição em uma única chamada, sempre
+        # com o scaler e o modelo da mesma versão
+        with medir_inferencia('evasao', len(alunos)):
+            features = self.prepare_evasao_features_batch(alunos)
+            features_scaled = bundle.scaler.transform(features)
+            risco_prob = bundle.evasao_model.predict_proba(features_scaled)[:, 1]
+        
+        # Classificar risco
+        niveis = np.select([risco_prob > 0.7, risco_prob > 0.4], ['alto', 'medio'], 'baixo')
+        riscos = np.round(risco_prob * 100, 2)
+        return riscos, niveis
+    
+    def _predictions_modelo(self, alunos: List[Dict], riscos: np.ndarray, niveis: np.ndarray,
+                            indices) -> List[Dict]:
+        """Predições (com fatores) apenas dos alunos em ``indices``, nessa ordem"""
+        return [
+            {
+                'alunoId': alunos[i]['id'],
+                'alunoNome': alunos[i]['nome'],
+                'riscoEvasao': float(riscos[i]),
+                'nivelRisco': str(niveis[i]),
+                'fatores': self._get_evasao_factors(alunos[i])
+            }
+            for i in indices
+        ]
+    
+    @staticmethod
+    def _paginar(predictions: List[Dict], limit: int = None, offset: int = 0) -> List[Dict]:
+        """Página das predições ordenadas por risco (maior primeiro; empates na ordem da entrada)"""
+        riscos = np.fromiter((p['riscoEvasao'] for p in predictions), dtype=float, count=len(predictions))
+        return [predictions[i] for i in pagina(riscos, limit, offset)]
+    
+    def _resumo_evasao(self, turma_id: str, niveis: List[str], predictions: List[Dict],
+                       limit: int = None, offset: int = 0) -> Dict[str, Any]:
+        """
+        Montar a resposta de predição de evasão: contagem por nível de risco
+        de todos os alunos (``niveis``) e a página de ``predictions``
+        """
+        resumo = {
+            'turmaId': turma_id,
+            'totalAlunos': len(niveis),
+            'alunosRiscoAlto': niveis.count('alto'),
+            'alunosRiscoMedio': niveis.count('medio'),
+            'alunosRiscoBaixo': niveis.count('baixo'),
+            'predictions': predictions
+        }
+        if limit is not None or offset:
+            resumo['limit'] = limit
+            resumo['offset'] = offset
+        return resumo
     
-    def _heuristic_evasao_prediction(self, turma_id: str) -> Dict[str, Any]:
+    @medir_etapa('ml')
+    def _heuristic_evasao_prediction(self, turma_id: str, limit: int = None, offset: int = 0) -> Dict[str, Any]:
         """Predição heurística simples (quando não há modelo)"""
         try:
-            engagement = self.db.get_engagement_data(turma_id)
-            predictions = []
-            
-            if not engagement:
-                # Se não há dados de engajamento, buscar alunos da turma diretamente
-                alunos = self.db.get_alunos_data(turma_id)
-                for aluno in alunos:
-                    predictions.append({
-                        'alunoId': aluno['id'],
-                        'alunoNome': aluno.get('nome', 'Aluno sem nome'),
-                        'riscoEvasao': 50,  # Risco médio por padrão
-                        'nivelRisco': 'medio',
-                        'fatores': ['Sem dados de engajamento disponíveis']
-                    })
-            else:
-                for aluno in engagement:
-                    # Verificar se tem os campos necessários
-                    aluno_id = aluno.get('aluno_id')
-                    aluno_nome = aluno.get('aluno_nome', 'Aluno sem nome')
-                    
-                    if not aluno_id:
-                        continue
-                    
-                    # Heurística simples baseada em dias sem resposta
-                    dias_sem_resposta = 0
-                    ultima_resposta = aluno.get('ultima_resposta')
-                    
-                    if ultima_resposta:
-                        try:
-                            if isinstance(ultima_resposta, str):
-                                # Tentar diferentes formatos de data
-                                if 'T' in ultima_resposta:
-                                    ultima = datetime.fromisoformat(ultima_resposta.replace('Z', '+00:00'))
-                                else:
-                                    ultima = datetime.strptime(ultima_resposta, '%Y-%m-%d %H:%M:%S')
-                            else:
-                                ultima = ultima_resposta
-                            dias_sem_resposta = (datetime.now() - ultima.replace(tzinfo=None)).days
-                        except Exception as e:
-                            print(f"Erro ao processar data: {e}, valor: {ultima_resposta}")
-                            dias_sem_resposta = 999
-                    else:
-                        dias_sem_resposta = 999
-                    
-                    # Calcular risco baseado em heurística
-                    if dias_sem_resposta > 30:
-                        risco = 80
-                        nivel = 'alto'
-                    elif dias_sem_resposta > 14:
-                        risco = 50
-                        nivel = 'medio'
-                    else:
-                        risco = 20
-                        nivel = 'baixo'
-                    
-                    fatores = []
-                    if dias_sem_resposta < 999:
-                        fatores.append(f"{dias_sem_resposta} dias sem responder")
-                    else:
-                        fatores.append("Nunca respondeu")
-                    
-                    fatores.append(f"{aluno.get('questionarios_respondidos', 0)} questionários respondidos")
-                    
-                    predictions.append({
-                        'alunoId': aluno_id,
-                        'alunoNome': aluno_nome,
-                        'riscoEvasao': risco,
-                        'nivelRisco': nivel,
-                        'fatores': fatores
-                    })
-            
-            predictions.sort(key=lambda x: x['riscoEvasao'], reverse=True)
+            alunos = self.db.get_student_features(turma_id)
+            predictions = self._heuristic_evasao_predictions(alunos)
             
-            return {
-                'turmaId': turma_id,
-                'totalAlunos': len(predictions),
-                'alunosRiscoAlto': sum(1 for p in predictions if p['nivelRisco'] == 'alto'),
-                'alunosRiscoMedio': sum(1 for p in predictions if p['nivelRisco'] == 'medio'),
-                'alunosRiscoBaixo': sum(1 for p in predictions if p['nivelRisco'] == 'baixo'),
-                'predictions': predictions,
-                'metodo': 'heuristica'  # Indica que está usando heurística
-            }
+            resumo = self._resumo_evasao(
+                turma_id, [p['nivelRisco'] for p in predictions],
+                self._paginar(predictions, limit, offset), limit, offset
+            )
+            resumo['metodo'] = 'heuristica'  # Indica que está usando heurística
+            return resumo
         except Exception as e:
             print(f"Erro na predição heurística: {e}")
             import traceback
@@ -269,6 +384,69 @@ class MLPredictor:
                 'erro': str(e)
             }
     
+    @medir_etapa('ml')
+    def _heuristic_evasao_predictions(self, alunos: List[Dict]) -> List[Dict]:
+        """Heurística baseada em dias sem resposta (na ordem da entrada)"""
+        predictions = []
+        
+        for aluno in alunos:
+            # Verificar se tem os campos necessários
+            aluno_id = aluno.get('id')
+            aluno_nome = aluno.get('nome') or 'Aluno sem nome'
+            
+            if not aluno_id:
+                continue
+            
+            # Heurística simples baseada em dias sem resposta
+            dias_sem_resposta = 0
+            ultima_resposta = aluno.get('ultima_resposta')
+            
+            if ultima_resposta:
+                try:
+                    if isinstance(ultima_resposta, str):
+                        # Tentar diferentes formatos de data
+                        if 'T' in ultima_resposta:
+                            ultima = datetime.fromisoformat(ultima_resposta.replace('Z', '+00:00'))
+                        else:
+                            ultima = datetime.strptime(ultima_resposta, '%Y-%m-%d %H:%M:%S')
+                    else:
+                        ultima = ultima_resposta
+                    dias_sem_resposta = (datetime.now() - ultima.replace(tzinfo=None)).days
+                except Exception as e:
+                    print(f"Erro ao processar data: {e}, valor: {ultima_resposta}")
+                    dias_sem_resposta = 999
+            else:
+                dias_sem_resposta = 999
+            
+            # Calcular risco baseado em heurística
+            if dias_sem_resposta > 30:
+                risco = 80
+                nivel = 'alto'
+            elif dias_sem_resposta > 14:
+                risco = 50
+                nivel = 'medio'
+            else:
+                risco = 20
+                nivel = 'baixo'
+            
+            fatores = []
+            if dias_sem_resposta < 999:
+                fatores.append(f"{dias_sem_resposta} dias sem responder")
+            else:
+                fatores.append("Nunca respondeu")
+            
+            fatores.append(f"{aluno.get('questionarios_respondidos', 0)} questionários respondidos")
+            
+            predictions.append({
+                'alunoId': aluno_id,
+                'alunoNome': aluno_nome,
+                'riscoEvasao': risco,
+                'nivelRisco': nivel,
+                'fatores': fatores
+            })
+        
+        return predictions
+    
     def _get_evasao_factors(self, aluno_data: Dict) -> List[str]:
         """Identificar fatores que contribuem para o risco de evasão"""
         fatores = []
@@ -299,65 +477,85 @@ class MLPredictor:
         
         return fatores if fatores else ["Nenhum fator de risco identificado"]
     
+    @medir_etapa('ml')
     def predict_desempenho_aluno(self, aluno_id: str) -> Dict[str, Any]:
-        """Predizer tendência de desempenho de um aluno"""
+        """
+        Predizer tendência de desempenho de um aluno pela inclinação de
+        Theil–Sen das últimas ``JANELA_NOTAS`` notas no tempo
+        """
         try:
-            respostas = self.db.get_respostas_aluno(aluno_id)
+            notas = self.db.get_series_notas(JANELA_NOTAS, aluno_id=aluno_id)
+            _, tendencias = tendencias_do_frame(notas)
             
-            if not respostas:
+            if not len(tendencias['total']):
+                # Sem notas: 'insuficiente' se há respostas (só textos/opções)
+                if self.db.get_resumo_respostas_aluno(aluno_id)['total_respostas']:
+                    return {
+                        'alunoId': aluno_id,
+                        'tendencia': 'insuficiente',
+                        'message': 'Poucas avaliações para análise de tendência'
+                    }
                 return {
                     'alunoId': aluno_id,
                     'tendencia': 'sem_dados',
                     'message': 'Aluno ainda não possui respostas suficientes'
                 }
             
-            # Extrair notas ao longo do tempo
-            notas_temporais = []
-            for r in respostas:
-                if r.get('valor_num') is not None:
-                    notas_temporais.append({
-                        'data': r['criado_em'],
-                        'nota': r['valor_num']
-                    })
-            
-            if len(notas_temporais) < 3:
-                return {
-                    'alunoId': aluno_id,
-                    'tendencia': 'insuficiente',
-                    'message': 'Poucas avaliações para análise de tendência'
-                }
-            
-            # Calcular tendência
-            notas = [n['nota'] for n in notas_temporais]
-            media_inicial = np.mean(notas[:len(notas)//2])
-            media_recente = np.mean(notas[len(notas)//2:])
-            
-            diferenca = media_recente - media_inicial
-            
-            if diferenca > 1:
-                tendencia = 'melhorando'
-            elif diferenca < -1:
-                tendencia = 'piorando'
-            else:
-                tendencia = 'estavel'
-            
+            desempenho = self._desempenho(aluno_id, tendencias, classificar(tendencias, 1.0, ROTULOS_DESEMPENHO), 0)
+            if desempenho['tendencia'] == 'insuficiente':
+                desempenho['message'] = 'Poucas avaliações para análise de tendência'
+            return desempenho
+        
+        except Exception as e:
+            print(f"Erro na predição de desempenho: {e}")
             return {
                 'alunoId': aluno_id,
-                'tendencia': tendencia,
-                'mediaInicial': round(media_inicial, 2),
-                'mediaRecente': round(media_recente, 2),
-                'diferenca': round(diferenca, 2),
-                'totalAvaliacoes': len(notas),
-                'recomendacoes': self._get_recomendacoes(tendencia, media_recente)
+                'erro': str(e)
+            }
+    
+    @medir_etapa('ml')
+    def predict_desempenho_turma(self, turma_id: str) -> Dict[str, Any]:
+        """
+        Tendência de desempenho de todos os alunos (com notas) de uma turma:
+        uma consulta e uma passada do motor de tendências para a turma inteira
+        """
+        try:
+            notas = self.db.get_series_notas(JANELA_NOTAS, turma_id=turma_id)
+            ids, tendencias = tendencias_do_frame(notas)
+            rotulos = classificar(tendencias, 1.0, ROTULOS_DESEMPENHO)
+            
+            alunos = [self._desempenho(aluno_id, tendencias, rotulos, i) for i, aluno_id in enumerate(ids)]
+            return {
+                'turmaId': turma_id,
+                'totalAlunos': len(alunos),
+                'tendencias': {rotulo: rotulos.count(rotulo) for rotulo in ROTULOS_DESEMPENHO},
+                'alunos': alunos
             }
         
         except Exception as e:
-            print(f"Erro na predição de desempenho: {e}")
+            print(f"Erro na predição de desempenho da turma: {e}")
             return {
-                'alunoId': aluno_id,
+                'turmaId': turma_id,
                 'erro': str(e)
             }
     
+    def _desempenho(self, aluno_id: str, tendencias: Dict[str, np.ndarray], rotulos: List[str], i: int) -> Dict[str, Any]:
+        """Resultado de um aluno (posição ``i`` dos arrays de ``calcular_tendencias``)"""
+        media_recente = round(float(tendencias['media_recente'][i]), 2)
+        resultado = {
+            'alunoId': aluno_id,
+            'tendencia': rotulos[i],
+            'mediaGeral': round(float(tendencias['media'][i]), 2),
+            'mediaRecente': media_recente,
+            'totalAvaliacoes': int(tendencias['total'][i])
+        }
+        if rotulos[i] != 'insuficiente':
+            resultado['mediaInicial'] = round(float(tendencias['media_inicial'][i]), 2)
+            resultado['diferenca'] = round(float(tendencias['variacao'][i]), 2)
+            resultado['inclinacaoSemanal'] = round(float(tendencias['inclinacao'][i]) * 7, 3)
+            resultado['recomendacoes'] = self._get_recomendacoes(rotulos[i], media_recente)
+        return resultado
+    
     def _get_recomendacoes(self, tendencia: str, media: float) -> List[str]:
         """Gerar recomendações baseadas na tendência"""
         recomendacoes = []
@@ -379,73 +577,80 @@ class MLPredictor:
         
         return recomendacoes
     
-    def train_models(self) -> Dict[str, Any]:
-        """Treinar modelos com dados disponíveis"""
+    def train_models(self, progress: Callable[[str, int], None] = None) -> Dict[str, Any]:
+        """
+        Treinar modelos com dados disponíveis.
+        
+        ``progress(etapa, percentual)``, se informado, é chamado a cada etapa.
+        """
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
+        from sklearn.preprocessing import StandardScaler
+        
+        progress = progress or (lambda etapa, percentual: None)
         try:
-            # Obter dados para treinamento
-            alunos = self.db.get_alunos_data()
+            progress('carregando_dados', 5)
+            # Montar o dataset a partir da leitura em blocos: só um bloco de
+            # linhas fica em memória por vez; o que acumula são as features
+            # (5 floats por aluno) e os rótulos
+            X, y_evasao = self._build_training_set(self.db.iter_alunos_data())
             
             # Se não há alunos, retornar aviso mas não bloquear
-            if len(alunos) == 0:
+            if len(X) == 0:
                 return {
                     'success': True,
                     'message': 'Nenhum aluno cadastrado ainda. Modelos inicializados com valores padrão.',
                     'totalAlunos': 0
                 }
             
-            # Preparar dataset
-            # (Implementação simplificada - em produção seria mais complexo)
-            X = []
-            y_evasao = []
-            
-            for aluno in alunos:
-                features = self.prepare_evasao_features(aluno)
-                X.append(features[0])
-                
-                # Label de evasão (exemplo: aluno inativo há mais de 60 dias)
-                # Em produção, isso viria de dados históricos reais
-                label = 1 if aluno.get('questionarios_respondidos', 0) < 2 else 0
-                y_evasao.append(label)
-            
-            X = np.array(X)
-            y_evasao = np.array(y_evasao)
-            
-            # Normalizar features
-            X_scaled = self.scaler.fit_transform(X)
+            # Normalizar features (novos objetos: o bundle em uso não é alterado)
+            progress('treinando_evasao', 30)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
             
             # Treinar modelo de evasão
-            self.evasao_model = RandomForestClassifier(
+            evasao_model = RandomForestClassifier(
                 n_estimators=100,
                 max_depth=10,
                 random_state=42
             )
-            self.evasao_model.fit(X_scaled, y_evasao)
+            evasao_model.fit(X_scaled, y_evasao)
             
             # Preparar dados para modelo de desempenho
-            y_desempenho = []
-            for aluno in alunos:
-                # Usar média de notas como target (ou valor padrão 5)
-                media = aluno.get('media_notas', 5.0) or 5.0
-                y_desempenho.append(media)
-            
-            y_desempenho = np.array(y_desempenho)
+            # Usar média de notas como target (ou valor padrão 5), já
+            # calculada na 3ª coluna das features
+            y_desempenho = X[:, 2]
             
             # Treinar modelo de desempenho (regressão)
-            self.desempenho_model = GradientBoostingRegressor(
+            progress('treinando_desempenho', 60)
+            desempenho_model = GradientBoostingRegressor(
                 n_estimators=100,
                 max_depth=5,
                 random_state=42
             )
-            self.desempenho_model.fit(X_scaled, y_desempenho)
+            desempenho_model.fit(X_scaled, y_desempenho)
             
-            # Salvar modelos
-            self.save_models()
+            # Publicar a nova versão e trocar modelo e scaler de uma vez
+            progress('salvando', 90)
+            metricas = {
+                'totalAlunos': int(len(X)),
+                'taxaEvasaoRotulada': round(float(y_evasao.mean()), 4),
+                'acuraciaTreinoEvasao': round(float(evasao_model.score(X_scaled, y_evasao)), 4),
+                'r2TreinoDesempenho': round(float(desempenho_model.score(X_scaled, y_desempenho)), 4),
+            }
+            self._bundle = ModelBundle(
+                evasao_model=evasao_model,
+                desempenho_model=desempenho_model,
+                scaler=scaler
+            )
+            self.save_models(metricas)
             
             return {
                 'success': True,
                 'message': 'Modelos de Evasão e Desempenho treinados com sucesso!',
-                'totalAlunos': len(alunos),
-                'modelosTreinados': ['evasao', 'desempenho']
+                'totalAlunos': len(X),
+                'modelosTreinados': ['evasao', 'desempenho'],
+                'versao': self._bundle.version,
+                'metricas': metricas
             }
         
         except Exception as e:
@@ -454,23 +659,32 @@ class MLPredictor:
                 'error': str(e)
             }
     
+    def _build_training_set(self, blocos) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Montar a matriz de features e os rótulos de evasão bloco a bloco.
+        
+        (Implementação simplificada - em produção seria mais complexo)
+        """
+        partes_X = []
+        partes_y = []
+        for alunos in blocos:
+            partes_X.append(self.prepare_evasao_features_frame(alunos))
+            # Label de evasão (exemplo: aluno inativo há mais de 60 dias)
+            # Em produção, isso viria de dados históricos reais
+            partes_y.append((_coluna_float(alunos, 'questionarios_respondidos', 0) < 2).astype(int))
+        
+        if not partes_X:
+            return np.empty((0, 5)), np.empty(0, dtype=int)
+        return np.concatenate(partes_X), np.concatenate(partes_y)
+    
     def get_models_status(self) -> Dict[str, Any]:
         """Obter status dos modelos"""
+        bundle = self.refresh_models()
         return {
-            'evasaoModel': 'treinado' if self.evasao_model else 'nao_treinado',
-            'desempenhoModel': 'treinado' if self.desempenho_model else 'nao_treinado',
+            'evasaoModel': 'treinado' if bundle.evasao_model else 'nao_treinado',
+            'desempenhoModel': 'treinado' if bundle.desempenho_model else 'nao_treinado',
             'modelPath': self.model_path,
-            'lastUpdate': self._get_last_update()
+            'versao': bundle.version,
+            'metricas': bundle.manifest.get('metricas', {}),
+            'lastUpdate': bundle.manifest.get('criadoEm', 'nunca')
         }
-    
-    def _get_last_update(self) -> str:
-        """Obter data da última atualização dos modelos"""
-        try:
-            model_file = os.path.join(self.model_path, 'evasao_model.pkl')
-            if os.path.exists(model_file):
-                mtime = os.path.getmtime(model_file)
-                return datetime.fromtimestamp(mtime).isoformat()
-            return 'nunca'
-        except:
-            return 'desconhecido'
-
@@ -0,0 +1,241 @@
+"""
+Registro versionado de modelos
+Publicação atômica (diretório temporário + rename) e ponteiro CURRENT
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Arquivos de cada versão (também os nomes do layout antigo, plano em MODEL_PATH)
+ARQUIVOS = {
+    'evasao_model': 'evasao_model.pkl',
+    'desempenho_model': 'desempenho_model.pkl',
+    'scaler': 'scaler.pkl',
+}
+MANIFEST = 'manifest.json'
+CURRENT = 'CURRENT'
+VERSAO_LEGADA = 'legado'
+
+# Diretórios temporários mais antigos que isso são restos de publicações interrompidas
+_TMP_EXPIRACAO = 3600
+
+
+class ModelBundle:
+    """
+    Conjunto imutável de modelos de uma versão.
+
+    Modelo e scaler são trocados juntos: quem lê ``predictor._bundle`` uma
+    vez usa sempre um par consistente, mesmo que outra versão seja
+    publicada durante a requisição.
+    """
+
+    __slots__ = ('evasao_model', 'desempenho_model', 'scaler', 'version', 'manifest')
+
+    def __init__(self, evasao_model=None, desempenho_model=None, scaler=None,
+                 version: Optional[str] = None, manifest: Dict[str, Any] = None):
+        self.evasao_model = evasao_model
+        self.desempenho_model = desempenho_model
+        self.scaler = scaler
+        self.version = version
+        self.manifest = manifest or {}
+
+    def replace(self, **campos) -> 'ModelBundle':
+        valores = {nome: getattr(self, nome) for nome in self.__slots__}
+        valores.update(campos)
+        return ModelBundle(**valores)
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _fsync_arquivo(path: str):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path: str):
+    # Persistir renames; nem todo sistema permite abrir diretórios
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ModelRegistry:
+    """
+    Versões de modelos em ``<base>/versions/<versao>/`` com ``manifest.json``
+    (versão, data, hash de cada arquivo e métricas do treinamento).
+
+    Uma versão é gravada em um diretório temporário e só aparece em
+    ``versions/`` após ``os.rename``; em seguida o arquivo ``CURRENT`` é
+    substituído com ``os.replace``. Leitores nunca enxergam uma versão
+    pela metade, e a troca de versão é uma única operação atômica.
+    Sem ``CURRENT``, os arquivos ``.pkl`` planos do layout antigo são usados.
+
+    Os arquivos são gravados sem compressão para poderem ser abertos com
+    ``mmap_mode``: os arrays numpy ficam no page cache, compartilhados entre
+    os processos que carregam a mesma versão.
+    """
+
+    def __init__(self, base_path: str, keep: int = None, mmap_mode: Optional[str] = ''):
+        self.base_path = base_path
+        self.versions_path = os.path.join(base_path, 'versions')
+        self.keep = keep if keep is not None else int(os.getenv('ML_MODEL_KEEP_VERSIONS', 5))
+        if mmap_mode == '':
+            usar_mmap = os.getenv('ML_MODEL_MMAP', '1').lower() in ('1', 'true', 'yes', 'on')
+            mmap_mode = 'r' if usar_mmap else None
+        self.mmap_mode = mmap_mode
+        os.makedirs(self.versions_path, exist_ok=True)
+
+    # ---- ponteiro ----
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.base_path, CURRENT)
+
+    def pointer_state(self) -> Optional[int]:
+        """mtime (ns) do CURRENT; verificação barata de mudança de versão"""
+        try:
+            return os.stat(self.current_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(self.current_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    # ---- leitura ----
+    def load(self, version: str = None) -> ModelBundle:
+        """Carregar uma versão (padrão: a apontada por CURRENT, ou o layout antigo)"""
+        version = version or self.current_version()
+        if version is None:
+            return self._load_legado()
+
+        import joblib
+
+        diretorio = os.path.join(self.versions_path, version)
+        with open(os.path.join(diretorio, MANIFEST)) as f:
+            manifest = json.load(f)
+
+        modelos = {}
+        for nome, info in manifest['arquivos'].items():
+            path = os.path.join(diretorio, nome)
+            if _sha256(path) != info['sha256']:
+                raise ValueError(f'Hash divergente em {version}/{nome}')
+            modelos[nome] = joblib.load(path, mmap_mode=self.mmap_mode)
+
+        return ModelBundle(
+            evasao_model=modelos.get(ARQUIVOS['evasao_model']),
+            desempenho_model=modelos.get(ARQUIVOS['desempenho_model']),
+            scaler=modelos.get(ARQUIVOS['scaler']),
+            version=version,
+            manifest=manifest
+        )
+
+    def _load_legado(self) -> ModelBundle:
+        modelos = {}
+        for campo, nome in ARQUIVOS.items():
+            path = os.path.join(self.base_path, nome)
+            if os.path.exists(path):
+                import joblib
+                modelos[campo] = joblib.load(path, mmap_mode=self.mmap_mode)
+        if not modelos:
+            return ModelBundle()
+        mtime = os.path.getmtime(os.path.join(self.base_path, ARQUIVOS['evasao_model'])) \
+            if 'evasao_model' in modelos else None
+        manifest = {'versao': VERSAO_LEGADA}
+        if mtime is not None:
+            manifest['criadoEm'] = datetime.fromtimestamp(mtime).isoformat()
+        return ModelBundle(version=VERSAO_LEGADA, manifest=manifest, **modelos)
+
+    # ---- publicação ----
+    def publish(self, bundle: ModelBundle, metricas: Dict[str, Any] = None) -> ModelBundle:
+        """Gravar uma nova versão e torná-la a atual; retorna o bundle com versão e manifest"""
+        import joblib
+
+        agora = datetime.now()
+        version = f"{agora.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        tmp = os.path.join(self.versions_path, f'.tmp-{version}')
+        os.makedirs(tmp)
+        try:
+            arquivos = {}
+            for campo, nome in ARQUIVOS.items():
+                modelo = getattr(bundle, campo)
+                if modelo is None:
+                    continue
+                path = os.path.join(tmp, nome)
+                joblib.dump(modelo, path, compress=0)
+                _fsync_arquivo(path)
+                arquivos[nome] = {'sha256': _sha256(path), 'bytes': os.path.getsize(path)}
+
+            manifest = {
+                'versao': version,
+                'criadoEm': agora.isoformat(),
+                'hash': hashlib.sha256(
+                    ''.join(arquivos[nome]['sha256'] for nome in sorted(arquivos)).encode()
+                ).hexdigest(),
+                'arquivos': arquivos,
+                'metricas': metricas or {},
+            }
+            with open(os.path.join(tmp, MANIFEST), 'w') as f:
+                json.dump(manifest, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.rename(tmp, os.path.join(self.versions_path, version))
+            _fsync_dir(self.versions_path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        self._set_current(version)
+        self.prune()
+        return bundle.replace(version=version, manifest=manifest)
+
+    def _set_current(self, version: str):
+        tmp = f'{self.current_path}.{uuid.uuid4().hex[:8]}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.current_path)
+        _fsync_dir(self.base_path)
+
+    def list_versions(self):
+        """Versões publicadas, da mais antiga para a mais nova"""
+        return sorted(
+            nome for nome in os.listdir(self.versions_path)
+            if not nome.startswith('.') and os.path.isdir(os.path.join(self.versions_path, nome))
+        )
+
+    def prune(self):
+        """Remover versões antigas (mantém ``keep`` e nunca a atual)"""
+        atual = self.current_version()
+        antigas = [v for v in self.list_versions() if v != atual]
+        excedentes = len(antigas) - max(self.keep - 1, 0)
+        for version in antigas[:max(excedentes, 0)]:
+            shutil.rmtree(os.path.join(self.versions_path, version), ignore_errors=True)
+
+        limite = time.time() - _TMP_EXPIRACAO
+        for nome in os.listdir(self.versions_path):
+            path = os.path.join(self.versions_path, nome)
+            if nome.startswith('.tmp-') and os.path.getmtime(path) < limite:
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,50 @@
+"""
+Paginação por keyset: cursor opaco sobre ``(criado_em, id)``, do mais novo
+para o mais antigo
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Condição SQL "depois do cursor" na ordem (criado_em DESC, id DESC); o prefixo
+# é o alias da tabela. Parâmetros: criado_em, criado_em, id
+FILTRO_KEYSET = "({t}.criado_em < %s OR ({t}.criado_em = %s AND {t}.id < %s))"
+
+
+def codificar_cursor(criado_em, registro_id: str) -> str:
+    """Cursor da posição ``(criado_em, id)`` (base64 url-safe, sem padding)"""
+    if isinstance(criado_em, datetime):
+        criado_em = criado_em.isoformat(' ')
+    conteudo = json.dumps([str(criado_em), registro_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(conteudo.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Posição ``(criado_em, id)`` de um cursor; ValueError se inválido"""
+    try:
+        conteudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        criado_em, registro_id = json.loads(conteudo)
+        return datetime.fromisoformat(criado_em), str(registro_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('cursor inválido') from e
+
+
+def filtro_keyset(alias: str, apos: Optional[Tuple[datetime, str]]) -> Tuple[str, tuple]:
+    """Trecho ``AND ...`` e parâmetros para continuar depois de ``apos`` (vazio na primeira página)"""
+    if apos is None:
+        return '', ()
+    criado_em, registro_id = apos
+    return ' AND ' + FILTRO_KEYSET.format(t=alias), (criado_em, criado_em, registro_id)
+
+
+def fatiar_pagina(linhas: List[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Página e cursor da próxima a partir de ``limit + 1`` linhas lidas: a
+    linha extra só indica que há mais (``None`` no fim da lista)
+    """
+    if len(linhas) <= limit:
+        return linhas, None
+    pagina = linhas[:limit]
+    ultima = pagina[-1]
+    return pagina, codificar_cursor(ultima['criado_em'], ultima['id'])
@@ -0,0 +1,211 @@
+"""
+Profiling opcional por requisição
+Tempo por consulta ao banco, etapa dos serviços e serialização
+"""
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import pstats
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Perfil da requisição em andamento (None fora do modo profiling)
+_perfil_atual = contextvars.ContextVar('ml_perfil_atual', default=None)
+
+
+class RequestProfile:
+    """
+    Etapas cronometradas de uma requisição.
+
+    As etapas podem ser aninhadas (ex.: ``analytics`` -> ``db``); o tempo
+    exclusivo de cada uma desconta as filhas, então o resumo por categoria
+    soma o tempo total da requisição (o que sobra fica em ``flask``).
+    """
+
+    def __init__(self, metodo: str, url: str, cprofile: bool = False):
+        self.id = uuid.uuid4().hex
+        self.metodo = metodo
+        self.url = url
+        self.criado_em = datetime.now().isoformat()
+        self.etapas: List[Dict[str, Any]] = []
+        self._pilha: List[Dict[str, Any]] = []
+        self._inicio = time.perf_counter()
+        self._profiler = cProfile.Profile() if cprofile else None
+        self.total_ms = None
+
+    def iniciar(self):
+        if self._profiler is None:
+            return
+        try:
+            self._profiler.enable()
+        except ValueError:
+            # Outro profiler já ativo no processo: fica só com as etapas
+            self._profiler = None
+
+    def entrar(self, categoria: str, nome: str) -> Dict[str, Any]:
+        etapa = {
+            'categoria': categoria,
+            'nome': nome,
+            'nivel': len(self._pilha),
+            'inicioMs': round((time.perf_counter() - self._inicio) * 1000, 3),
+            '_filhos': 0.0,
+            '_t0': time.perf_counter(),
+        }
+        self.etapas.append(etapa)
+        self._pilha.append(etapa)
+        return etapa
+
+    def sair(self, etapa: Dict[str, Any], **extra):
+        duracao = (time.perf_counter() - etapa.pop('_t0')) * 1000
+        self._pilha.pop()
+        etapa['duracaoMs'] = round(duracao, 3)
+        etapa['exclusivoMs'] = round(duracao - etapa.pop('_filhos'), 3)
+        etapa.update(extra)
+        if self._pilha:
+            self._pilha[-1]['_filhos'] += duracao
+
+    def finalizar(self, rota: str, status: int) -> Dict[str, Any]:
+        if self._profiler is not None:
+            self._profiler.disable()
+        self.total_ms = (time.perf_counter() - self._inicio) * 1000
+
+        resumo: Dict[str, Dict[str, float]] = {}
+        for etapa in self.etapas:
+            if 'duracaoMs' not in etapa:
+                continue
+            item = resumo.setdefault(etapa['categoria'], {'ms': 0.0, 'chamadas': 0})
+            item['ms'] += etapa['exclusivoMs']
+            item['chamadas'] += 1
+        medido = sum(item['ms'] for item in resumo.values())
+        resumo['flask'] = {'ms': max(self.total_ms - medido, 0.0), 'chamadas': 1}
+        for item in resumo.values():
+            item['ms'] = round(item['ms'], 3)
+
+        return {
+            'id': self.id,
+            'metodo': self.metodo,
+            'rota': rota,
+            'url': self.url,
+            'status': status,
+            'criadoEm': self.criado_em,
+            'totalMs': round(self.total_ms, 3),
+            'resumo': resumo,
+            'etapas': self.etapas,
+            'cprofile': self._top_funcoes() if self._profiler is not None else None,
+        }
+
+    def _top_funcoes(self, limite: int = 30) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self._profiler)
+        linhas = []
+        for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in stats.stats.items():
+            linhas.append({
+                'funcao': f'{os.path.basename(arquivo)}:{linha}({funcao})',
+                'chamadas': chamadas,
+                'tempoProprioMs': round(proprio * 1000, 3),
+                'tempoAcumuladoMs': round(acumulado * 1000, 3),
+            })
+        linhas.sort(key=lambda x: -x['tempoAcumuladoMs'])
+        return linhas[:limite]
+
+
+def ativo() -> Optional[RequestProfile]:
+    return _perfil_atual.get()
+
+
+def ativar(perfil: RequestProfile):
+    _perfil_atual.set(perfil)
+
+
+def desativar():
+    _perfil_atual.set(None)
+
+
+@contextmanager
+def etapa(categoria: str, nome: str):
+    """
+    Cronometrar um trecho se a requisição estiver sendo perfilada (sem custo
+    caso contrário). O dict devolvido recebe dados extras da etapa (ex.: linhas).
+    """
+    perfil = _perfil_atual.get()
+    extra = {}
+    if perfil is None:
+        yield extra
+        return
+    registro = perfil.entrar(categoria, nome)
+    try:
+        yield extra
+    finally:
+        perfil.sair(registro, **extra)
+
+
+def medir_etapa(categoria: str):
+    """Decorator de ``etapa`` com o nome qualificado da função"""
+    def decorator(fn):
+        nome = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _perfil_atual.get() is None:
+                return fn(*args, **kwargs)
+            with etapa(categoria, nome):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(relatorio: Dict[str, Any]) -> str:
+    """Valor do header ``Server-Timing`` com o tempo por categoria"""
+    partes = [
+        f'{categoria};dur={item["ms"]:.1f};desc="{item["chamadas"]}x"'
+        for categoria, item in sorted(relatorio['resumo'].items(), key=lambda x: -x[1]['ms'])
+    ]
+    partes.append(f'total;dur={relatorio["totalMs"]:.1f}')
+    return ', '.join(partes)
+
+
+class ProfileStore:
+    """
+    Relatórios gravados em ``<diretorio>/<id>.json``, legíveis por qualquer
+    worker. Mantém os ``max_profiles`` mais recentes.
+    """
+
+    def __init__(self, diretorio: str = None, max_profiles: int = None):
+        self.diretorio = diretorio or os.getenv(
+            'ML_PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'ml-service-profiles')
+        )
+        self.max_profiles = max_profiles if max_profiles is not None else int(os.getenv('ML_PROFILING_MAX', 200))
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def save(self, relatorio: Dict[str, Any]):
+        path = os.path.join(self.diretorio, f"{relatorio['id']}.json")
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(relatorio, f, default=str)
+        os.replace(tmp, path)
+        self._podar()
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.diretorio, f'{profile_id}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _podar(self):
+        arquivos = [os.path.join(self.diretorio, n) for n in os.listdir(self.diretorio) if n.endswith('.json')]
+        if len(arquivos) <= self.max_profiles:
+            return
+        arquivos.sort(key=os.path.getmtime)
+        for path in arquivos[:len(arquivos) - self.max_profiles]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
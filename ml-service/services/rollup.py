@@ -0,0 +1,226 @@
+"""
+Rollup incremental de agregados por aluno
+
+Mantém as tabelas ``ml_aluno_stats`` (por aluno e turma) e
+``ml_aluno_questionarios`` (pares aluno/questionário já respondidos)
+atualizadas a partir das respostas novas desde um watermark em
+``respostas.criado_em``. As leituras dos dashboards passam a custar
+O(alunos) em vez de O(total de respostas).
+
+A atualização incremental só soma linhas novas. Remoções, edições e
+respostas confirmadas depois do watermark (transação mais longa que
+``ML_ROLLUP_LAG``) são corrigidas por reconstrução: pedida pelo backend
+(``mark_rebuild``) ou disparada pela verificação periódica dos totais.
+
+As tabelas são criadas pelas migrations do Prisma (backend/prisma).
+"""
+import os
+import threading
+import time
+
+EPOCH = '1970-01-01 00:00:00'
+
+
+class AlunoStatsRollup:
+    NOME = 'aluno_stats'
+
+    def __init__(self, db_service, refresh_interval: float = None, lag: float = None,
+                 check_interval: float = None):
+        self.db = db_service
+        # Intervalo mínimo entre atualizações incrementais (segundos)
+        self.refresh_interval = refresh_interval if refresh_interval is not None else float(
+            os.getenv('ML_ROLLUP_REFRESH_INTERVAL', 30))
+        # Respostas mais novas que isso ficam para a próxima rodada, dando tempo
+        # para transações em andamento no backend serem confirmadas. O filtro é
+        # por criado_em (hora do INSERT), não pela hora do commit: uma transação
+        # confirmada mais de ``lag`` segundos depois do seu criado_em fica atrás
+        # do watermark e só entra pela verificação periódica (check_interval).
+        # A atualização pedida pelo aviso do backend (mark_stale) não usa o lag:
+        # as respostas avisadas já foram confirmadas; outra transação ainda
+        # aberta nesse instante também fica para a verificação periódica
+        self.lag = lag if lag is not None else float(os.getenv('ML_ROLLUP_LAG', 2))
+        # Intervalo entre verificações dos totais do rollup contra respostas
+        # (segundos; 0 desliga). Divergência dispara rebuild()
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv('ML_ROLLUP_CHECK_INTERVAL', 300))
+
+        self._lock = threading.Lock()
+        self._ready = False
+        self._stale = True
+        self._notificado = False
+        self._rebuild_pending = False
+        self._last_attempt = None
+        self._last_check = None
+
+    def mark_stale(self):
+        """
+        Forçar atualização na próxima leitura (ex.: após nova resposta).
+
+        O aviso do backend chega depois do commit das respostas: essa
+        atualização não espera ``lag`` e inclui as respostas avisadas.
+        """
+        self._notificado = True
+        self._stale = True
+
+    def mark_rebuild(self):
+        """Reconstruir o rollup na próxima leitura (ex.: após remoção de respostas)"""
+        self._rebuild_pending = True
+        self._stale = True
+
+    def ensure_fresh(self) -> bool:
+        """
+        Atualizar o rollup se necessário.
+
+        Retorna True se as tabelas do rollup podem ser lidas; False se ainda não
+        foram construídas (ou não existem), caso em que o chamador deve
+        consultar ``respostas`` diretamente.
+        """
+        now = time.monotonic()
+        if self._ready and not self._stale and now - self._last_attempt < self.refresh_interval:
+            return True
+        if self._last_attempt is not None and not self._ready and now - self._last_attempt < self.refresh_interval:
+            return False
+
+        # Apenas uma thread atualiza; as demais seguem com os dados atuais
+        if not self._lock.acquire(blocking=False):
+            return self._ready
+        try:
+            self._last_attempt = now
+            if self._rebuild_pending:
+                self.rebuild()
+            else:
+                self.refresh(lag=0 if self._notificado else None)
+                if self.check_interval and (self._last_check is None or now - self._last_check >= self.check_interval):
+                    self._last_check = now
+                    if not self.consistente():
+                        print(f"Rollup {self.NOME} divergente de respostas: reconstruindo")
+                        self.rebuild()
+            self._ready = True
+        except Exception as e:
+            print(f"Erro ao atualizar rollup {self.NOME}: {e}")
+        finally:
+            self._lock.release()
+        return self._ready
+
+    def refresh(self, lag: float = None) -> int:
+        """
+        Incorporar as respostas criadas desde o último watermark, exceto as
+        dos últimos ``lag`` segundos (padrão: ``self.lag``)
+        """
+        self._stale = False
+        self._notificado = False
+        with self.db.transaction() as cursor:
+            watermark = self._lock_state(cursor)
+            processadas = self._apply(cursor, watermark, self.lag if lag is None else lag)
+        return processadas
+
+    def rebuild(self) -> int:
+        """
+        Recalcular o rollup do zero.
+
+        Necessário quando respostas são removidas (ex.: exclusão em cascata de
+        um questionário), já que a atualização incremental só soma linhas novas.
+        """
+        self._stale = False
+        self._notificado = False
+        self._rebuild_pending = False
+        with self.db.transaction() as cursor:
+            self._lock_state(cursor)
+            cursor.execute("DELETE FROM ml_aluno_stats")
+            cursor.execute("DELETE FROM ml_aluno_questionarios")
+            processadas = self._apply(cursor, EPOCH, self.lag)
+        self._ready = True
+        return processadas
+
+    def consistente(self) -> bool:
+        """
+        Comparar os totais do rollup (respostas, notas e soma das notas) com
+        as respostas até o watermark, em uma única leitura consistente.
+
+        Pega respostas removidas ou editadas e as confirmadas atrás do
+        watermark. Custa uma varredura de respostas: por isso só roda a cada
+        ``check_interval``.
+        """
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT watermark FROM ml_rollup_state WHERE nome = %s", (self.NOME,))
+            estado = cursor.fetchone()
+            if estado is None:
+                return True
+            cursor.execute("""
+                SELECT COUNT(*) as total_respostas, COUNT(valor_num) as total_notas,
+                       COALESCE(SUM(valor_num), 0) as soma_notas
+                FROM respostas
+                WHERE criado_em <= %s
+            """, (estado['watermark'],))
+            esperado = cursor.fetchone()
+            cursor.execute("""
+                SELECT COALESCE(SUM(total_respostas), 0) as total_respostas,
+                       COALESCE(SUM(total_notas), 0) as total_notas,
+                       COALESCE(SUM(soma_notas), 0) as soma_notas
+                FROM ml_aluno_stats
+            """)
+            atual = cursor.fetchone()
+        return (int(esperado['total_respostas']) == int(atual['total_respostas'])
+                and int(esperado['total_notas']) == int(atual['total_notas'])
+                and abs(float(esperado['soma_notas']) - float(atual['soma_notas'])) < 1e-6)
+
+    def _lock_state(self, cursor):
+        """Obter o watermark bloqueando a linha de estado (serializa workers)"""
+        cursor.execute(
+            "INSERT IGNORE INTO ml_rollup_state (nome, watermark, atualizado_em) VALUES (%s, %s, NOW(3))",
+            (self.NOME, EPOCH)
+        )
+        cursor.execute(
+            "SELECT watermark FROM ml_rollup_state WHERE nome = %s FOR UPDATE",
+            (self.NOME,)
+        )
+        return cursor.fetchone()['watermark']
+
+    def _apply(self, cursor, watermark, lag: float) -> int:
+        """Agregar respostas em (watermark, limite] e somar ao rollup"""
+        cursor.execute("""
+            SELECT MAX(criado_em) as limite, COUNT(*) as total
+            FROM respostas
+            WHERE criado_em > %s AND criado_em <= NOW(3) - INTERVAL %s SECOND
+        """, (watermark, lag))
+        janela = cursor.fetchone()
+        limite = janela['limite']
+        if limite is None:
+            return 0
+
+        cursor.execute("""
+            INSERT INTO ml_aluno_stats (
+                aluno_id, turma_id, total_respostas, soma_notas, total_notas,
+                primeira_resposta, ultima_resposta
+            )
+            SELECT
+                aluno_id,
+                COALESCE(turma_id, '') as turma_id,
+                COUNT(*),
+                COALESCE(SUM(valor_num), 0),
+                COUNT(valor_num),
+                MIN(criado_em),
+                MAX(criado_em)
+            FROM respostas
+            WHERE criado_em > %s AND criado_em <= %s
+            GROUP BY aluno_id, COALESCE(turma_id, '')
+            ON DUPLICATE KEY UPDATE
+                total_respostas = total_respostas + VALUES(total_respostas),
+                soma_notas = soma_notas + VALUES(soma_notas),
+                total_notas = total_notas + VALUES(total_notas),
+                primeira_resposta = LEAST(COALESCE(primeira_resposta, VALUES(primeira_resposta)), VALUES(primeira_resposta)),
+                ultima_resposta = GREATEST(COALESCE(ultima_resposta, VALUES(ultima_resposta)), VALUES(ultima_resposta))
+        """, (watermark, limite))
+
+        cursor.execute("""
+            INSERT IGNORE INTO ml_aluno_questionarios (aluno_id, questionario_id)
+            SELECT DISTINCT aluno_id, questionario_id
+            FROM respostas
+            WHERE criado_em > %s AND criado_em <= %s
+        """, (watermark, limite))
+
+        cursor.execute(
+            "UPDATE ml_rollup_state SET watermark = %s, atualizado_em = NOW(3) WHERE nome = %s",
+            (limite, self.NOME)
+        )
+        return janela['total']
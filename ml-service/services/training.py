@@ -0,0 +1,352 @@
+"""
+Treinamento de modelos em segundo plano
+Jobs executados em um pool de processos, com status consultável e single-flight
+"""
+import fcntl
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.metrics import TREINAMENTO_DURACAO
+
+ATIVOS = ('pendente', 'executando')
+
+# Fila de progresso do processo filho (definida pelo initializer do pool)
+_fila_progresso = None
+
+
+def _init_worker(fila):
+    global _fila_progresso
+    _fila_progresso = fila
+
+
+def run_training(job_id: str) -> Dict[str, Any]:
+    """
+    Executado no processo do pool: cria serviços próprios (conexões não são
+    compartilhadas entre processos), treina e devolve o resultado.
+    """
+    from services.database import DatabaseService
+    from services.ml_predictor import MLPredictor
+
+    def progresso(etapa: str, percentual: int):
+        if _fila_progresso is not None:
+            _fila_progresso.put((job_id, etapa, percentual, time.time()))
+
+    progresso('iniciando', 0)
+    db = DatabaseService()
+    try:
+        return MLPredictor(db).train_models(progress=progresso)
+    finally:
+        db.close()
+
+
+class TrainingJobManager:
+    """
+    Registro de jobs de treinamento.
+
+    Apenas um treinamento roda por vez (single-flight): enquanto há um job
+    pendente ou em execução, ``submit`` devolve esse mesmo job em vez de
+    iniciar outro ajuste. Os jobs rodam em um ``ProcessPoolExecutor`` de um
+    processo (contexto ``spawn``, sem herdar sockets e threads do Flask);
+    o progresso volta por uma fila e é aplicado por uma thread de acompanhamento.
+
+    Com ``state_dir``, o status de cada job também é gravado em
+    ``<state_dir>/<jobId>.json`` e o single-flight passa a valer entre
+    processos (vários workers do gunicorn): quem inicia o treinamento segura
+    um ``flock`` em ``<state_dir>/treinamento.lock`` até o job terminar, e os
+    demais workers respondem com o job ativo lido do disco. Um job ainda
+    pendente/em execução no disco cujo dono não segura mais o lock (worker
+    reciclado ou morto) é lido como ``falhou``.
+    """
+
+    def __init__(self, runner: Callable[[str], Dict[str, Any]] = run_training,
+                 on_complete: Callable[[Dict[str, Any]], None] = None,
+                 max_jobs: int = None, mp_context: str = None, state_dir: str = None):
+        self.runner = runner
+        self.on_complete = on_complete
+        self.max_jobs = max_jobs if max_jobs is not None else int(os.getenv('ML_TRAINING_MAX_JOBS', 50))
+        self._ctx = multiprocessing.get_context(mp_context or os.getenv('ML_TRAINING_MP_CONTEXT', 'spawn'))
+        self.state_dir = state_dir
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._jobs: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._ativo: Optional[str] = None
+        self._executor = None
+        self._fila = None
+        self._flock = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._fila = self._ctx.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=self._ctx,
+                initializer=_init_worker, initargs=(self._fila,)
+            )
+        return self._executor
+
+    def submit(self) -> Tuple[Dict[str, Any], bool]:
+        """Iniciar um treinamento; retorna (job, criado). Reaproveita o job ativo"""
+        with self._lock:
+            if self._ativo is not None:
+                return self._snapshot(self._jobs[self._ativo]), False
+            if not self._adquirir_flock_locked():
+                ativo = self._ler_ativo()
+                if ativo is not None:
+                    return ativo, False
+                raise RuntimeError('Treinamento em andamento em outro processo')
+
+            job_id = str(uuid.uuid4())
+            job = {
+                'jobId': job_id,
+                'status': 'pendente',
+                'etapa': None,
+                'progresso': 0,
+                'criadoEm': datetime.now().isoformat(),
+                'iniciadoEm': None,
+                'concluidoEm': None,
+                'duracaoSegundos': None,
+                'resultado': None,
+                'erro': None,
+                '_criado': time.time(),
+                '_inicio': None,
+            }
+            self._jobs[job_id] = job
+            self._ativo = job_id
+            while len(self._jobs) > self.max_jobs:
+                antigo = next(iter(self._jobs))
+                if antigo == job_id:
+                    break
+                del self._jobs[antigo]
+            self._gravar_locked(job, ativo=True)
+            self._podar_estado_locked()
+
+            try:
+                future = self._get_executor().submit(self.runner, job_id)
+            except Exception as e:
+                self._finalizar_locked(job, None, e)
+                return self._snapshot(job), True
+
+        threading.Thread(target=self._acompanhar, args=(future,), daemon=True).start()
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return self._snapshot(job), True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status de um job (ou None se desconhecido)"""
+        with self._lock:
+            self._drenar_progresso_locked()
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return self._snapshot(job)
+        # Job iniciado por outro processo
+        job = self._ler_job(job_id)
+        if job is not None and job['status'] in ATIVOS and self._job_orfao(job_id):
+            job = self._marcar_orfao(job)
+        return job
+
+    def active_job(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._drenar_progresso_locked()
+            return self._snapshot(self._jobs[self._ativo]) if self._ativo else None
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ---- internos ----
+    def _acompanhar(self, future):
+        # Aplica o progresso enquanto o job roda, para que o status gravado
+        # em disco (lido pelos outros workers) acompanhe o andamento
+        while not future.done():
+            time.sleep(0.5)
+            with self._lock:
+                self._drenar_progresso_locked()
+
+    def _on_done(self, job_id: str, future):
+        if future.cancelled():
+            erro, resultado = RuntimeError('Treinamento cancelado'), None
+        else:
+            erro = future.exception()
+            resultado = None if erro else future.result()
+        with self._lock:
+            self._drenar_progresso_locked()
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = {'jobId': job_id, '_criado': time.time(), '_inicio': None}
+            self._finalizar_locked(job, resultado, erro)
+            if isinstance(erro, BrokenProcessPool):
+                # O processo do pool morreu (ex.: OOM); o próximo job cria outro
+                self._executor = None
+            snapshot = self._snapshot(job)
+
+        if snapshot['status'] == 'concluido' and self.on_complete is not None:
+            try:
+                self.on_complete(snapshot)
+            except Exception as e:
+                print(f"Erro ao aplicar modelos treinados: {e}")
+
+    def _finalizar_locked(self, job: Dict[str, Any], resultado, erro):
+        agora = time.time()
+        sucesso = erro is None and isinstance(resultado, dict) and resultado.get('success', False)
+        job['status'] = 'concluido' if sucesso else 'falhou'
+        job['progresso'] = 100 if sucesso else job.get('progresso', 0)
+        job['resultado'] = resultado
+        job['erro'] = str(erro) if erro else (None if sucesso else (resultado or {}).get('error'))
+        job['concluidoEm'] = datetime.now().isoformat()
+        job['duracaoSegundos'] = round(agora - (job['_inicio'] or job['_criado']), 3)
+        TREINAMENTO_DURACAO.labels(job['status']).observe(job['duracaoSegundos'])
+        self._gravar_locked(job, ativo=False)
+        if self._ativo == job['jobId']:
+            self._ativo = None
+            self._liberar_flock_locked()
+
+    def _drenar_progresso_locked(self):
+        if self._fila is None:
+            return
+        while True:
+            try:
+                job_id, etapa, percentual, instante = self._fila.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] not in ATIVOS:
+                continue
+            if job['_inicio'] is None:
+                job['_inicio'] = instante
+                job['iniciadoEm'] = datetime.fromtimestamp(instante).isoformat()
+            job['status'] = 'executando'
+            job['etapa'] = etapa
+            job['progresso'] = percentual
+            job['duracaoSegundos'] = round(time.time() - job['_inicio'], 3)
+            self._gravar_locked(job)
+
+    # ---- estado compartilhado entre processos ----
+    def _adquirir_flock_locked(self) -> bool:
+        if not self.state_dir:
+            return True
+        fd = os.open(os.path.join(self.state_dir, 'treinamento.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._flock = fd
+        return True
+
+    def _liberar_flock_locked(self):
+        if self._flock is None:
+            return
+        try:
+            os.remove(os.path.join(self.state_dir, 'ativo'))
+        except FileNotFoundError:
+            pass
+        fcntl.flock(self._flock, fcntl.LOCK_UN)
+        os.close(self._flock)
+        self._flock = None
+
+    def _job_orfao(self, job_id: str) -> bool:
+        """O processo que iniciou o job ativo ``job_id`` não segura mais o lock"""
+        with self._lock:
+            if self._flock is not None:
+                return self._ativo != job_id
+        fd = os.open(os.path.join(self.state_dir, 'treinamento.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Lock com outro processo: órfão se ele já registrou outro job ativo
+            try:
+                with open(os.path.join(self.state_dir, 'ativo')) as f:
+                    return f.read().strip() not in ('', job_id)
+            except OSError:
+                return False
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return True
+        finally:
+            os.close(fd)
+
+    def _marcar_orfao(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Gravar como falho um job cujo processo terminou sem finalizá-lo"""
+        job = {
+            **job,
+            'status': 'falhou',
+            'erro': 'Processo do treinamento encerrado antes do fim',
+            'concluidoEm': datetime.now().isoformat(),
+        }
+        with self._lock:
+            self._gravar_locked(job)
+            try:
+                with open(os.path.join(self.state_dir, 'ativo')) as f:
+                    if f.read().strip() == job['jobId']:
+                        os.remove(f.name)
+            except OSError:
+                pass
+        return job
+
+    def _gravar_locked(self, job: Dict[str, Any], ativo: bool = None):
+        if not self.state_dir:
+            return
+        try:
+            path = os.path.join(self.state_dir, f"{job['jobId']}.json")
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self._snapshot(job), f, default=str)
+            os.replace(tmp, path)
+            if ativo:
+                with open(os.path.join(self.state_dir, 'ativo'), 'w') as f:
+                    f.write(job['jobId'])
+        except OSError as e:
+            print(f"Erro ao gravar status do job de treinamento: {e}")
+
+    def _ler_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not self.state_dir or os.sep in job_id or job_id.startswith('.'):
+            return None
+        try:
+            with open(os.path.join(self.state_dir, f'{job_id}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _ler_ativo(self) -> Optional[Dict[str, Any]]:
+        # O dono do lock grava o job logo após adquiri-lo; tolera essa janela
+        for _ in range(10):
+            try:
+                with open(os.path.join(self.state_dir, 'ativo')) as f:
+                    job = self._ler_job(f.read().strip())
+                if job is not None:
+                    return job
+            except OSError:
+                pass
+            time.sleep(0.05)
+        return None
+
+    def _podar_estado_locked(self):
+        if not self.state_dir:
+            return
+        arquivos = [
+            os.path.join(self.state_dir, nome) for nome in os.listdir(self.state_dir)
+            if nome.endswith('.json')
+        ]
+        if len(arquivos) <= self.max_jobs:
+            return
+        arquivos.sort(key=os.path.getmtime)
+        for path in arquivos[:len(arquivos) - self.max_jobs]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in job.items() if not k.startswith('_')}
@@ -0,0 +1,186 @@
+"""
+Tendência de séries temporais de notas, vetorizada para vários alunos de uma vez
+
+As séries chegam "achatadas": ``grupos`` (código 0..n-1 do aluno de cada nota,
+com cada aluno em um bloco contíguo), ``tempos`` (em dias, crescentes dentro de
+cada bloco) e ``valores``. Cada estimador faz uma passada NumPy sobre todas as
+notas, sem loop por aluno.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Notas mais recentes consideradas por aluno: limita o custo do Theil–Sen
+# (O(k²) pares por aluno) e faz a tendência refletir o período recente
+JANELA_NOTAS = 100
+# Meia-vida (dias) da média exponencial: uma nota de 30 dias atrás pesa metade
+MEIA_VIDA_DIAS = 30.0
+
+# Rótulos (insuficiente, queda, estável, alta)
+ROTULOS_ANALYTICS = ('dados_insuficientes', 'decrescente', 'estavel', 'crescente')
+ROTULOS_DESEMPENHO = ('insuficiente', 'piorando', 'estavel', 'melhorando')
+
+
+def dias(datas) -> np.ndarray:
+    """Datas (datetime, ISO ou datetime64) como dias desde a época, em float"""
+    return np.asarray(datas, dtype='datetime64[s]').astype(np.int64) / 86400.0
+
+
+def _blocos(grupos: np.ndarray, n_grupos: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantidade de notas e posição de início do bloco de cada grupo"""
+    contagens = np.bincount(grupos, minlength=n_grupos)
+    return contagens, np.cumsum(contagens) - contagens
+
+
+def amplitude(grupos: np.ndarray, tempos: np.ndarray, n_grupos: int) -> np.ndarray:
+    """Dias entre a primeira e a última nota de cada grupo (0 sem notas)"""
+    contagens, inicios = _blocos(grupos, n_grupos)
+    resultado = np.zeros(n_grupos)
+    tem = contagens > 0
+    resultado[tem] = tempos[inicios[tem] + contagens[tem] - 1] - tempos[inicios[tem]]
+    return resultado
+
+
+def inclinacao_mq(grupos: np.ndarray, tempos: np.ndarray, valores: np.ndarray, n_grupos: int) -> np.ndarray:
+    """
+    Inclinação (nota por dia) por mínimos quadrados de cada grupo.
+
+    Somas por grupo com ``np.bincount`` sobre tempos e valores centrados na
+    média do grupo. NaN quando todas as notas do grupo têm o mesmo instante.
+    """
+    contagens = np.bincount(grupos, minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_t = np.bincount(grupos, tempos, n_grupos) / contagens
+        media_v = np.bincount(grupos, valores, n_grupos) / contagens
+        dt = tempos - media_t[grupos]
+        sxx = np.bincount(grupos, dt * dt, n_grupos)
+        sxy = np.bincount(grupos, dt * (valores - media_v[grupos]), n_grupos)
+        return np.where(amplitude(grupos, tempos, n_grupos) > 0, sxy / sxx, np.nan)
+
+
+def inclinacao_theil_sen(grupos: np.ndarray, tempos: np.ndarray, valores: np.ndarray, n_grupos: int) -> np.ndarray:
+    """
+    Inclinação de Theil–Sen (mediana das inclinações entre todos os pares de
+    notas com instantes diferentes) de cada grupo: robusta a notas atípicas.
+
+    Os pares de todos os grupos são montados de uma vez (``np.repeat``) e as
+    medianas saem de um único sort por (grupo, inclinação). São k(k-1)/2
+    pares por grupo de k notas: limite k (ver ``JANELA_NOTAS``).
+    """
+    contagens, inicios = _blocos(grupos, n_grupos)
+    posicoes = np.arange(len(grupos))
+    # Para cada nota i, os pares (i, j) com j posterior no mesmo grupo
+    seguintes = (inicios + contagens)[grupos] - posicoes - 1
+    i = np.repeat(posicoes, seguintes)
+    inicio_pares = np.cumsum(seguintes) - seguintes
+    j = i + 1 + np.arange(len(i)) - np.repeat(inicio_pares, seguintes)
+
+    dt = tempos[j] - tempos[i]
+    distintos = dt > 0
+    i, j, dt = i[distintos], j[distintos], dt[distintos]
+    inclinacoes = (valores[j] - valores[i]) / dt
+    grupo_par = grupos[i]
+
+    # Ordem (grupo, inclinação): sort dos valores e depois sort estável pelo
+    # grupo. Com códigos de 16 bits o sort estável é radix: ~4x mais rápido
+    # que ``np.lexsort`` em 1M de pares
+    ordem = np.argsort(inclinacoes)
+    tipo_grupo = np.uint16 if n_grupos <= 1 << 16 else np.intp
+    ordem = ordem[np.argsort(grupo_par[ordem].astype(tipo_grupo), kind='stable')]
+    inclinacoes = inclinacoes[ordem]
+    n_pares, inicio = _blocos(grupo_par, n_grupos)
+
+    resultado = np.full(n_grupos, np.nan)
+    tem = n_pares > 0
+    baixo = inicio[tem] + (n_pares[tem] - 1) // 2
+    alto = inicio[tem] + n_pares[tem] // 2
+    resultado[tem] = (inclinacoes[baixo] + inclinacoes[alto]) / 2
+    return resultado
+
+
+def media_exponencial(grupos: np.ndarray, tempos: np.ndarray, valores: np.ndarray, n_grupos: int,
+                      meia_vida: float = MEIA_VIDA_DIAS) -> np.ndarray:
+    """
+    Média exponencialmente ponderada no tempo de cada grupo: o peso de uma
+    nota cai à metade a cada ``meia_vida`` dias antes da última nota do grupo
+    (intervalos irregulares entre notas são respeitados). NaN sem notas.
+    """
+    contagens, inicios = _blocos(grupos, n_grupos)
+    ultimo = tempos[(inicios + contagens - 1)[grupos]]
+    pesos = np.exp2(-(ultimo - tempos) / meia_vida)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.bincount(grupos, pesos * valores, n_grupos) / np.bincount(grupos, pesos, n_grupos)
+
+
+def media_primeira_metade(grupos: np.ndarray, valores: np.ndarray, n_grupos: int) -> np.ndarray:
+    """
+    Média das primeiras ``k // 2`` notas de cada grupo de k notas (referência
+    inicial da predição de desempenho). NaN com menos de 2 notas.
+    """
+    contagens, inicios = _blocos(grupos, n_grupos)
+    metade = contagens // 2
+    primeiras = np.arange(len(grupos)) - inicios[grupos] < metade[grupos]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.bincount(grupos[primeiras], valores[primeiras], n_grupos) / metade
+
+
+def calcular_tendencias(grupos: np.ndarray, tempos: np.ndarray, valores: np.ndarray, n_grupos: int,
+                        metodo: str = 'theil_sen', meia_vida: float = MEIA_VIDA_DIAS) -> Dict[str, np.ndarray]:
+    """
+    Tendência de cada grupo (arrays de tamanho ``n_grupos``):
+
+    - ``total``: quantidade de notas
+    - ``media``: média simples
+    - ``media_inicial``: média da primeira metade das notas
+    - ``media_recente``: média exponencial (``media_exponencial``)
+    - ``inclinacao``: nota por dia (``theil_sen`` ou ``mq``)
+    - ``variacao``: variação ajustada entre a primeira e a última nota
+      (inclinação x ``dias``), comparável entre alunos com períodos diferentes
+    - ``dias``: dias entre a primeira e a última nota
+    """
+    if metodo == 'theil_sen':
+        inclinacao = inclinacao_theil_sen(grupos, tempos, valores, n_grupos)
+    elif metodo == 'mq':
+        inclinacao = inclinacao_mq(grupos, tempos, valores, n_grupos)
+    else:
+        raise ValueError(f'Método de tendência desconhecido: {metodo}')
+
+    total = np.bincount(grupos, minlength=n_grupos)
+    periodo = amplitude(grupos, tempos, n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.bincount(grupos, valores, n_grupos) / total
+    return {
+        'total': total,
+        'media': media,
+        'media_inicial': media_primeira_metade(grupos, valores, n_grupos),
+        'media_recente': media_exponencial(grupos, tempos, valores, n_grupos, meia_vida),
+        'inclinacao': inclinacao,
+        'variacao': inclinacao * periodo,
+        'dias': periodo,
+    }
+
+
+def classificar(tendencias: Dict[str, np.ndarray], limiar: float,
+                rotulos: Sequence[str] = ROTULOS_ANALYTICS, minimo: int = 3) -> List[str]:
+    """
+    Rótulo de cada grupo pela ``variacao``: alta acima de ``limiar``, queda
+    abaixo de ``-limiar``. Com menos de ``minimo`` notas ou todas no mesmo
+    instante, o rótulo de dados insuficientes.
+    """
+    variacao = tendencias['variacao']
+    indices = np.where(variacao > limiar, 3, np.where(variacao < -limiar, 1, 2))
+    indices[(tendencias['total'] < minimo) | np.isnan(variacao)] = 0
+    return [rotulos[i] for i in indices]
+
+
+def tendencias_do_frame(df: pd.DataFrame, chave: str = 'aluno_id', **kwargs) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Tendências a partir de um frame de notas (``chave``, ``criado_em``,
+    ``valor_num``) ordenado por chave e data. Retorna os ids na ordem dos
+    arrays de resultado e as tendências (ver ``calcular_tendencias``).
+    """
+    grupos, ids = pd.factorize(df[chave], sort=False)
+    return np.asarray(ids), calcular_tendencias(
+        grupos, dias(df['criado_em']), df['valor_num'].to_numpy(dtype=float), len(ids), **kwargs
+    )
@@ -1,6 +1,9 @@
 """
 Testes unitários do AnalyticsService
 """
+from datetime import datetime
+
+import pandas as pd
 import pytest
 from unittest.mock import MagicMock
 from services.analytics import AnalyticsService
@@ -19,10 +22,10 @@ def analytics(db_mock):
 
 class TestGetOverview:
     def test_retorna_total_alunos_correto(self, analytics, db_mock):
-        db_mock.get_alunos_data.return_value = [
+        db_mock.get_alunos_data.return_value = pd.DataFrame([
             {'id': '1', 'questionarios_respondidos': 3, 'media_notas': 8.0},
             {'id': '2', 'questionarios_respondidos': 0, 'media_notas': None},
-        ]
+        ])
         db_mock.get_questionarios_stats.return_value = [{'id': 'q1'}]
 
         result = analytics.get_overview()
@@ -31,12 +34,12 @@ class TestGetOverview:
         assert result['alunosAtivos'] == 1  # apenas 1 respondeu
 
     def test_taxa_engajamento_calcula_corretamente(self, analytics, db_mock):
-        db_mock.get_alunos_data.return_value = [
+        db_mock.get_alunos_data.return_value = pd.DataFrame([
             {'id': '1', 'questionarios_respondidos': 5, 'media_notas': 9.0},
             {'id': '2', 'questionarios_respondidos': 3, 'media_notas': 7.0},
             {'id': '3', 'questionarios_respondidos': 0, 'media_notas': None},
             {'id': '4', 'questionarios_respondidos': 0, 'media_notas': None},
-        ]
+        ])
         db_mock.get_questionarios_stats.return_value = []
 
         result = analytics.get_overview()
@@ -44,7 +47,7 @@ class TestGetOverview:
         assert result['taxaEngajamento'] == 50.0  # 2 de 4 ativos
 
     def test_sem_alunos_retorna_zeros(self, analytics, db_mock):
-        db_mock.get_alunos_data.return_value = []
+        db_mock.get_alunos_data.return_value = pd.DataFrame(columns=['id', 'questionarios_respondidos', 'media_notas'])
         db_mock.get_questionarios_stats.return_value = []
 
         result = analytics.get_overview()
@@ -61,10 +64,10 @@ class TestGetOverview:
         assert 'error' in result
 
     def test_media_notas_ignora_none(self, analytics, db_mock):
-        db_mock.get_alunos_data.return_value = [
+        db_mock.get_alunos_data.return_value = pd.DataFrame([
             {'id': '1', 'questionarios_respondidos': 2, 'media_notas': 8.0},
             {'id': '2', 'questionarios_respondidos': 1, 'media_notas': None},
-        ]
+        ])
         db_mock.get_questionarios_stats.return_value = []
 
         result = analytics.get_overview()
@@ -82,26 +85,58 @@ class TestGetTurmaAnalytics:
         assert 'error' in result
 
     def test_retorna_dados_da_turma(self, analytics, db_mock):
-        db_mock.get_alunos_data.return_value = [
-            {'id': 'a1', 'questionarios_respondidos': 4, 'media_notas': 7.5},
-        ]
-        db_mock.get_engagement_data.return_value = [
-            {'alunoId': 'a1', 'engajamento': 0.8},
-        ]
+        db_mock.get_student_features.return_value = pd.DataFrame([
+            {'id': 'a1', 'nome': 'Ana', 'questionarios_respondidos': 4, 'media_notas': 7.5, 'dias_ativo': 12},
+        ])
 
         result = analytics.get_turma_analytics('turma-1')
 
         assert 'turmaId' in result or 'totalAlunos' in result
 
     def test_chama_db_com_turma_id_correto(self, analytics, db_mock):
-        db_mock.get_alunos_data.return_value = [
-            {'id': 'a1', 'questionarios_respondidos': 1, 'media_notas': 7.0}
-        ]
-        db_mock.get_engagement_data.return_value = []
+        db_mock.get_student_features.return_value = pd.DataFrame([
+            {'id': 'a1', 'nome': 'Ana', 'questionarios_respondidos': 1, 'media_notas': 7.0, 'dias_ativo': None}
+        ])
 
         analytics.get_turma_analytics('turma-xyz')
 
-        db_mock.get_alunos_data.assert_called_with('turma-xyz')
+        db_mock.get_student_features.assert_called_with('turma-xyz', as_frame=True)
+
+    def test_usa_consulta_unica_de_features(self, analytics, db_mock):
+        db_mock.get_student_features.return_value = pd.DataFrame([
+            {'id': 'a1', 'nome': 'Ana', 'questionarios_respondidos': 3, 'media_notas': 8.0, 'dias_ativo': 20},
+        ])
+
+        result = analytics.get_turma_analytics('turma-1')
+
+        db_mock.get_student_features.assert_called_once_with('turma-1', as_frame=True)
+        db_mock.get_alunos_data.assert_not_called()
+        db_mock.get_engagement_data.assert_not_called()
+        assert result['topAlunos'][0]['diasAtivo'] == 20
+
+
+class TestRankingDaTurma:
+    def _alunos(self, respondidos):
+        return pd.DataFrame([
+            {'id': f'a{i}', 'nome': f'Aluno {i}', 'questionarios_respondidos': q, 'media_notas': 7.0, 'dias_ativo': 3}
+            for i, q in enumerate(respondidos)
+        ])
+
+    def test_pontas_iguais_ao_sort_completo(self, analytics, db_mock):
+        db_mock.get_student_features.return_value = self._alunos([3, 9, 0, 3, 7, 0, 1, 9, 3, 0, 2, 5])
+
+        result = analytics.get_turma_analytics('t1')
+
+        assert [a['id'] for a in result['topAlunos']] == ['a1', 'a7', 'a4', 'a11', 'a0']
+        assert [a['id'] for a in result['alunosEmRisco']] == ['a10', 'a6', 'a2', 'a5', 'a9']
+
+    def test_limit_e_offset_a_partir_de_cada_ponta(self, analytics, db_mock):
+        db_mock.get_student_features.return_value = self._alunos([3, 9, 0, 3, 7, 0, 1, 9, 3, 0, 2, 5])
+
+        result = analytics.get_turma_analytics('t1', limit=2, offset=1)
+
+        assert [a['id'] for a in result['topAlunos']] == ['a7', 'a4']
+        assert [a['id'] for a in result['alunosEmRisco']] == ['a2', 'a5']
 
 
 class TestGetAlunoAnalytics:
@@ -121,9 +156,106 @@ class TestGetAlunoAnalytics:
         assert result is not None
         assert not isinstance(result.get('error'), str) or 'aluno' in result.get('error', '').lower()
 
+    def test_agregados_do_banco_e_historico_de_10(self, analytics, db_mock):
+        db_mock.get_resumo_respostas_aluno.return_value = {
+            'total_respostas': 12, 'questionarios_respondidos': 3,
+            'primeira_resposta': datetime(2025, 3, 1), 'ultima_resposta': datetime(2025, 3, 11),
+            'total_notas': 6, 'media_notas': 6.666, 'melhor_nota': 9.0, 'pior_nota': 4.0,
+        }
+        db_mock.get_series_notas.return_value = pd.DataFrame({
+            'aluno_id': ['aluno-1'] * 6,
+            'criado_em': pd.date_range('2025-03-01', periods=6, freq='2D'),
+            'valor_num': [4.0, 5.0, 6.0, 7.0, 8.0, 9.0],
+        })
+        db_mock.get_respostas_aluno_page.return_value = [
+            {'id': 'r1', 'criado_em': datetime(2025, 3, 11), 'questionario_titulo': 'Q1', 'valor_num': 9.0}
+        ]
+
+        result = analytics.get_aluno_analytics('aluno-1')
+
+        db_mock.get_respostas_aluno_page.assert_called_once_with('aluno-1', 10)
+        db_mock.get_respostas_aluno.assert_not_called()
+        assert (result['totalRespostas'], result['questionariosRespondidos'], result['diasAtivo']) == (12, 3, 10)
+        assert (result['mediaNotas'], result['melhorNota'], result['piorNota']) == (6.67, 9.0, 4.0)
+        assert result['tendenciaNotas'] == 'crescente'
+        assert result['historicoRecente'] == [{'data': '2025-03-11T00:00:00', 'questionario': 'Q1', 'valor': 9.0}]
+
+    def test_sem_respostas(self, analytics, db_mock):
+        db_mock.get_resumo_respostas_aluno.return_value = {'total_respostas': 0}
+
+        result = analytics.get_aluno_analytics('aluno-1')
+
+        assert result['message'] == 'Aluno não possui respostas registradas'
+
     def test_retorna_erro_quando_aluno_nao_encontrado(self, analytics, db_mock):
         db_mock.get_aluno_data.return_value = None
 
         result = analytics.get_aluno_analytics('nao-existe')
 
         assert 'error' in result
+
+
+class TestGetAlunoRespostas:
+    def test_pagina_do_historico_com_cursor(self, analytics, db_mock):
+        db_mock.get_respostas_aluno_page.return_value = [
+            {'id': f'r{i}', 'criado_em': datetime(2025, 5, 10 - i), 'enunciado': 'Nota?',
+             'questionario_titulo': 'Q1', 'valor_num': 7.0}
+            for i in range(3)
+        ]
+
+        result = analytics.get_aluno_respostas('aluno-1', limit=2)
+
+        db_mock.get_respostas_aluno_page.assert_called_once_with('aluno-1', 3, None)
+        assert [r['id'] for r in result['respostas']] == ['r0', 'r1']
+        assert result['respostas'][0] == {'id': 'r0', 'pergunta': 'Nota?', 'data': '2025-05-10T00:00:00',
+                                          'questionario': 'Q1', 'valor': 7.0}
+        assert result['proximoCursor'] is not None
+
+    def test_ultima_pagina_sem_cursor(self, analytics, db_mock):
+        db_mock.get_respostas_aluno_page.return_value = []
+
+        result = analytics.get_aluno_respostas('aluno-1')
+
+        assert result == {'alunoId': 'aluno-1', 'respostas': [], 'proximoCursor': None}
+
+
+class TestGetEngagementPatterns:
+    def test_classifica_alunos_por_engajamento(self, analytics, db_mock):
+        db_mock.get_engagement_data.return_value = pd.DataFrame([
+            {'aluno_id': '1', 'aluno_nome': 'Ana', 'questionarios_respondidos': 6, 'dias_ativo': 10},
+            {'aluno_id': '2', 'aluno_nome': 'Bia', 'questionarios_respondidos': 3, 'dias_ativo': 4},
+            {'aluno_id': '3', 'aluno_nome': 'Caio', 'questionarios_respondidos': 0, 'dias_ativo': None},
+            {'aluno_id': '4', 'aluno_nome': 'Davi', 'questionarios_respondidos': 1, 'dias_ativo': 1},
+        ])
+
+        result = analytics.get_engagement_patterns()
+
+        assert 'error' not in result
+        assert result['altoEngajamento'] == {'total': 1, 'percentual': 25.0, 'alunos': ['Ana']}
+        assert result['baixoEngajamento']['percentual'] == 50.0
+        assert result['mediaDiasAtivo'] == 5.0
+
+
+class TestGetResponsePatterns:
+    def test_monta_distribuicao_e_media_a_partir_das_contagens(self, analytics, db_mock):
+        db_mock.get_perguntas_stats.return_value = [
+            {'pergunta_id': 'p1', 'enunciado': 'Como avalia?', 'tipo': 'MULTIPLA', 'valor_opcao': 'Bom',
+             'total_respostas': 1500, 'soma_num': None, 'total_num': 0},
+            {'pergunta_id': 'p1', 'enunciado': 'Como avalia?', 'tipo': 'MULTIPLA', 'valor_opcao': 'Sim, às vezes',
+             'total_respostas': 700, 'soma_num': None, 'total_num': 0},
+            {'pergunta_id': 'p2', 'enunciado': 'Nota', 'tipo': 'ESCALA', 'valor_opcao': None,
+             'total_respostas': 3, 'soma_num': 22, 'total_num': 3},
+            {'pergunta_id': 'p3', 'enunciado': 'Sem respostas', 'tipo': 'TEXTO', 'valor_opcao': None,
+             'total_respostas': 0, 'soma_num': None, 'total_num': 0},
+        ]
+
+        result = analytics.get_response_patterns('q1')
+
+        db_mock.get_perguntas_stats.assert_called_once_with('q1')
+        assert result['totalPerguntas'] == 3
+        assert result['analise'] == [
+            {'enunciado': 'Como avalia?', 'tipo': 'MULTIPLA', 'totalRespostas': 2200,
+             'distribuicao': {'Bom': 1500, 'Sim, às vezes': 700}},
+            {'enunciado': 'Nota', 'tipo': 'ESCALA', 'totalRespostas': 3, 'media': 7.33},
+            {'enunciado': 'Sem respostas', 'tipo': 'TEXTO', 'totalRespostas': 0},
+        ]
@@ -2,7 +2,11 @@
 Testes dos endpoints Flask do ML Service
 """
 import pytest
-from unittest.mock import MagicMock, patch
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from app import Services, create_app
+from services import pagination
 
 
 # ── Fixture: app Flask com dependências mockadas ───────────────────────────────
@@ -38,70 +42,65 @@ def mock_db():
 @pytest.fixture
 def app_client(mock_db):
     """Cliente de teste Flask com serviços mockados"""
-    with patch('services.database.DatabaseService', return_value=mock_db):
-        with patch('services.ml_predictor.MLPredictor') as MockPredictor:
-            with patch('services.analytics.AnalyticsService') as MockAnalytics:
-                # Configurar mocks
-                mock_predictor = MagicMock()
-                mock_predictor.get_models_status.return_value = {
-                    'evasao_model': 'não treinado',
-                    'desempenho_model': 'não treinado',
-                }
-                mock_predictor.predict_evasao_turma.return_value = {
-                    'turmaId': 'turma-1',
-                    'predictions': [{'alunoId': 'aluno-1', 'risco': 0.2}]
-                }
-                mock_predictor.predict_desempenho_aluno.return_value = {
-                    'alunoId': 'aluno-1',
-                    'tendencia': 'CRESCENTE',
-                    'confianca': 0.85
-                }
-                mock_predictor.train_models.return_value = {
-                    'status': 'treinamento concluído',
-                    'accuracy': 0.87
-                }
-
-                mock_analytics = MagicMock()
-                mock_analytics.get_overview.return_value = {
-                    'totalAlunos': 2,
-                    'alunosAtivos': 2,
-                    'totalQuestionarios': 1,
-                    'mediaRespostasPorAluno': 3.5,
-                    'mediaNotasGeral': 7.25,
-                    'taxaEngajamento': 100.0,
-                }
-                mock_analytics.get_turma_analytics.return_value = {
-                    'turmaId': 'turma-1',
-                    'totalAlunos': 2,
-                    'mediaEngajamento': 0.9,
-                }
-                mock_analytics.get_aluno_analytics.return_value = {
-                    'alunoId': 'aluno-1',
-                    'mediaNotas': 8.0,
-                    'questionariosRespondidos': 5,
-                }
-                mock_analytics.get_engagement_patterns.return_value = {
-                    'patterns': [],
-                    'summary': 'nenhum padrão'
-                }
-                mock_analytics.get_response_patterns.return_value = {
-                    'questionarioId': 'q-1',
-                    'patterns': []
-                }
-
-                MockPredictor.return_value = mock_predictor
-                MockAnalytics.return_value = mock_analytics
-
-                import importlib
-                import sys
-                # Remover módulos cacheados para forçar reimportação
-                for mod in ['app', 'services.database', 'services.ml_predictor', 'services.analytics']:
-                    sys.modules.pop(mod, None)
-
-                from app import app
-                app.config['TESTING'] = True
-                with app.test_client() as client:
-                    yield client, mock_predictor, mock_analytics
+    # Configurar mocks
+    mock_predictor = MagicMock()
+    mock_predictor.get_models_status.return_value = {
+        'evasao_model': 'não treinado',
+        'desempenho_model': 'não treinado',
+    }
+    mock_predictor.predict_evasao_turma.return_value = {
+        'turmaId': 'turma-1',
+        'predictions': [{'alunoId': 'aluno-1', 'risco': 0.2}]
+    }
+    mock_predictor.predict_desempenho_aluno.return_value = {
+        'alunoId': 'aluno-1',
+        'tendencia': 'CRESCENTE',
+        'confianca': 0.85
+    }
+    mock_predictor.train_models.return_value = {
+        'status': 'treinamento concluído',
+        'accuracy': 0.87
+    }
+
+    mock_analytics = MagicMock()
+    mock_analytics.get_overview.return_value = {
+        'totalAlunos': 2,
+        'alunosAtivos': 2,
+        'totalQuestionarios': 1,
+        'mediaRespostasPorAluno': 3.5,
+        'mediaNotasGeral': 7.25,
+        'taxaEngajamento': 100.0,
+    }
+    mock_analytics.get_turma_analytics.return_value = {
+        'turmaId': 'turma-1',
+        'totalAlunos': 2,
+        'mediaEngajamento': 0.9,
+    }
+    mock_analytics.get_aluno_analytics.return_value = {
+        'alunoId': 'aluno-1',
+        'mediaNotas': 8.0,
+        'questionariosRespondidos': 5,
+    }
+    mock_analytics.get_engagement_patterns.return_value = {
+        'patterns': [],
+        'summary': 'nenhum padrão'
+    }
+    mock_analytics.get_response_patterns.return_value = {
+        'questionarioId': 'q-1',
+        'patterns': []
+    }
+
+    services = Services(
+        db_service=mock_db,
+        ml_predictor=mock_predictor,
+        analytics_service=mock_analytics,
+        result_cache=None,
+        training_jobs=MagicMock()
+    )
+    app = create_app(services)
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client, mock_predictor, mock_analytics
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -152,6 +151,16 @@ class TestAnalyticsTurma:
         response = client.get('/analytics/turma/turma-1')
         assert response.status_code == 200
 
+    def test_turma_analytics_com_limit_e_offset(self, app_client):
+        client, _, mock_analytics = app_client
+        client.get('/analytics/turma/turma-1?limit=20&offset=40')
+        mock_analytics.get_turma_analytics.assert_called_once_with('turma-1', limit=20, offset=40)
+
+    def test_turma_analytics_limit_invalido_retorna_400(self, app_client):
+        client, _, _ = app_client
+        response = client.get('/analytics/turma/turma-1?limit=abc')
+        assert response.status_code == 400
+
     def test_turma_analytics_contem_turmaId(self, app_client):
         client, _, _ = app_client
         data = client.get('/analytics/turma/turma-1').get_json()
@@ -170,6 +179,29 @@ class TestAnalyticsAluno:
         assert 'alunoId' in data
 
 
+class TestAlunoRespostas:
+    def test_primeira_pagina_sem_cursor(self, app_client):
+        client, _, mock_analytics = app_client
+        mock_analytics.get_aluno_respostas.return_value = {'alunoId': 'aluno-1', 'respostas': [], 'proximoCursor': None}
+        response = client.get('/analytics/aluno/aluno-1/respostas?limit=30')
+        assert response.status_code == 200
+        mock_analytics.get_aluno_respostas.assert_called_once_with('aluno-1', 30, None)
+
+    def test_cursor_e_decodificado(self, app_client):
+        client, _, mock_analytics = app_client
+        mock_analytics.get_aluno_respostas.return_value = {'alunoId': 'aluno-1', 'respostas': [], 'proximoCursor': None}
+        cursor = pagination.codificar_cursor(datetime(2025, 3, 1, 10, 30), 'r-9')
+        client.get(f'/analytics/aluno/aluno-1/respostas?cursor={cursor}')
+        mock_analytics.get_aluno_respostas.assert_called_once_with('aluno-1', 20, (datetime(2025, 3, 1, 10, 30), 'r-9'))
+
+    @pytest.mark.parametrize('query', ['cursor=nao-e-cursor', 'offset=10', 'limit=100000'])
+    def test_parametros_invalidos_retornam_400(self, app_client, query):
+        client, _, mock_analytics = app_client
+        response = client.get(f'/analytics/aluno/aluno-1/respostas?{query}')
+        assert response.status_code == 400
+        mock_analytics.get_aluno_respostas.assert_not_called()
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # PREDIÇÕES
 # ══════════════════════════════════════════════════════════════════════════════
@@ -187,12 +219,52 @@ class TestPredictEvasao:
         data = response.get_json()
         assert 'turmaId' in data['error']
 
+    def test_predict_evasao_repassa_paginacao(self, app_client):
+        client, mock_predictor, _ = app_client
+        client.post('/predict/evasao', json={'turmaId': 'turma-1', 'limit': 50, 'offset': 100})
+        mock_predictor.predict_evasao_turma.assert_called_once_with('turma-1', limit=50, offset=100)
+
+    @pytest.mark.parametrize('paginacao', [{'limit': 0}, {'limit': '-5'}, {'offset': -1}, {'limit': True}, {'limit': 2.5}])
+    def test_predict_evasao_paginacao_invalida_retorna_400(self, app_client, paginacao):
+        client, mock_predictor, _ = app_client
+        response = client.post('/predict/evasao', json={'turmaId': 'turma-1', **paginacao})
+        assert response.status_code == 400
+        assert 'limit' in response.get_json()['error']
+        mock_predictor.predict_evasao_turma.assert_not_called()
+
+    def test_predict_evasao_com_cursor_usa_paginacao_por_keyset(self, app_client):
+        client, mock_predictor, _ = app_client
+        mock_predictor.predict_evasao_pagina.return_value = {'turmaId': 'turma-1', 'predictions': [], 'proximoCursor': None}
+        response = client.post('/predict/evasao', json={'turmaId': 'turma-1', 'limit': 100, 'cursor': None})
+        assert response.status_code == 200
+        mock_predictor.predict_evasao_pagina.assert_called_once_with('turma-1', 100, None)
+        mock_predictor.predict_evasao_turma.assert_not_called()
+
+    def test_predict_evasao_cursor_com_offset_retorna_400(self, app_client):
+        client, mock_predictor, _ = app_client
+        response = client.post('/predict/evasao', json={'turmaId': 'turma-1', 'offset': 50, 'cursor': None})
+        assert response.status_code == 400
+        mock_predictor.predict_evasao_pagina.assert_not_called()
+
     def test_predict_evasao_retorna_predictions(self, app_client):
         client, _, _ = app_client
         data = client.post('/predict/evasao', json={'turmaId': 'turma-1'}).get_json()
         assert 'predictions' in data
 
 
+class TestPredictEvasaoBulk:
+    def test_bulk_sem_turmaIds_retorna_400(self, app_client):
+        client, _, _ = app_client
+        response = client.post('/predict/evasao/bulk', json={})
+        assert response.status_code == 400
+        assert 'turmaIds' in response.get_json()['error']
+
+    def test_bulk_com_lista_vazia_retorna_400(self, app_client):
+        client, _, _ = app_client
+        response = client.post('/predict/evasao/bulk', json={'turmaIds': []})
+        assert response.status_code == 400
+
+
 class TestPredictDesempenho:
     def test_predict_desempenho_com_alunoId_valido(self, app_client):
         client, mock_predictor, _ = app_client
@@ -212,6 +284,19 @@ class TestPredictDesempenho:
         data = client.post('/predict/desempenho', json={'alunoId': 'aluno-1'}).get_json()
         assert 'tendencia' in data
 
+    def test_predict_desempenho_turma(self, app_client):
+        client, mock_predictor, _ = app_client
+        mock_predictor.predict_desempenho_turma.return_value = {'turmaId': 'turma-1', 'alunos': []}
+        response = client.post('/predict/desempenho/turma', json={'turmaId': 'turma-1'})
+        assert response.status_code == 200
+        mock_predictor.predict_desempenho_turma.assert_called_once_with('turma-1')
+
+    def test_predict_desempenho_turma_sem_turmaId_retorna_400(self, app_client):
+        client, _, _ = app_client
+        response = client.post('/predict/desempenho/turma', json={})
+        assert response.status_code == 400
+        assert 'turmaId' in response.get_json()['error']
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # PADRÕES
@@ -244,13 +329,125 @@ class TestModels:
         assert response.status_code == 200
         mock_predictor.get_models_status.assert_called_once()
 
-    def test_train_models_retorna_200(self, app_client):
+    def test_train_models_retorna_202_com_job(self, app_client):
         client, mock_predictor, _ = app_client
+        jobs = client.application.extensions['ml_services'].training_jobs
+        jobs.submit.return_value = ({'jobId': 'job-1', 'status': 'pendente'}, True)
         response = client.post('/train/models')
-        assert response.status_code == 200
-        mock_predictor.train_models.assert_called_once()
+        assert response.status_code == 202
+        assert response.get_json()['jobId'] == 'job-1'
+        assert response.get_json()['reaproveitado'] is False
+        mock_predictor.train_models.assert_not_called()
 
-    def test_train_models_retorna_status(self, app_client):
+    def test_train_models_reaproveita_job_ativo(self, app_client):
         client, _, _ = app_client
+        jobs = client.application.extensions['ml_services'].training_jobs
+        jobs.submit.return_value = ({'jobId': 'job-1', 'status': 'executando'}, False)
         data = client.post('/train/models').get_json()
-        assert 'status' in data
+        assert data['status'] == 'executando'
+        assert data['reaproveitado'] is True
+
+    def test_train_job_retorna_status(self, app_client):
+        client, _, _ = app_client
+        jobs = client.application.extensions['ml_services'].training_jobs
+        jobs.get.return_value = {'jobId': 'job-1', 'status': 'concluido', 'duracaoSegundos': 1.5}
+        response = client.get('/train/jobs/job-1')
+        assert response.status_code == 200
+        assert response.get_json()['duracaoSegundos'] == 1.5
+
+    def test_train_job_desconhecido_retorna_404(self, app_client):
+        client, _, _ = app_client
+        jobs = client.application.extensions['ml_services'].training_jobs
+        jobs.get.return_value = None
+        response = client.get('/train/jobs/nao-existe')
+        assert response.status_code == 404
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ROTAS SOBRE UM BANCO REAL (SQLite, dataset sintético)
+# ══════════════════════════════════════════════════════════════════════════════
+@pytest.fixture(scope='module')
+def sqlite_db(tmp_path_factory):
+    from benchmarks.sqlite_shim import SQLiteDatabaseService
+    from benchmarks.synthetic import generate
+
+    service = SQLiteDatabaseService(str(tmp_path_factory.mktemp('db') / 'app.sqlite3'))
+    with service.pool.connection() as conn:
+        generate(conn.raw, alunos=30, turmas=3, turmas_por_aluno=1,
+                 questionarios_por_turma=2, perguntas_por_questionario=4, seed=11)
+    yield service
+    service.close()
+
+
+class TestRotasComBancoReal:
+    def test_engagement_patterns_sobre_o_frame_do_banco(self, sqlite_db):
+        from services.analytics import AnalyticsService
+
+        analytics = AnalyticsService(sqlite_db)
+        app = create_app(Services(db_service=sqlite_db, analytics_service=analytics, result_cache=None))
+        app.config['ML_ETAG_ENABLED'] = False
+
+        data = app.test_client().get('/patterns/engagement').get_json()
+
+        assert 'error' not in data
+        assert data['totalAlunos'] == len(sqlite_db.get_engagement_data())
+        total = sum(data[faixa]['total'] for faixa in ('altoEngajamento', 'medioEngajamento', 'baixoEngajamento'))
+        assert total == data['totalAlunos']
+
+
+class TestInvalidarCache:
+    @pytest.fixture
+    def servicos(self):
+        return Services(db_service=MagicMock(), ml_predictor=MagicMock(), analytics_service=MagicMock(),
+                        result_cache=MagicMock(), training_jobs=MagicMock())
+
+    def test_nova_resposta_atualiza_rollup_e_invalida_o_escopo(self, servicos):
+        client = create_app(servicos).test_client()
+        client.post('/cache/invalidate', json={'turmaId': 't1', 'alunoId': 'a1', 'questionarioId': 'q1'})
+        servicos.db_service.rollup.mark_stale.assert_called_once()
+        servicos.db_service.rollup.mark_rebuild.assert_not_called()
+        servicos.result_cache.invalidate.assert_called_once_with(turma_id='t1', aluno_id='a1', questionario_id='q1')
+
+    def test_remocao_reconstroi_rollup_e_limpa_o_cache(self, servicos):
+        servicos.result_cache.clear.return_value = 3
+        client = create_app(servicos).test_client()
+        data = client.post('/cache/invalidate', json={'questionarioId': 'q1', 'removido': True}).get_json()
+        servicos.db_service.rollup.mark_rebuild.assert_called_once()
+        servicos.result_cache.invalidate.assert_not_called()
+        assert data['entradasRemovidas'] == 3
+
+    def test_resposta_avisada_aparece_na_leitura_seguinte(self, tmp_path):
+        from benchmarks.sqlite_shim import SQLiteDatabaseService
+        from benchmarks.synthetic import generate
+        from services.analytics import AnalyticsService
+        from services.cache import ResultCache
+
+        db = SQLiteDatabaseService(str(tmp_path / 'rollup.sqlite3'), rollup=True)
+        with db.pool.connection() as conn:
+            generate(conn.raw, alunos=20, turmas=2, questionarios_por_turma=2, perguntas_por_questionario=3, seed=7)
+        # Resposta recém-criada fica dentro do lag; o intervalo não venceu
+        db.rollup.lag = 60
+        db.rollup.refresh_interval = 30
+        app = create_app(Services(db_service=db, analytics_service=AnalyticsService(db), result_cache=ResultCache()))
+        app.config['ML_ETAG_ENABLED'] = False
+        client = app.test_client()
+        antes = client.get('/analytics/overview').get_json()
+
+        aluno_id, turma_id, q_id, p_id = db.execute_query(
+            "SELECT m.aluno_id, m.turma_id, q.id as q_id, p.id as p_id FROM alunos_turmas m "
+            "JOIN questionarios q ON q.turma_id = m.turma_id JOIN perguntas p ON p.questionario_id = q.id "
+            "JOIN users u ON u.id = m.aluno_id WHERE u.ativo = 1 LIMIT 1"
+        )[0].values()
+        with db.pool.connection() as conn:
+            conn.raw.execute(
+                "INSERT INTO respostas VALUES ('nova', ?, ?, ?, ?, NULL, 10, NULL, NULL, datetime('now'))",
+                (q_id, p_id, aluno_id, turma_id)
+            )
+            conn.raw.commit()
+        client.post('/cache/invalidate', json={'turmaId': turma_id, 'alunoId': aluno_id, 'questionarioId': q_id})
+        depois = client.get('/analytics/overview').get_json()
+        db.close()
+
+        assert depois['mediaNotasGeral'] != antes['mediaNotasGeral']
+        # A próxima atualização sem aviso volta a respeitar o lag
+        assert db.rollup._notificado is False
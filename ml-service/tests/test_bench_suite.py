@@ -0,0 +1,48 @@
+"""
+Testes da suíte de benchmarks (escala 1k)
+"""
+import pytest
+
+from benchmarks.bench_suite import comparar, executar, preparar_dataset
+
+
+@pytest.fixture(scope='module')
+def relatorio(tmp_path_factory):
+    return executar('1k', str(tmp_path_factory.mktemp('bench')), repeticoes=1)
+
+
+class TestExecutar:
+    def test_mede_todas_as_consultas_e_rotas_sem_erro(self, relatorio):
+        assert relatorio['contagens']['respostas'] > 500
+        assert all(c['linhas'] > 0 for c in relatorio['consultas'].values())
+        for nome, endpoint in relatorio['endpoints'].items():
+            assert (nome, endpoint['status'], endpoint['erro']) == (nome, 200, None)
+
+    def test_cobre_todas_as_rotas_de_analytics_e_predicao(self, relatorio):
+        rotas = {e['rota'] for e in relatorio['endpoints'].values()}
+
+        assert {'GET /analytics/overview', 'POST /predict/evasao/bulk', 'GET /patterns/responses'} <= rotas
+
+    def test_dataset_e_reaproveitado(self, tmp_path):
+        path, contagens = preparar_dataset(str(tmp_path), '1k')
+
+        assert preparar_dataset(str(tmp_path), '1k') == (path, contagens)
+
+
+class TestComparar:
+    def _relatorio(self, **p50):
+        return {'consultas': {nome: {'p50Ms': ms} for nome, ms in p50.items()}, 'endpoints': {}}
+
+    def test_aponta_regressao_acima_do_limite(self):
+        linhas = comparar(self._relatorio(a=130.0, b=110.0), self._relatorio(a=100.0, b=100.0), limite=0.2)
+
+        assert {l['nome']: l['regressao'] for l in linhas} == {'a': True, 'b': False}
+
+    def test_ignora_variacao_abaixo_do_minimo_absoluto(self):
+        linhas = comparar(self._relatorio(a=0.8), self._relatorio(a=0.4), limite=0.2, minimo_ms=1.0)
+
+        assert linhas[0]['variacao'] == 1.0
+        assert not linhas[0]['regressao']
+
+    def test_itens_novos_nao_entram_na_comparacao(self):
+        assert comparar(self._relatorio(novo=5.0), self._relatorio()) == []
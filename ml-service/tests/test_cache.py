@@ -0,0 +1,137 @@
+"""
+Testes do cache de resultados do AnalyticsService
+"""
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.analytics import AnalyticsService
+from services.cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('services.cache.time.monotonic', fake):
+        yield fake
+
+
+@pytest.fixture
+def cache():
+    return ResultCache(max_entries=3, ttls={'overview': 60, 'turma': 30})
+
+
+class TestResultCache:
+    def test_expira_apos_ttl(self, cache, clock):
+        cache.set('turma', ('turma', 't1'), {'ok': 1}, ['turma:t1'])
+
+        assert cache.get('turma', ('turma', 't1')) == (True, {'ok': 1})
+        clock.now += 31
+        assert cache.get('turma', ('turma', 't1')) == (False, None)
+
+    def test_lru_remove_menos_usada(self, cache, clock):
+        for i in range(3):
+            cache.set('turma', ('turma', i), i, [f'turma:{i}'])
+        cache.get('turma', ('turma', 0))  # 0 passa a ser a mais recente
+
+        cache.set('turma', ('turma', 3), 3, ['turma:3'])
+
+        assert cache.get('turma', ('turma', 1)) == (False, None)
+        assert cache.get('turma', ('turma', 0)) == (True, 0)
+        assert cache.stats()['evictions'] == 1
+
+    def test_invalidacao_por_turma_preserva_outras(self, cache, clock):
+        cache.set('overview', ('overview',), 'o', ['global'])
+        cache.set('turma', ('turma', 't1'), 1, ['turma:t1'])
+        cache.set('turma', ('turma', 't2'), 2, ['turma:t2'])
+
+        cache.invalidate(turma_id='t1')
+
+        assert cache.get('overview', ('overview',))[0] is False
+        assert cache.get('turma', ('turma', 't1'))[0] is False
+        assert cache.get('turma', ('turma', 't2'))[0] is True
+
+    def test_invalidacao_por_aluno_sem_turma_remove_todas_as_turmas(self, cache, clock):
+        cache.set('turma', ('turma', 't1'), 1, ['turma:t1'])
+        cache.set('turma', ('turma', 't2'), 2, ['turma:t2'])
+
+        cache.invalidate(aluno_id='a1')
+
+        assert cache.stats()['entradas'] == 0
+
+    def test_stats_reporta_hits_e_misses(self, cache, clock):
+        cache.get('overview', ('overview',))
+        cache.set('overview', ('overview',), 'o', ['global'])
+        cache.get('overview', ('overview',))
+
+        stats = cache.stats()
+
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['endpoints']['overview']['hitRate'] == 0.5
+
+
+class TestAnalyticsComCache:
+    @pytest.fixture
+    def db_mock(self):
+        db = MagicMock()
+        db.get_alunos_data.return_value = pd.DataFrame([
+            {'id': '1', 'questionarios_respondidos': 3, 'media_notas': 8.0},
+        ])
+        db.get_questionarios_stats.return_value = []
+        return db
+
+    def test_segunda_chamada_nao_consulta_banco(self, db_mock, cache, clock):
+        analytics = AnalyticsService(db_mock, cache=cache)
+
+        primeira = analytics.get_overview()
+        segunda = analytics.get_overview()
+
+        assert primeira == segunda
+        assert db_mock.get_alunos_data.call_count == 1
+
+    def test_invalidacao_forca_nova_consulta(self, db_mock, cache, clock):
+        analytics = AnalyticsService(db_mock, cache=cache)
+        analytics.get_overview()
+
+        cache.invalidate(turma_id='t1', aluno_id='a1', questionario_id='q1')
+        analytics.get_overview()
+
+        assert db_mock.get_alunos_data.call_count == 2
+
+    def test_erros_nao_sao_armazenados(self, db_mock, cache, clock):
+        db_mock.get_alunos_data.side_effect = [Exception('DB fora do ar'), db_mock.get_alunos_data.return_value]
+        analytics = AnalyticsService(db_mock, cache=cache)
+
+        assert 'error' in analytics.get_overview()
+        assert 'error' not in analytics.get_overview()
+
+    def test_argumentos_nomeados_entram_na_chave(self, db_mock, cache, clock):
+        db_mock.get_student_features.return_value = pd.DataFrame([
+            {'id': str(i), 'nome': f'Aluno {i}', 'questionarios_respondidos': i} for i in range(8)
+        ])
+        analytics = AnalyticsService(db_mock, cache=cache)
+
+        padrao = analytics.get_turma_analytics('t1')
+        pagina = analytics.get_turma_analytics('t1', limit=2, offset=1)
+
+        assert len(padrao['topAlunos']) == 5 and len(pagina['topAlunos']) == 2
+        assert analytics.get_turma_analytics('t1', offset=1, limit=2) is pagina
+        cache.invalidate(turma_id='t1')
+        assert analytics.get_turma_analytics('t1', limit=2, offset=1) is not pagina
+
+    def test_sem_cache_sempre_consulta(self, db_mock):
+        analytics = AnalyticsService(db_mock)
+
+        analytics.get_overview()
+        analytics.get_overview()
+
+        assert db_mock.get_alunos_data.call_count == 2
@@ -0,0 +1,130 @@
+"""
+Testes da compressão das respostas e do JSON das rotas
+"""
+import gzip
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+import app as app_module
+from app import Services, create_app
+from services import compression
+
+
+@pytest.fixture
+def servicos():
+    analytics = MagicMock()
+    analytics.get_turma_analytics.return_value = {
+        'turmaId': 't1',
+        'alunos': [{'alunoId': f'a{i}', 'mediaNotas': 7.5, 'nome': 'Aluno de Teste'} for i in range(100)],
+    }
+    analytics.get_overview.return_value = {'totalAlunos': 3}
+    return Services(db_service=MagicMock(), ml_predictor=MagicMock(), analytics_service=analytics,
+                    result_cache=None, training_jobs=MagicMock())
+
+
+@pytest.fixture
+def flask_app(servicos):
+    app = create_app(servicos)
+    app.config['ML_ETAG_ENABLED'] = False
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    with flask_app.test_client() as client:
+        yield client
+
+
+class TestCompressao:
+    def test_gzip_acima_do_tamanho_minimo(self, client):
+        response = client.get('/analytics/turma/t1', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert int(response.headers['Content-Length']) == len(response.get_data())
+        assert json.loads(gzip.decompress(response.get_data()))['turmaId'] == 't1'
+
+    @pytest.mark.skipif(compression.brotli is None, reason='brotli não instalado')
+    def test_brotli_preferido_quando_aceito(self, client):
+        response = client.get('/analytics/turma/t1', headers={'Accept-Encoding': 'gzip, deflate, br'})
+
+        assert response.headers['Content-Encoding'] == 'br'
+        assert json.loads(compression.brotli.decompress(response.get_data()))['turmaId'] == 't1'
+
+    def test_respeita_o_peso_q_do_cliente(self, client):
+        response = client.get('/analytics/turma/t1', headers={'Accept-Encoding': 'br;q=0, gzip;q=0.5'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+
+    def test_resposta_pequena_sai_sem_compressao(self, client):
+        response = client.get('/analytics/overview', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_json() == {'totalAlunos': 3}
+
+    def test_sem_accept_encoding_sai_sem_compressao(self, client):
+        response = client.get('/analytics/turma/t1')
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_json()['turmaId'] == 't1'
+
+    def test_304_nao_e_comprimido(self, flask_app, servicos):
+        flask_app.config['ML_ETAG_ENABLED'] = True
+        servicos.db_service.get_data_version.return_value = (1,)
+        client = flask_app.test_client()
+        etag = client.get('/analytics/turma/t1').headers['ETag']
+
+        response = client.get('/analytics/turma/t1', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert 'Content-Encoding' not in response.headers
+
+    def test_desligado_por_configuracao(self, flask_app):
+        flask_app.config['ML_COMPRESSION_ENABLED'] = False
+
+        response = flask_app.test_client().get('/analytics/turma/t1', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_gzip_deterministico(self):
+        assert compression.comprimir(b'x' * 2000, 'gzip') == compression.comprimir(b'x' * 2000, 'gzip')
+
+
+class TestJSONProvider:
+    @pytest.fixture(params=['orjson', 'stdlib'])
+    def serializador(self, request, monkeypatch):
+        if request.param == 'stdlib':
+            monkeypatch.setattr(app_module, 'orjson', None)
+        elif app_module.orjson is None:
+            pytest.skip('orjson não instalado')
+        return request.param
+
+    def test_decimal_datetime_e_numpy(self, flask_app, serializador):
+        corpo = {
+            'media': Decimal('7.25'),
+            'ultimaResposta': datetime(2025, 6, 30, 12, 5),
+            'total': np.int64(3),
+            'probabilidades': np.array([0.5, 0.25]),
+            'distribuicao': {1: 2, 5: 1},
+        }
+        with flask_app.app_context():
+            response = flask_app.json.response(corpo)
+
+        assert json.loads(response.get_data()) == {
+            'media': 7.25,
+            'ultimaResposta': '2025-06-30T12:05:00',
+            'total': 3,
+            'probabilidades': [0.5, 0.25],
+            'distribuicao': {'1': 2, '5': 1},
+        }
+        assert response.mimetype == 'application/json'
+
+    def test_loads_do_corpo_da_requisicao(self, flask_app, serializador):
+        with flask_app.app_context():
+            assert flask_app.json.loads('{"turmaIds": ["t1"]}') == {'turmaIds': ['t1']}
+            assert json.loads(flask_app.json.dumps({'b': 1, 'a': Decimal('2')})) == {'a': 2.0, 'b': 1}
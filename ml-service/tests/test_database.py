@@ -0,0 +1,152 @@
+"""
+Testes unitários do DatabaseService e do pool de conexões
+"""
+import threading
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.database import ConnectionPool, DatabaseService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('services.database.time.monotonic', fake):
+        yield fake
+
+
+@pytest.fixture
+def connect():
+    return MagicMock(side_effect=lambda: MagicMock(open=True))
+
+
+class TestConnectionPool:
+    def test_reutiliza_conexao_devolvida(self, connect, clock):
+        pool = ConnectionPool(connect, max_size=2)
+
+        with pool.connection() as c1:
+            pass
+        with pool.connection() as c2:
+            pass
+
+        assert c1 is c2
+        assert connect.call_count == 1
+        assert pool.stats()['checkouts'] == 2
+
+    def test_respeita_max_size_com_timeout(self, connect):
+        pool = ConnectionPool(connect, max_size=1, checkout_timeout=0.05)
+        entry = pool.acquire()
+
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+
+        pool.release(entry)
+        assert pool.stats()['timeouts'] == 1
+        assert pool.stats()['tamanho'] == 1
+
+    def test_thread_em_espera_recebe_conexao_liberada(self, connect):
+        pool = ConnectionPool(connect, max_size=1, checkout_timeout=2)
+        entry = pool.acquire()
+        recebida = []
+
+        t = threading.Thread(target=lambda: recebida.append(pool.acquire()))
+        t.start()
+        pool.release(entry)
+        t.join(timeout=2)
+
+        assert recebida and recebida[0] is entry
+        assert connect.call_count == 1
+
+    def test_fecha_ociosas_acima_do_minimo(self, connect, clock):
+        pool = ConnectionPool(connect, min_size=1, max_size=3, idle_timeout=60)
+        entries = [pool.acquire() for _ in range(3)]
+        for e in entries:
+            pool.release(e)
+
+        clock.now += 61
+        with pool.connection():
+            pass
+
+        stats = pool.stats()
+        assert stats['expiradasOciosas'] == 2
+        assert stats['tamanho'] == 1
+
+    def test_recicla_conexao_antiga(self, connect, clock):
+        pool = ConnectionPool(connect, max_lifetime=100, ping_interval=1000)
+        with pool.connection() as antiga:
+            pass
+
+        clock.now += 101
+        with pool.connection() as nova:
+            pass
+
+        assert nova is not antiga
+        antiga.close.assert_called_once()
+        assert pool.stats()['recicladas'] == 1
+
+    def test_health_check_descarta_conexao_quebrada(self, connect, clock):
+        pool = ConnectionPool(connect, ping_interval=5)
+        with pool.connection() as quebrada:
+            pass
+        quebrada.ping.side_effect = Exception('MySQL server has gone away')
+
+        clock.now += 10
+        with pool.connection() as nova:
+            pass
+
+        assert nova is not quebrada
+        assert pool.stats()['falhasHealthCheck'] == 1
+
+    def test_nao_faz_ping_em_conexao_recem_usada(self, connect, clock):
+        pool = ConnectionPool(connect, ping_interval=5)
+        with pool.connection() as c:
+            pass
+        with pool.connection():
+            pass
+
+        c.ping.assert_not_called()
+
+    def test_descarta_conexao_apos_erro_operacional(self, connect, clock):
+        import pymysql
+        pool = ConnectionPool(connect)
+
+        with pytest.raises(pymysql.err.OperationalError):
+            with pool.connection():
+                raise pymysql.err.OperationalError(2013, 'Lost connection')
+
+        assert pool.stats()['tamanho'] == 0
+
+    def test_falha_ao_conectar_libera_vaga(self, clock):
+        pool = ConnectionPool(MagicMock(side_effect=Exception('refused')), max_size=1)
+
+        with pytest.raises(Exception):
+            pool.acquire()
+
+        assert pool.stats()['tamanho'] == 0
+
+
+class TestDatabaseService:
+    def test_execute_query_usa_pool(self):
+        with patch('services.database.pymysql.connect') as mock_connect:
+            cursor = MagicMock()
+            cursor.fetchall.return_value = [{'id': 1}]
+            conn = MagicMock(open=True)
+            conn.cursor.return_value.__enter__.return_value = cursor
+            mock_connect.return_value = conn
+
+            db = DatabaseService()
+            assert db.execute_query('SELECT 1') == [{'id': 1}]
+            assert db.execute_query('SELECT 1') == [{'id': 1}]
+
+            assert mock_connect.call_count == 1
+            conn.close.assert_not_called()
+            assert db.get_pool_stats()['ociosas'] == 1
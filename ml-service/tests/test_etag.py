@@ -0,0 +1,289 @@
+"""
+Testes do GET condicional (ETag / If-None-Match) das rotas de analytics
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import Services, create_app
+from services.analytics import AnalyticsService
+from benchmarks.sqlite_shim import SQLiteDatabaseService
+from benchmarks.synthetic import generate
+from services.cache import GLOBAL_TAG, ResultCache
+from services.etag import DataVersionTracker
+
+
+class TestDataVersionTracker:
+    def test_invalida_o_escopo_quando_a_versao_muda(self):
+        cache = MagicMock()
+        tracker = DataVersionTracker(cache)
+
+        assert tracker.observar('turma', 't1', (10, '2025-01-01')) is True
+        assert tracker.observar('turma', 't1', (10, '2025-01-01')) is False
+        assert tracker.observar('turma', 't1', (11, '2025-01-02')) is True
+
+        assert [c.args[0] for c in cache.invalidate_tags.call_args_list] == [['turma:t1'], ['turma:t1']]
+
+    def test_escopo_global_usa_a_tag_global(self):
+        cache = MagicMock()
+
+        DataVersionTracker(cache).observar('global', None, (1,))
+
+        cache.invalidate_tags.assert_called_once_with([GLOBAL_TAG])
+
+    def test_limite_de_escopos(self):
+        tracker = DataVersionTracker(max_escopos=2)
+        for aluno in ('a1', 'a2', 'a3'):
+            tracker.observar('aluno', aluno, (1,))
+
+        # a1 foi descartado: volta a contar como mudança
+        assert tracker.observar('aluno', 'a1', (1,)) is True
+
+
+class TestGetDataVersion:
+    @pytest.fixture
+    def db(self, tmp_path):
+        service = SQLiteDatabaseService(str(tmp_path / 'versao.sqlite3'))
+        with service.pool.connection() as conn:
+            generate(conn.raw, alunos=20, turmas=3, questionarios_por_turma=2, perguntas_por_questionario=3, seed=3)
+        yield service
+        service.close()
+
+    def test_versao_muda_com_nova_resposta_apenas_nos_escopos_afetados(self, db):
+        with db.pool.connection() as conn:
+            raw = conn.raw
+            aluno_id, turma_id = raw.execute('SELECT aluno_id, turma_id FROM alunos_turmas LIMIT 1').fetchone()
+            q_id, p_id = raw.execute(
+                'SELECT q.id, p.id FROM questionarios q JOIN perguntas p ON p.questionario_id = q.id '
+                'WHERE q.turma_id = ? LIMIT 1', (turma_id,)
+            ).fetchone()
+            outro_aluno = raw.execute(
+                "SELECT id FROM users WHERE role = 'ALUNO' AND id != ? LIMIT 1", (aluno_id,)
+            ).fetchone()[0]
+        escopos = [('global', None), ('turma', turma_id), ('aluno', aluno_id),
+                   ('questionario', q_id), ('aluno', outro_aluno)]
+        antes = {escopo: db.get_data_version(*escopo) for escopo in escopos}
+
+        db.execute(
+            "INSERT INTO respostas VALUES ('nova', %s, %s, %s, %s, NULL, 7, NULL, NULL, '2025-07-01 10:00:00')",
+            (q_id, p_id, aluno_id, turma_id)
+        )
+
+        mudaram = {escopo for escopo in escopos if db.get_data_version(*escopo) != antes[escopo]}
+        assert mudaram == {('global', None), ('turma', turma_id), ('aluno', aluno_id), ('questionario', q_id)}
+
+    @pytest.mark.parametrize('alteracao', [
+        "UPDATE users SET ativo = 0, atualizado_em = '2026-01-02 00:00:00' WHERE id = ?",
+        "UPDATE users SET nome = 'Renomeado', atualizado_em = '2026-01-02 00:00:00' WHERE id = ?",
+    ], ids=['desativado', 'renomeado'])
+    def test_versao_muda_quando_o_aluno_e_alterado(self, db, alteracao):
+        with db.pool.connection() as conn:
+            aluno_id, turma_id = conn.raw.execute(
+                'SELECT m.aluno_id, m.turma_id FROM alunos_turmas m JOIN users u ON u.id = m.aluno_id '
+                'WHERE u.ativo = 1 LIMIT 1'
+            ).fetchone()
+        outra_turma = db.execute_query(
+            'SELECT id FROM turmas WHERE id NOT IN (SELECT turma_id FROM alunos_turmas WHERE aluno_id = %s) LIMIT 1',
+            (aluno_id,)
+        )[0]['id']
+        escopos = [('global', None), ('turma', turma_id), ('aluno', aluno_id), ('turma', outra_turma)]
+        antes = {escopo: db.get_data_version(*escopo) for escopo in escopos}
+
+        with db.pool.connection() as conn:
+            conn.raw.execute(alteracao, (aluno_id,))
+            conn.raw.commit()
+
+        mudaram = {escopo for escopo in escopos if db.get_data_version(*escopo) != antes[escopo]}
+        assert mudaram == {('global', None), ('turma', turma_id), ('aluno', aluno_id)}
+
+    def test_versao_estavel_sem_alteracoes(self, db):
+        assert db.get_data_version('global') == db.get_data_version('global')
+
+
+
+class TestVersaoComRollup:
+    """Com o rollup, a versão só avança quando os agregados lidos pelo corpo avançam"""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        service = SQLiteDatabaseService(str(tmp_path / 'rollup.sqlite3'), rollup=True)
+        with service.pool.connection() as conn:
+            generate(conn.raw, alunos=20, turmas=3, questionarios_por_turma=2, perguntas_por_questionario=3, seed=5)
+        service.rollup.refresh_interval = 30
+        yield service
+        service.close()
+
+    @pytest.fixture
+    def client(self, db):
+        servicos = Services(db_service=db, ml_predictor=MagicMock(), analytics_service=AnalyticsService(db),
+                            result_cache=ResultCache(), training_jobs=MagicMock())
+        with create_app(servicos).test_client() as client:
+            yield client
+
+    def _destino(self, db):
+        """(aluno, turma, questionário, pergunta) de um aluno ativo matriculado"""
+        return tuple(db.execute_query(
+            "SELECT m.aluno_id, m.turma_id, q.id as q_id, p.id as p_id FROM alunos_turmas m "
+            "JOIN questionarios q ON q.turma_id = m.turma_id JOIN perguntas p ON p.questionario_id = q.id "
+            "JOIN users u ON u.id = m.aluno_id WHERE u.ativo = 1 LIMIT 1"
+        )[0].values())
+
+    def _nova_resposta(self, db):
+        aluno_id, turma_id, q_id, p_id = self._destino(db)
+        with db.pool.connection() as conn:
+            conn.raw.execute(
+                "INSERT INTO respostas VALUES ('nova', ?, ?, ?, ?, NULL, 10, NULL, NULL, datetime('now'))",
+                (q_id, p_id, aluno_id, turma_id)
+            )
+            conn.raw.commit()
+
+    def test_resposta_fora_do_rollup_nao_gera_etag_novo_com_corpo_antigo(self, client, db):
+        primeira = client.get('/analytics/overview')
+        etag = primeira.headers['ETag']
+
+        self._nova_resposta(db)
+
+        # Dentro do refresh_interval o rollup ainda não viu a resposta: o corpo
+        # seria o mesmo, então a versão também não muda
+        assert client.get('/analytics/overview', headers={'If-None-Match': etag}).status_code == 304
+
+        # Passado o intervalo, rollup e versão avançam juntos
+        db.rollup._last_attempt -= db.rollup.refresh_interval
+        segunda = client.get('/analytics/overview', headers={'If-None-Match': etag})
+
+        assert segunda.status_code == 200
+        assert segunda.headers['ETag'] != etag
+        assert segunda.get_json()['mediaNotasGeral'] != primeira.get_json()['mediaNotasGeral']
+
+    def test_aluno_versionado_pelas_respostas_ao_vivo(self, client, db):
+        aluno_id = self._destino(db)[0]
+        client.get('/analytics/overview')
+        etag = client.get(f'/analytics/aluno/{aluno_id}').headers['ETag']
+
+        # Resposta mais nova que o watermark: o rollup ainda não a viu, mas a
+        # rota do aluno lê respostas direto e o ETag precisa mudar
+        self._nova_resposta(db)
+        response = client.get(f'/analytics/aluno/{aluno_id}', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json()['totalRespostas'] == db.get_resumo_respostas_aluno(aluno_id)['total_respostas']
+
+    def test_versao_global_nao_varre_respostas(self, db):
+        db.rollup.ensure_fresh()
+        consultas = []
+        executar = db.execute_query
+
+        def registrar(query, params=None):
+            consultas.append(query)
+            return executar(query, params)
+
+        db.execute_query = registrar
+        db.get_data_version('global')
+
+        assert len(consultas) == 1
+        assert 'respostas' not in consultas[0].replace('ml_', '')
+
+    def test_rebuild_muda_a_versao(self, db):
+        db.get_data_version('global')
+        with db.pool.connection() as conn:
+            conn.raw.execute("UPDATE ml_rollup_state SET atualizado_em = '2025-01-01 00:00:00'")
+            conn.raw.commit()
+        antes = db.get_data_version('global')
+
+        db.rollup.mark_rebuild()
+
+        assert db.get_data_version('global') != antes
+
+    def test_sem_rollup_disponivel_usa_respostas(self, db):
+        db.rollup.ensure_fresh = MagicMock(return_value=False)
+        versao = db.get_data_version('global')
+
+        db.rollup = None
+
+        assert versao == db.get_data_version('global')
+
+class TestRotasCondicionais:
+    @pytest.fixture
+    def servicos(self):
+        db = MagicMock()
+        db.get_data_version.return_value = (10, '2025-06-30 12:00:00')
+        analytics = MagicMock()
+        analytics.get_turma_analytics.return_value = {'turmaId': 't1', 'totalAlunos': 3}
+        analytics.get_overview.return_value = {'totalAlunos': 3}
+        analytics.get_engagement_patterns.return_value = {'totalAlunos': 3}
+        return Services(db_service=db, ml_predictor=MagicMock(), analytics_service=analytics,
+                        result_cache=ResultCache(), training_jobs=MagicMock())
+
+    @pytest.fixture
+    def client(self, servicos):
+        with create_app(servicos).test_client() as client:
+            yield client
+
+    def test_resposta_traz_etag_fraco(self, client):
+        response = client.get('/analytics/turma/t1')
+
+        assert response.status_code == 200
+        assert response.headers['ETag'].startswith('W/"')
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    def test_if_none_match_valido_retorna_304_sem_recalcular(self, client, servicos):
+        etag = client.get('/analytics/turma/t1').headers['ETag']
+        servicos.analytics_service.get_turma_analytics.reset_mock()
+
+        response = client.get('/analytics/turma/t1', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.get_data() == b''
+        assert response.headers['ETag'] == etag
+        servicos.analytics_service.get_turma_analytics.assert_not_called()
+        servicos.db_service.get_data_version.assert_called_with('turma', 't1')
+
+    def test_dados_novos_geram_outro_etag(self, client, servicos):
+        etag = client.get('/analytics/turma/t1').headers['ETag']
+        servicos.db_service.get_data_version.return_value = (11, '2025-06-30 12:05:00')
+
+        response = client.get('/analytics/turma/t1', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_etag_depende_do_recurso(self, client, servicos):
+        turma = client.get('/patterns/engagement?turmaId=t1')
+        geral = client.get('/patterns/engagement')
+
+        assert turma.headers['ETag'] != geral.headers['ETag']
+        assert [c.args for c in servicos.db_service.get_data_version.call_args_list] == [('turma', 't1'), ('global', None)]
+
+    def test_versao_nova_invalida_o_cache_do_escopo(self, client, servicos):
+        servicos.result_cache.set('turma', ('turma', 't1'), {'antigo': True}, ['turma:t1'])
+        servicos.result_cache.set('turma', ('turma', 't2'), {'antigo': True}, ['turma:t2'])
+
+        client.get('/analytics/turma/t1')
+
+        assert servicos.result_cache.get('turma', ('turma', 't1')) == (False, None)
+        assert servicos.result_cache.get('turma', ('turma', 't2'))[0]
+
+    def test_erro_nao_recebe_etag(self, client, servicos):
+        servicos.analytics_service.get_overview.return_value = {'error': 'falhou'}
+
+        response = client.get('/analytics/overview')
+
+        assert 'ETag' not in response.headers
+
+    def test_falha_na_versao_responde_sem_etag(self, client, servicos):
+        servicos.db_service.get_data_version.side_effect = Exception('timeout')
+
+        response = client.get('/analytics/overview')
+
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+
+    def test_desligado_por_configuracao(self, servicos):
+        app = create_app(servicos)
+        app.config['ML_ETAG_ENABLED'] = False
+
+        response = app.test_client().get('/analytics/overview')
+
+        assert 'ETag' not in response.headers
+        servicos.db_service.get_data_version.assert_not_called()
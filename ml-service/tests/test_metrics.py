@@ -0,0 +1,115 @@
+"""
+Testes das métricas Prometheus
+"""
+from unittest.mock import MagicMock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app import Services, create_app
+from services.cache import ResultCache
+from services.metrics import medir_consulta
+
+
+def _valor(nome, **labels):
+    return REGISTRY.get_sample_value(nome, labels) or 0
+
+
+class _FakeDb:
+    @medir_consulta
+    def consulta_externa(self):
+        return self.consulta_interna() + [{'id': 3}]
+
+    @medir_consulta
+    def consulta_interna(self):
+        return [{'id': 1}, {'id': 2}]
+
+    @medir_consulta
+    def consulta_com_erro(self):
+        raise RuntimeError('sem conexão')
+
+    @medir_consulta
+    def consulta_em_blocos(self):
+        yield [1, 2]
+        yield [3]
+
+
+class TestMedirConsulta:
+    def test_registra_latencia_e_linhas_pelo_nome_do_metodo(self):
+        antes = _valor('ml_db_query_rows_sum', metodo='consulta_interna')
+
+        _FakeDb().consulta_interna()
+
+        assert _valor('ml_db_query_rows_sum', metodo='consulta_interna') == antes + 2
+        assert _valor('ml_db_query_duration_seconds_count', metodo='consulta_interna') >= 1
+
+    def test_chamadas_internas_nao_sao_contadas_de_novo(self):
+        internas = _valor('ml_db_query_duration_seconds_count', metodo='consulta_interna')
+        externas = _valor('ml_db_query_duration_seconds_count', metodo='consulta_externa')
+
+        _FakeDb().consulta_externa()
+
+        assert _valor('ml_db_query_duration_seconds_count', metodo='consulta_interna') == internas
+        assert _valor('ml_db_query_duration_seconds_count', metodo='consulta_externa') == externas + 1
+
+    def test_conta_erros(self):
+        antes = _valor('ml_db_query_errors_total', metodo='consulta_com_erro')
+
+        with pytest.raises(RuntimeError):
+            _FakeDb().consulta_com_erro()
+
+        assert _valor('ml_db_query_errors_total', metodo='consulta_com_erro') == antes + 1
+
+    def test_gerador_soma_linhas_de_todos_os_blocos(self):
+        antes = _valor('ml_db_query_rows_sum', metodo='consulta_em_blocos')
+
+        assert list(_FakeDb().consulta_em_blocos()) == [[1, 2], [3]]
+
+        assert _valor('ml_db_query_rows_sum', metodo='consulta_em_blocos') == antes + 3
+
+
+class TestCacheMetrics:
+    def test_conta_hits_e_misses(self):
+        cache = ResultCache(ttls={'metricas_teste': 60})
+        hits = _valor('ml_cache_requests_total', endpoint='metricas_teste', resultado='hit')
+        misses = _valor('ml_cache_requests_total', endpoint='metricas_teste', resultado='miss')
+
+        cache.get('metricas_teste', ('k',))
+        cache.set('metricas_teste', ('k',), 1, ['global'])
+        cache.get('metricas_teste', ('k',))
+
+        assert _valor('ml_cache_requests_total', endpoint='metricas_teste', resultado='hit') == hits + 1
+        assert _valor('ml_cache_requests_total', endpoint='metricas_teste', resultado='miss') == misses + 1
+
+
+class TestEndpointMetrics:
+    @pytest.fixture
+    def client(self):
+        analytics = MagicMock()
+        analytics.get_turma_analytics.return_value = {'turmaId': 't1'}
+        app = create_app(Services(
+            db_service=MagicMock(), ml_predictor=MagicMock(), analytics_service=analytics,
+            result_cache=None, training_jobs=MagicMock()
+        ))
+        with app.test_client() as client:
+            yield client
+
+    def test_latencia_por_template_da_rota(self, client):
+        labels = {'method': 'GET', 'route': '/analytics/turma/<turma_id>', 'status': '200'}
+        antes = _valor('ml_http_request_duration_seconds_count', **labels)
+
+        client.get('/analytics/turma/t1')
+        client.get('/analytics/turma/t2')
+
+        assert _valor('ml_http_request_duration_seconds_count', **labels) == antes + 2
+
+    def test_endpoint_metrics_no_formato_prometheus(self, client):
+        client.get('/health')
+
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        corpo = response.get_data(as_text=True)
+        assert '# TYPE ml_http_request_duration_seconds histogram' in corpo
+        assert 'route="/health"' in corpo
@@ -0,0 +1,277 @@
+"""
+Testes unitários do MLPredictor
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+
+from services.ml_predictor import MLPredictor
+
+
+def _aluno(i, dias_sem_resposta=None, questionarios=3, media=7.0):
+    agora = datetime.now()
+    return {
+        'id': f'a{i}',
+        'nome': f'Aluno {i}',
+        'criado_em': agora - timedelta(days=100 + i),
+        'questionarios_respondidos': questionarios,
+        'media_notas': media,
+        'ultima_resposta': None if dias_sem_resposta is None else agora - timedelta(days=dias_sem_resposta),
+        'dias_ativo': 20 if dias_sem_resposta is not None else None,
+    }
+
+
+@pytest.fixture
+def db_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def predictor(db_mock, tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path))
+    return MLPredictor(db_mock)
+
+
+class TestPrepareEvasaoFeaturesBatch:
+    def test_matriz_tem_uma_linha_por_aluno(self, predictor):
+        alunos = [_aluno(0, 5), _aluno(1), _aluno(2, 40, questionarios=0, media=None)]
+
+        X = predictor.prepare_evasao_features_batch(alunos)
+
+        assert X.shape == (3, 5)
+        assert X[0, 0] == 5
+        assert X[1, 0] == 999          # nunca respondeu
+        assert X[2, 2] == 5.0          # média ausente
+        assert X[0, 4] == pytest.approx(3 / 20)
+        assert X[1, 4] == 0            # sem dias ativos
+
+    def test_linha_igual_a_preparacao_individual(self, predictor):
+        alunos = [_aluno(0, 5), _aluno(1, 31, questionarios=1, media=4.0)]
+
+        X = predictor.prepare_evasao_features_batch(alunos)
+
+        for i, aluno in enumerate(alunos):
+            np.testing.assert_array_equal(X[i:i + 1], predictor.prepare_evasao_features(aluno))
+
+    def test_aceita_datas_iso_com_fuso(self, predictor):
+        aluno = _aluno(0)
+        aluno['ultima_resposta'] = (datetime.now() - timedelta(days=3)).isoformat() + 'Z'
+
+        X = predictor.prepare_evasao_features_batch([aluno])
+
+        assert X[0, 0] in (2, 3)  # depende do fuso local
+
+
+class TestPredictEvasaoTurma:
+    def test_prediz_turma_em_uma_unica_chamada(self, predictor, db_mock):
+        db_mock.get_student_features.return_value = [_aluno(0, 2), _aluno(1, 50), _aluno(2, 20)]
+        predictor.scaler = MagicMock()
+        predictor.scaler.transform.side_effect = lambda X: X
+        predictor.evasao_model = MagicMock()
+        predictor.evasao_model.predict_proba.return_value = np.array([[0.9, 0.1], [0.2, 0.8], [0.5, 0.5]])
+
+        result = predictor.predict_evasao_turma('t1')
+
+        assert predictor.evasao_model.predict_proba.call_count == 1
+        assert predictor.scaler.transform.call_count == 1
+        assert [p['alunoId'] for p in result['predictions']] == ['a1', 'a2', 'a0']
+        assert [p['nivelRisco'] for p in result['predictions']] == ['alto', 'medio', 'baixo']
+        assert result['predictions'][0]['riscoEvasao'] == 80.0
+        assert (result['alunosRiscoAlto'], result['alunosRiscoMedio'], result['alunosRiscoBaixo']) == (1, 1, 1)
+
+    def test_paginacao_monta_so_a_pagina_e_conta_a_turma_toda(self, predictor, db_mock):
+        db_mock.get_student_features.return_value = [_aluno(i, 2) for i in range(6)]
+        predictor.scaler = MagicMock()
+        predictor.scaler.transform.side_effect = lambda X: X
+        predictor.evasao_model = MagicMock()
+        predictor.evasao_model.predict_proba.return_value = np.array(
+            [[1 - p, p] for p in (0.1, 0.9, 0.5, 0.8, 0.5, 0.2)]
+        )
+        predictor._get_evasao_factors = MagicMock(return_value=[])
+
+        result = predictor.predict_evasao_turma('t1', limit=2, offset=1)
+
+        assert [p['alunoId'] for p in result['predictions']] == ['a3', 'a2']
+        assert predictor._get_evasao_factors.call_count == 2
+        assert (result['totalAlunos'], result['alunosRiscoAlto'], result['alunosRiscoMedio']) == (6, 2, 2)
+        assert (result['limit'], result['offset']) == (2, 1)
+
+    def test_heuristica_paginada_mantem_ordem_estavel(self, predictor, db_mock):
+        db_mock.get_student_features.return_value = [_aluno(0, 2), _aluno(1, 50), _aluno(2), _aluno(3, 20)]
+
+        result = predictor.predict_evasao_turma('t1', limit=2)
+
+        assert result['metodo'] == 'heuristica'
+        assert [p['alunoId'] for p in result['predictions']] == ['a1', 'a2']
+        assert result['totalAlunos'] == 4
+
+    def test_turma_vazia_nao_chama_modelo(self, predictor, db_mock):
+        db_mock.get_student_features.return_value = []
+        predictor.evasao_model = MagicMock()
+
+        result = predictor.predict_evasao_turma('t1')
+
+        assert result['totalAlunos'] == 0
+        predictor.evasao_model.predict_proba.assert_not_called()
+
+
+class TestPredictEvasaoPagina:
+    def test_prediz_so_a_pagina_e_devolve_cursor(self, predictor, db_mock):
+        db_mock.get_student_features_page.return_value = [_aluno(i, 2) for i in range(3)]
+        predictor.scaler = MagicMock()
+        predictor.scaler.transform.side_effect = lambda X: X
+        predictor.evasao_model = MagicMock()
+        predictor.evasao_model.predict_proba.return_value = np.array([[0.9, 0.1], [0.2, 0.8]])
+
+        result = predictor.predict_evasao_pagina('t1', limit=2)
+
+        db_mock.get_student_features_page.assert_called_once_with('t1', 3, None)
+        assert predictor.evasao_model.predict_proba.call_args[0][0].shape[0] == 2
+        assert [p['alunoId'] for p in result['predictions']] == ['a0', 'a1']
+        assert result['metodo'] == 'modelo'
+        assert result['proximoCursor'] is not None
+
+    def test_ultima_pagina_pela_heuristica(self, predictor, db_mock):
+        db_mock.get_student_features_page.return_value = [_aluno(0, 50)]
+
+        result = predictor.predict_evasao_pagina('t1', limit=2)
+
+        assert result['metodo'] == 'heuristica'
+        assert result['proximoCursor'] is None
+        assert len(result['predictions']) == 1
+
+
+class TestPredictEvasaoBulk:
+    @staticmethod
+    def _linha(turma_id, i, dias_sem_resposta):
+        return {'turma_id': turma_id, **_aluno(i, dias_sem_resposta)}
+
+    def test_uma_chamada_ao_modelo_para_todas_as_turmas(self, predictor, db_mock):
+        db_mock.get_student_features_bulk.return_value = [
+            self._linha('t1', 0, 2), self._linha('t1', 1, 50), self._linha('t2', 1, 50),
+        ]
+        predictor.scaler = MagicMock()
+        predictor.scaler.transform.side_effect = lambda X: X
+        predictor.evasao_model = MagicMock()
+        predictor.evasao_model.predict_proba.return_value = np.array([[0.9, 0.1], [0.2, 0.8], [0.2, 0.8]])
+
+        result = predictor.predict_evasao_bulk(['t1', 't2', 't3'])
+
+        db_mock.get_student_features_bulk.assert_called_once_with(['t1', 't2', 't3'])
+        assert predictor.evasao_model.predict_proba.call_count == 1
+        assert [t['turmaId'] for t in result['turmas']] == ['t1', 't2', 't3']
+        assert [p['alunoId'] for p in result['turmas'][0]['predictions']] == ['a1', 'a0']
+        assert result['turmas'][1]['alunosRiscoAlto'] == 1
+        assert result['turmas'][2]['totalAlunos'] == 0
+        assert result['totalAlunos'] == 2
+        assert result['metodo'] == 'modelo'
+
+    def test_paginacao_por_turma(self, predictor, db_mock):
+        db_mock.get_student_features_bulk.return_value = [
+            self._linha('t1', 0, 2), self._linha('t1', 1, 50), self._linha('t2', 2, 50), self._linha('t1', 3, 9),
+        ]
+        predictor.scaler = MagicMock()
+        predictor.scaler.transform.side_effect = lambda X: X
+        predictor.evasao_model = MagicMock()
+        predictor.evasao_model.predict_proba.return_value = np.array([[0.9, 0.1], [0.2, 0.8], [0.2, 0.8], [0.5, 0.5]])
+
+        result = predictor.predict_evasao_bulk(['t1', 't2'], limit=1, offset=1)
+
+        assert [p['alunoId'] for p in result['turmas'][0]['predictions']] == ['a3']
+        assert result['turmas'][0]['totalAlunos'] == 3
+        assert result['turmas'][1]['predictions'] == []
+
+    def test_sem_modelo_usa_heuristica_por_turma(self, predictor, db_mock):
+        db_mock.get_student_features_bulk.return_value = [self._linha('t1', 0, 40), self._linha('t2', 1, 1)]
+
+        result = predictor.predict_evasao_bulk(None)
+
+        assert result['metodo'] == 'heuristica'
+        assert [t['turmaId'] for t in result['turmas']] == ['t1', 't2']
+        assert result['turmas'][0]['predictions'][0]['nivelRisco'] == 'alto'
+        db_mock.get_student_features.assert_not_called()
+
+
+class TestTrainModels:
+    def test_treina_com_dados_em_blocos(self, predictor, db_mock):
+        blocos = [pd.DataFrame([_aluno(i, i % 40, questionarios=i % 4) for i in range(j, j + 10)])
+                  for j in range(0, 30, 10)]
+        db_mock.iter_alunos_data.return_value = iter(blocos)
+
+        result = predictor.train_models()
+
+        assert result['success'] is True
+        assert result['totalAlunos'] == 30
+        assert predictor.evasao_model is not None
+        db_mock.get_alunos_data.assert_not_called()
+
+    def test_sem_alunos_nao_treina(self, predictor, db_mock):
+        db_mock.iter_alunos_data.return_value = iter([])
+
+        result = predictor.train_models()
+
+        assert result['totalAlunos'] == 0
+        assert predictor.evasao_model is None
+
+
+def _notas(*series):
+    """Frame de get_series_notas: [(aluno_id, [(dia, nota), ...]), ...]"""
+    linhas = [(aluno_id, datetime(2025, 3, 1) + timedelta(days=dia), nota)
+              for aluno_id, notas in series for dia, nota in notas]
+    return pd.DataFrame(linhas, columns=['aluno_id', 'criado_em', 'valor_num'])
+
+
+class TestPredictDesempenho:
+    def test_tendencia_pela_inclinacao_no_tempo(self, predictor, db_mock):
+        db_mock.get_series_notas.return_value = _notas(('a1', [(0, 5.0), (10, 6.0), (20, 7.0), (30, 8.0)]))
+
+        result = predictor.predict_desempenho_aluno('a1')
+
+        assert result['tendencia'] == 'melhorando'
+        assert result['mediaInicial'] == 5.5
+        assert result['diferenca'] == 3.0
+        assert result['inclinacaoSemanal'] == 0.7
+        assert result['totalAvaliacoes'] == 4
+        assert result['recomendacoes']
+
+    def test_poucas_notas(self, predictor, db_mock):
+        db_mock.get_series_notas.return_value = _notas(('a1', [(0, 5.0), (10, 6.0)]))
+
+        result = predictor.predict_desempenho_aluno('a1')
+
+        assert result['tendencia'] == 'insuficiente'
+        assert 'message' in result
+
+    def test_sem_respostas(self, predictor, db_mock):
+        db_mock.get_series_notas.return_value = _notas()
+        db_mock.get_resumo_respostas_aluno.return_value = {'total_respostas': 0}
+
+        assert predictor.predict_desempenho_aluno('a1')['tendencia'] == 'sem_dados'
+
+    def test_respostas_sem_notas(self, predictor, db_mock):
+        db_mock.get_series_notas.return_value = _notas()
+        db_mock.get_resumo_respostas_aluno.return_value = {'total_respostas': 4}
+
+        result = predictor.predict_desempenho_aluno('a1')
+
+        assert result['tendencia'] == 'insuficiente'
+        assert 'message' in result
+
+    def test_turma_em_uma_consulta(self, predictor, db_mock):
+        db_mock.get_series_notas.return_value = _notas(
+            ('a1', [(0, 8.0), (7, 7.0), (14, 5.0)]),
+            ('a2', [(0, 6.0), (7, 6.0), (14, 6.2)]),
+            ('a3', [(0, 9.0)]),
+        )
+
+        result = predictor.predict_desempenho_turma('t1')
+
+        db_mock.get_series_notas.assert_called_once()
+        assert db_mock.get_series_notas.call_args.kwargs == {'turma_id': 't1'}
+        assert [(a['alunoId'], a['tendencia']) for a in result['alunos']] == [
+            ('a1', 'piorando'), ('a2', 'estavel'), ('a3', 'insuficiente')
+        ]
+        assert result['tendencias'] == {'insuficiente': 1, 'piorando': 1, 'estavel': 1, 'melhorando': 0}
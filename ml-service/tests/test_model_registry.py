@@ -0,0 +1,135 @@
+"""
+Testes do registro versionado de modelos
+"""
+import json
+import os
+import threading
+
+import joblib
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from sklearn.preprocessing import StandardScaler
+
+from services.ml_predictor import MLPredictor
+from services.model_registry import ModelBundle, ModelRegistry
+
+
+def _bundle(media=0.0):
+    scaler = StandardScaler().fit(np.array([[media - 1.0], [media + 1.0]]))
+    return ModelBundle(evasao_model={'modelo': 'evasao', 'media': media}, scaler=scaler)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path), keep=3)
+
+
+class TestPublicacao:
+    def test_publica_versao_com_manifest_e_ponteiro(self, registry, tmp_path):
+        publicado = registry.publish(_bundle(), {'totalAlunos': 10})
+
+        versao = registry.current_version()
+        assert versao == publicado.version
+        diretorio = tmp_path / 'versions' / versao
+        manifest = json.loads((diretorio / 'manifest.json').read_text())
+        assert manifest['versao'] == versao
+        assert manifest['metricas'] == {'totalAlunos': 10}
+        assert set(manifest['arquivos']) == {'evasao_model.pkl', 'scaler.pkl'}
+        assert len(manifest['hash']) == 64
+        assert not [n for n in os.listdir(tmp_path / 'versions') if n.startswith('.tmp-')]
+
+    def test_carrega_o_par_publicado(self, registry):
+        registry.publish(_bundle(5.0))
+
+        bundle = registry.load()
+
+        assert bundle.evasao_model == {'modelo': 'evasao', 'media': 5.0}
+        assert bundle.scaler.mean_[0] == 5.0
+        assert bundle.desempenho_model is None
+
+    def test_falha_na_gravacao_mantem_versao_atual(self, registry, tmp_path):
+        anterior = registry.publish(_bundle()).version
+
+        with pytest.raises(Exception):
+            registry.publish(ModelBundle(evasao_model=threading.Lock()))
+
+        assert registry.current_version() == anterior
+        assert registry.list_versions() == [anterior]
+        assert not [n for n in os.listdir(tmp_path / 'versions') if n.startswith('.tmp-')]
+
+    def test_hash_divergente_nao_carrega(self, registry, tmp_path):
+        versao = registry.publish(_bundle()).version
+        joblib.dump({'adulterado': True}, tmp_path / 'versions' / versao / 'evasao_model.pkl')
+
+        with pytest.raises(ValueError, match='Hash divergente'):
+            registry.load()
+
+    def test_remove_versoes_antigas(self, registry):
+        versoes = [registry.publish(_bundle(i)).version for i in range(5)]
+
+        assert registry.list_versions() == versoes[-3:]
+        assert registry.current_version() == versoes[-1]
+
+    def test_carrega_arrays_com_mmap(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path), mmap_mode='r')
+        registry.publish(_bundle(2.0))
+
+        scaler = registry.load().scaler
+
+        assert isinstance(scaler.mean_, np.memmap)
+        assert scaler.transform(np.array([[3.0]]))[0, 0] == pytest.approx(1.0)
+
+    def test_mmap_desativado_por_variavel(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('ML_MODEL_MMAP', '0')
+        registry = ModelRegistry(str(tmp_path))
+        registry.publish(_bundle())
+
+        assert not isinstance(registry.load().scaler.mean_, np.memmap)
+
+    def test_usa_layout_antigo_sem_current(self, registry, tmp_path):
+        joblib.dump({'modelo': 'antigo'}, tmp_path / 'evasao_model.pkl')
+
+        bundle = registry.load()
+
+        assert bundle.version == 'legado'
+        assert bundle.evasao_model == {'modelo': 'antigo'}
+        assert 'criadoEm' in bundle.manifest
+
+
+class TestHotSwap:
+    @pytest.fixture
+    def predictors(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('MODEL_PATH', str(tmp_path))
+        monkeypatch.setenv('ML_MODEL_RELOAD_INTERVAL', '0')
+        return MLPredictor(MagicMock()), MLPredictor(MagicMock())
+
+    def test_outro_processo_recebe_nova_versao(self, predictors):
+        treinador, servidor = predictors
+        assert servidor.refresh_models().evasao_model is None
+
+        treinador._bundle = _bundle(3.0)
+        treinador.save_models({'totalAlunos': 1})
+
+        bundle = servidor.refresh_models()
+        assert bundle.version == treinador._bundle.version
+        assert bundle.scaler.mean_[0] == 3.0
+        assert servidor.get_models_status()['metricas'] == {'totalAlunos': 1}
+
+    def test_sem_mudanca_no_ponteiro_nao_recarrega(self, predictors):
+        treinador, servidor = predictors
+        treinador._bundle = _bundle()
+        treinador.save_models()
+        primeiro = servidor.refresh_models()
+
+        assert servidor.refresh_models() is primeiro
+
+    def test_atribuir_modelo_nao_altera_bundle_em_uso(self, predictors):
+        _, servidor = predictors
+        em_uso = servidor._bundle
+
+        servidor.evasao_model = 'novo'
+
+        assert em_uso.evasao_model is None
+        assert servidor._bundle.evasao_model == 'novo'
+        assert servidor._bundle.scaler is em_uso.scaler
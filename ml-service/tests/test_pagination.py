@@ -0,0 +1,54 @@
+"""
+Testes do cursor da paginação por keyset
+"""
+from datetime import datetime
+
+import pytest
+
+from services.pagination import codificar_cursor, decodificar_cursor, fatiar_pagina, filtro_keyset
+
+
+class TestCursor:
+    def test_ida_e_volta(self):
+        cursor = codificar_cursor(datetime(2025, 6, 30, 12, 5, 1, 250), 'r-1')
+
+        assert '=' not in cursor
+        assert decodificar_cursor(cursor) == (datetime(2025, 6, 30, 12, 5, 1, 250), 'r-1')
+
+    def test_aceita_data_em_texto(self):
+        cursor = codificar_cursor('2025-06-30 12:05:00', 'r-1')
+
+        assert decodificar_cursor(cursor) == (datetime(2025, 6, 30, 12, 5), 'r-1')
+
+    @pytest.mark.parametrize('cursor', ['', '!!!', 'bnVsbA', codificar_cursor('ontem', 'r-1')])
+    def test_cursor_invalido(self, cursor):
+        with pytest.raises(ValueError, match='cursor inválido'):
+            decodificar_cursor(cursor)
+
+
+class TestFiltroKeyset:
+    def test_primeira_pagina_sem_filtro(self):
+        assert filtro_keyset('r', None) == ('', ())
+
+    def test_filtro_com_alias(self):
+        apos = (datetime(2025, 1, 2), 'r-9')
+
+        sql, params = filtro_keyset('u', apos)
+
+        assert sql == ' AND (u.criado_em < %s OR (u.criado_em = %s AND u.id < %s))'
+        assert params == (apos[0], apos[0], 'r-9')
+
+
+class TestFatiarPagina:
+    def test_linha_extra_gera_cursor_da_ultima_da_pagina(self):
+        linhas = [{'id': f'r-{i}', 'criado_em': datetime(2025, 1, 10 - i)} for i in range(4)]
+
+        pagina, cursor = fatiar_pagina(linhas, 3)
+
+        assert pagina == linhas[:3]
+        assert decodificar_cursor(cursor) == (datetime(2025, 1, 8), 'r-2')
+
+    def test_ultima_pagina_sem_cursor(self):
+        linhas = [{'id': 'r-1', 'criado_em': datetime(2025, 1, 1)}]
+
+        assert fatiar_pagina(linhas, 3) == (linhas, None)
@@ -0,0 +1,144 @@
+"""
+Testes do profiling opcional por requisição
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import Services, create_app
+from services import profiling
+from services.metrics import medir_consulta
+from services.profiling import ProfileStore, RequestProfile, medir_etapa
+
+
+class _FakeDb:
+    @medir_consulta
+    def get_alunos_data(self, turma_id):
+        return [{'id': 'a1'}, {'id': 'a2'}]
+
+
+class _FakeAnalytics:
+    def __init__(self):
+        self.db = _FakeDb()
+
+    @medir_etapa('analytics')
+    def get_turma_analytics(self, turma_id):
+        alunos = self.db.get_alunos_data(turma_id)
+        return {'turmaId': turma_id, 'totalAlunos': len(alunos)}
+
+
+class TestRequestProfile:
+    def test_etapas_aninhadas_descontam_o_tempo_das_filhas(self):
+        perfil = RequestProfile('GET', '/x')
+        profiling.ativar(perfil)
+        try:
+            _FakeAnalytics().get_turma_analytics('t1')
+        finally:
+            profiling.desativar()
+
+        relatorio = perfil.finalizar('/x', 200)
+
+        analytics, db = relatorio['etapas']
+        assert (analytics['categoria'], analytics['nivel']) == ('analytics', 0)
+        assert (db['categoria'], db['nome'], db['nivel'], db['linhas']) == ('db', 'get_alunos_data', 1, 2)
+        assert analytics['exclusivoMs'] == pytest.approx(analytics['duracaoMs'] - db['duracaoMs'], abs=0.01)
+        assert sum(item['ms'] for item in relatorio['resumo'].values()) == pytest.approx(relatorio['totalMs'], abs=0.1)
+
+    def test_sem_profiling_ativo_nada_e_registrado(self):
+        assert profiling.ativo() is None
+
+        with profiling.etapa('db', 'consulta') as extra:
+            extra['linhas'] = 1
+
+        assert _FakeAnalytics().get_turma_analytics('t1')['totalAlunos'] == 2
+
+    def test_modo_cprofile_lista_funcoes_mais_lentas(self):
+        perfil = RequestProfile('GET', '/x', cprofile=True)
+        perfil.iniciar()
+        sorted(range(1000), key=lambda x: -x)
+
+        relatorio = perfil.finalizar('/x', 200)
+
+        assert relatorio['cprofile']
+        assert {'funcao', 'chamadas', 'tempoProprioMs', 'tempoAcumuladoMs'} <= set(relatorio['cprofile'][0])
+
+
+class TestProfileStore:
+    def test_mantem_apenas_os_mais_recentes(self, tmp_path):
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        for i in range(3):
+            store.save({'id': f'p{i}'})
+
+        assert store.load('p0') is None
+        assert store.load('p2') == {'id': 'p2'}
+
+    def test_id_invalido_nao_sai_do_diretorio(self, tmp_path):
+        assert ProfileStore(str(tmp_path)).load('../segredo') is None
+
+
+class TestEndpointProfiling:
+    @pytest.fixture
+    def criar_client(self, tmp_path):
+        def criar(habilitado=True, token=''):
+            app = create_app(Services(
+                db_service=MagicMock(), ml_predictor=MagicMock(), analytics_service=_FakeAnalytics(),
+                result_cache=None, training_jobs=MagicMock(), profile_store=ProfileStore(str(tmp_path))
+            ))
+            app.config['ML_PROFILING_ENABLED'] = habilitado
+            app.config['ML_PROFILING_TOKEN'] = token
+            return app.test_client()
+        return criar
+
+    def test_desligado_por_padrao(self, criar_client):
+        client = criar_client(habilitado=False)
+
+        response = client.get('/analytics/turma/t1', headers={'X-Profile': '1'})
+
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response.headers
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_requisicao_sem_flag_nao_e_perfilada(self, criar_client):
+        response = criar_client().get('/analytics/turma/t1')
+
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_header_retorna_server_timing_e_relatorio(self, criar_client):
+        client = criar_client()
+
+        response = client.get('/analytics/turma/t1', headers={'X-Profile': '1'})
+
+        assert response.get_json() == {'turmaId': 't1', 'totalAlunos': 2}
+        timing = response.headers['Server-Timing']
+        assert 'db;dur=' in timing and 'analytics;dur=' in timing and 'total;dur=' in timing
+
+        relatorio = client.get(f"/profiles/{response.headers['X-Profile-Id']}").get_json()
+        assert relatorio['rota'] == '/analytics/turma/<turma_id>'
+        assert relatorio['status'] == 200
+        assert {'db', 'analytics', 'serializacao', 'flask'} <= set(relatorio['resumo'])
+        assert relatorio['cprofile'] is None
+
+    def test_flag_na_query_com_cprofile(self, criar_client):
+        client = criar_client()
+
+        response = client.get('/analytics/turma/t1?profile=cprofile')
+
+        relatorio = client.get(f"/profiles/{response.headers['X-Profile-Id']}").get_json()
+        assert relatorio['cprofile']
+
+    def test_token_obrigatorio_quando_configurado(self, criar_client):
+        client = criar_client(token='segredo')
+
+        sem_token = client.get('/analytics/turma/t1', headers={'X-Profile': '1'})
+        com_token = client.get('/analytics/turma/t1', headers={'X-Profile': '1', 'X-Profile-Token': 'segredo'})
+
+        assert 'X-Profile-Id' not in sem_token.headers
+        profile_id = com_token.headers['X-Profile-Id']
+        assert client.get(f'/profiles/{profile_id}').status_code == 404
+        assert client.get(f'/profiles/{profile_id}', headers={'X-Profile-Token': 'segredo'}).status_code == 200
+
+    def test_profile_inexistente(self, criar_client):
+        response = criar_client().get('/profiles/naoexiste')
+
+        assert response.status_code == 404
+        assert response.get_json() == {'error': 'Profile não encontrado'}
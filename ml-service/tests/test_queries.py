@@ -0,0 +1,384 @@
+"""
+Testes das queries do DatabaseService executadas sobre SQLite
+(dataset sintético de benchmarks/synthetic.py)
+"""
+from collections import defaultdict
+
+import pandas as pd
+import pytest
+
+from benchmarks.sqlite_shim import SQLiteDatabaseService
+from benchmarks.synthetic import generate
+from services.pagination import decodificar_cursor, fatiar_pagina
+
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
+    service = SQLiteDatabaseService(path)
+    with service.pool.connection() as conn:
+        generate(conn.raw, alunos=40, turmas=5, turmas_por_aluno=2,
+                 questionarios_por_turma=3, perguntas_por_questionario=5, seed=7)
+    yield service
+    service.close()
+
+
+@pytest.fixture(scope='module')
+def esperado(db):
+    """Agregados calculados em Python diretamente das tabelas"""
+    with db.pool.connection() as conn:
+        raw = conn.raw
+        alunos = {r[0] for r in raw.execute("SELECT id FROM users WHERE role = 'ALUNO' AND ativo = 1")}
+        turmas = defaultdict(set)
+        for aluno_id, turma_id in raw.execute('SELECT aluno_id, turma_id FROM alunos_turmas'):
+            turmas[aluno_id].add(turma_id)
+        respostas = defaultdict(list)
+        for aluno_id, q_id, valor in raw.execute('SELECT aluno_id, questionario_id, valor_num FROM respostas'):
+            respostas[aluno_id].append((q_id, valor))
+
+    dados = {}
+    for aluno_id in alunos:
+        notas = [v for _, v in respostas[aluno_id] if v is not None]
+        dados[aluno_id] = {
+            'turmas': turmas[aluno_id],
+            'total_turmas': len(turmas[aluno_id]),
+            'questionarios_respondidos': len({q for q, _ in respostas[aluno_id]}),
+            'total_respostas': len(respostas[aluno_id]),
+            'media_notas': sum(notas) / len(notas) if notas else None,
+        }
+    return dados
+
+
+class TestGetAlunosData:
+    def test_agregados_sem_multiplicacao_por_turma(self, db, esperado):
+        resultado = db.get_alunos_data()
+
+        assert len(resultado) == len(esperado)
+        for aluno in resultado:
+            exp = esperado[aluno['id']]
+            assert aluno['total_turmas'] == exp['total_turmas']
+            assert aluno['questionarios_respondidos'] == exp['questionarios_respondidos']
+            if exp['media_notas'] is None:
+                assert aluno['media_notas'] is None
+            else:
+                assert aluno['media_notas'] == pytest.approx(exp['media_notas'])
+
+    def test_filtro_por_turma(self, db, esperado):
+        turma_id = next(iter(next(iter(esperado.values()))['turmas']))
+
+        resultado = db.get_alunos_data(turma_id)
+
+        ids = {a['id'] for a in resultado}
+        assert ids == {a for a, exp in esperado.items() if turma_id in exp['turmas']}
+        for aluno in resultado:
+            assert aluno['questionarios_respondidos'] == esperado[aluno['id']]['questionarios_respondidos']
+
+
+class TestGetStudentFeatures:
+    def test_combina_dados_e_engajamento(self, db, esperado):
+        resultado = db.get_student_features()
+
+        assert len(resultado) == len(esperado)
+        for aluno in resultado:
+            exp = esperado[aluno['id']]
+            assert aluno['total_respostas'] == exp['total_respostas']
+            assert aluno['questionarios_respondidos'] == exp['questionarios_respondidos']
+            if exp['total_respostas']:
+                assert aluno['primeira_resposta'] <= aluno['ultima_resposta']
+                assert aluno['dias_ativo'] == (aluno['ultima_resposta'].date() - aluno['primeira_resposta'].date()).days
+            else:
+                assert aluno['ultima_resposta'] is None
+
+
+class TestGetStudentFeaturesBulk:
+    def test_uma_linha_por_matricula_igual_a_consulta_por_turma(self, db, esperado):
+        turma_ids = sorted({t for exp in esperado.values() for t in exp['turmas']})[:3]
+
+        resultado = db.get_student_features_bulk(turma_ids)
+
+        for turma_id in turma_ids:
+            linhas = [{k: v for k, v in a.items() if k != 'turma_id'} for a in resultado if a['turma_id'] == turma_id]
+            assert linhas == db.get_student_features(turma_id)
+
+    def test_todas_as_turmas_ativas(self, db, esperado):
+        resultado = db.get_student_features_bulk()
+
+        assert len(resultado) == sum(exp['total_turmas'] for exp in esperado.values())
+
+
+class TestGetResumoRespostasAluno:
+    def test_agregados_iguais_aos_calculados_das_respostas(self, db):
+        with db.pool.connection() as conn:
+            alunos = [r[0] for r in conn.raw.execute('SELECT DISTINCT aluno_id FROM respostas')]
+
+        for aluno_id in alunos:
+            respostas = sorted(db.get_respostas_aluno(aluno_id), key=lambda r: (r['criado_em'], r['id']))
+            notas = [r['valor_num'] for r in respostas if r['valor_num'] is not None]
+
+            resumo = db.get_resumo_respostas_aluno(aluno_id)
+
+            assert resumo['total_respostas'] == len(respostas)
+            assert resumo['questionarios_respondidos'] == len({r['questionario_id'] for r in respostas})
+            assert (resumo['primeira_resposta'], resumo['ultima_resposta']) == (
+                respostas[0]['criado_em'], respostas[-1]['criado_em'])
+            assert resumo['total_notas'] == len(notas)
+            if notas:
+                assert resumo['media_notas'] == pytest.approx(sum(notas) / len(notas))
+                assert (resumo['pior_nota'], resumo['melhor_nota']) == (min(notas), max(notas))
+
+    def test_aluno_sem_respostas(self, db):
+        resumo = db.get_resumo_respostas_aluno('nao-existe')
+
+        assert resumo['total_respostas'] == 0
+        assert resumo['primeira_resposta'] is None
+
+
+class TestGetSeriesNotas:
+    def test_ultimas_notas_de_cada_aluno_da_turma_em_ordem(self, db, esperado):
+        turma_id = next(iter(next(iter(esperado.values()))['turmas']))
+
+        df = db.get_series_notas(4, turma_id=turma_id)
+
+        with db.pool.connection() as conn:
+            alunos = {r[0] for r in conn.raw.execute(
+                'SELECT DISTINCT r.aluno_id FROM respostas r JOIN alunos_turmas at ON at.aluno_id = r.aluno_id '
+                'WHERE at.turma_id = ? AND r.valor_num IS NOT NULL', (turma_id,))}
+        assert set(df['aluno_id']) == alunos
+        for aluno_id, serie in df.groupby('aluno_id', observed=True, sort=False):
+            respostas = sorted((r for r in db.get_respostas_aluno(aluno_id) if r['valor_num'] is not None),
+                               key=lambda r: (r['criado_em'], r['id']))[-4:]
+            assert list(serie['valor_num']) == [r['valor_num'] for r in respostas]
+            assert list(serie['criado_em']) == [pd.Timestamp(r['criado_em']) for r in respostas]
+
+    def test_serie_de_um_aluno(self, db, esperado):
+        aluno_id = next(a for a, exp in esperado.items() if exp['media_notas'] is not None)
+
+        df = db.get_series_notas(1000, aluno_id=aluno_id)
+
+        assert set(df['aluno_id']) == {aluno_id}
+        assert df['criado_em'].is_monotonic_increasing
+        assert df['valor_num'].mean() == pytest.approx(esperado[aluno_id]['media_notas'])
+
+
+def _percorrer(consulta, limit):
+    """Todas as páginas de uma consulta por keyset, seguindo o cursor"""
+    linhas, apos = [], None
+    while True:
+        pagina, cursor = fatiar_pagina(consulta(limit + 1, apos), limit)
+        linhas.extend(pagina)
+        if cursor is None:
+            return linhas
+        apos = decodificar_cursor(cursor)
+
+
+class TestPaginacaoKeyset:
+    def test_paginas_de_respostas_cobrem_o_historico_em_ordem(self, db):
+        with db.pool.connection() as conn:
+            aluno_id, total = conn.raw.execute(
+                'SELECT aluno_id, COUNT(*) FROM respostas GROUP BY aluno_id ORDER BY COUNT(*) DESC LIMIT 1'
+            ).fetchone()
+
+        linhas = _percorrer(lambda limit, apos: db.get_respostas_aluno_page(aluno_id, limit, apos), limit=4)
+
+        chaves = [(str(r['criado_em']), r['id']) for r in linhas]
+        assert len(chaves) == total
+        assert len(set(chaves)) == total
+        assert chaves == sorted(chaves, reverse=True)
+
+    def test_paginas_de_features_iguais_a_consulta_da_turma(self, db, esperado):
+        turma_id = next(iter(next(iter(esperado.values()))['turmas']))
+        completo = {a['id']: a for a in db.get_student_features(turma_id)}
+
+        linhas = _percorrer(lambda limit, apos: db.get_student_features_page(turma_id, limit, apos), limit=3)
+
+        assert [a['id'] for a in linhas] == sorted(
+            completo, key=lambda i: (str(completo[i]['criado_em']), i), reverse=True)
+        for aluno in linhas:
+            assert aluno == completo[aluno['id']]
+
+
+class TestGetPerguntasStats:
+    def test_contagens_por_opcao_iguais_as_respostas(self, db):
+        with db.pool.connection() as conn:
+            raw = conn.raw
+            q_id = raw.execute(
+                'SELECT questionario_id FROM respostas GROUP BY questionario_id ORDER BY COUNT(*) DESC LIMIT 1'
+            ).fetchone()[0]
+            respostas = raw.execute(
+                'SELECT r.pergunta_id, r.valor_opcao, r.valor_num FROM respostas r '
+                'JOIN perguntas p ON p.id = r.pergunta_id WHERE p.questionario_id = ?', (q_id,)
+            ).fetchall()
+            perguntas = [r[0] for r in raw.execute(
+                'SELECT id FROM perguntas WHERE questionario_id = ? ORDER BY ordem', (q_id,)
+            )]
+
+        linhas = db.get_perguntas_stats(q_id)
+
+        contagens = defaultdict(int)
+        for pergunta_id, opcao, _ in respostas:
+            contagens[(pergunta_id, opcao)] += 1
+        assert {(l['pergunta_id'], l['valor_opcao']): l['total_respostas'] for l in linhas if l['total_respostas']} == contagens
+        assert list(dict.fromkeys(l['pergunta_id'] for l in linhas)) == perguntas
+        assert sum(l['total_num'] for l in linhas) == sum(1 for *_, v in respostas if v is not None)
+
+
+class TestModoColunar:
+    def test_frame_tem_os_mesmos_dados_das_linhas(self, db):
+        linhas = db.get_student_features()
+        frame = db.get_student_features(as_frame=True)
+
+        assert list(frame['id']) == [a['id'] for a in linhas]
+        assert list(frame['questionarios_respondidos']) == [a['questionarios_respondidos'] for a in linhas]
+        assert frame['ultima_resposta'].isna().sum() == sum(a['ultima_resposta'] is None for a in linhas)
+
+    def test_tipos_das_colunas(self, db):
+        frame = db.get_student_features(as_frame=True)
+
+        assert isinstance(frame['id'].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_dtype(frame['criado_em'])
+        assert pd.api.types.is_datetime64_dtype(frame['ultima_resposta'])
+        assert frame['questionarios_respondidos'].dtype == 'int64'
+        assert frame['media_notas'].dtype == 'float64'
+
+
+class TestLeituraEmBlocos:
+    QUERY = 'SELECT id, aluno_id, valor_num FROM respostas ORDER BY id'
+
+    def test_blocos_concatenados_iguais_ao_fetchall(self, db):
+        blocos = list(db.iter_query(self.QUERY, chunk_size=100))
+
+        assert all(len(b) <= 100 for b in blocos)
+        assert [linha for bloco in blocos for linha in bloco] == db.execute_query(self.QUERY)
+
+    def test_frames_em_blocos(self, db):
+        frames = list(db.iter_frames(self.QUERY, dtypes={'valor_num': 'float'}, chunk_size=250))
+
+        total = sum(len(f) for f in frames)
+        assert total == len(db.execute_query(self.QUERY))
+        assert all(f['valor_num'].dtype == 'float64' for f in frames)
+
+    def test_leitura_completa_devolve_conexao_ao_pool(self, db):
+        fechadas = db.pool.stats()['fechadas']
+
+        list(db.iter_query(self.QUERY, chunk_size=100))
+
+        assert db.pool.stats()['fechadas'] == fechadas
+        assert db.pool.stats()['emUso'] == 0
+
+    def test_gerador_abandonado_descarta_conexao(self, db):
+        fechadas = db.pool.stats()['fechadas']
+
+        blocos = db.iter_query(self.QUERY, chunk_size=10)
+        next(blocos)
+        blocos.close()
+
+        assert db.pool.stats()['fechadas'] == fechadas + 1
+        assert db.pool.stats()['emUso'] == 0
+
+    def test_iter_alunos_data_cobre_todos_os_alunos(self, db):
+        frames = list(db.iter_alunos_data(chunk_size=7))
+
+        ids = pd.concat([f['id'].astype(str) for f in frames])
+        assert sorted(ids) == sorted(a['id'] for a in db.get_alunos_data())
+
+
+class TestAlunoStatsRollup:
+    @pytest.fixture
+    def dbs(self, tmp_path):
+        path = str(tmp_path / 'rollup.sqlite3')
+        live = SQLiteDatabaseService(path)
+        with live.pool.connection() as conn:
+            generate(conn.raw, alunos=30, turmas=4, turmas_por_aluno=2,
+                     questionarios_por_turma=3, perguntas_por_questionario=4, seed=11)
+        com_rollup = SQLiteDatabaseService(path, rollup=True)
+        yield live, com_rollup
+        live.close()
+        com_rollup.close()
+
+    @staticmethod
+    def _por_id(linhas):
+        return {
+            a['id']: (a['total_turmas'], a['questionarios_respondidos'],
+                      None if a['media_notas'] is None else round(a['media_notas'], 6))
+            for a in linhas
+        }
+
+    def test_leitura_pelo_rollup_igual_a_consulta_direta(self, dbs):
+        live, com_rollup = dbs
+
+        assert self._por_id(com_rollup.get_alunos_data()) == self._por_id(live.get_alunos_data())
+        assert com_rollup.get_engagement_data() == live.get_engagement_data()
+        assert len(com_rollup.get_student_features_bulk()) == len(live.get_student_features_bulk())
+        # garante que a leitura veio do rollup, e não do fallback em respostas
+        assert com_rollup.execute_query('SELECT COUNT(*) as n FROM ml_aluno_stats')[0]['n'] > 0
+
+    def test_atualizacao_incremental_soma_apenas_respostas_novas(self, dbs):
+        live, com_rollup = dbs
+        com_rollup.get_alunos_data()  # constrói o rollup
+        aluno = live.get_alunos_data()[0]
+        with live.pool.connection() as conn:
+            raw = conn.raw
+            p_id, q_id = raw.execute(
+                "SELECT p.id, p.questionario_id FROM perguntas p WHERE p.tipo = 'ESCALA' LIMIT 1"
+            ).fetchone()
+            raw.execute(
+                "INSERT INTO respostas (id, questionario_id, pergunta_id, aluno_id, turma_id, valor_num, criado_em) "
+                "VALUES ('nova-1', ?, ?, ?, NULL, 10, datetime('now', '-1 minute'))",
+                (q_id, p_id, aluno['id'])
+            )
+            raw.commit()
+
+        assert com_rollup.rollup.refresh() == 1
+        assert self._por_id(com_rollup.get_alunos_data()) == self._por_id(live.get_alunos_data())
+        assert com_rollup.rollup.refresh() == 0
+
+    def test_rebuild_reconstroi_apos_remocao(self, dbs):
+        live, com_rollup = dbs
+        com_rollup.get_alunos_data()
+        with live.pool.connection() as conn:
+            conn.raw.execute('DELETE FROM respostas WHERE rowid % 3 = 0')
+            conn.raw.commit()
+
+        com_rollup.rollup.rebuild()
+
+        assert self._por_id(com_rollup.get_alunos_data()) == self._por_id(live.get_alunos_data())
+
+    def test_verificacao_periodica_reconstroi_apos_remocao_e_commit_atrasado(self, dbs):
+        live, com_rollup = dbs
+        com_rollup.get_alunos_data()
+        aluno = live.get_alunos_data()[0]
+        with live.pool.connection() as conn:
+            raw = conn.raw
+            p_id, q_id = raw.execute("SELECT id, questionario_id FROM perguntas WHERE tipo = 'ESCALA' LIMIT 1").fetchone()
+            raw.execute('DELETE FROM respostas WHERE rowid % 5 = 0')
+            # Confirmada depois da rodada que já passou do seu criado_em
+            raw.execute(
+                "INSERT INTO respostas (id, questionario_id, pergunta_id, aluno_id, turma_id, valor_num, criado_em) "
+                "VALUES ('atrasada-1', ?, ?, ?, NULL, 3, '2000-01-01 00:00:00')",
+                (q_id, p_id, aluno['id'])
+            )
+            raw.execute("UPDATE respostas SET valor_num = valor_num + 1 WHERE valor_num IS NOT NULL AND rowid % 7 = 0")
+            raw.commit()
+
+        assert com_rollup.rollup.consistente() is False
+        com_rollup.rollup.refresh()
+        assert self._por_id(com_rollup.get_alunos_data()) != self._por_id(live.get_alunos_data())
+
+        com_rollup.rollup.check_interval = 1
+        com_rollup.rollup._last_check = None
+        com_rollup.rollup.mark_stale()
+
+        assert self._por_id(com_rollup.get_alunos_data()) == self._por_id(live.get_alunos_data())
+        assert com_rollup.rollup.consistente() is True
+
+    def test_mark_rebuild_reconstroi_na_proxima_leitura(self, dbs):
+        live, com_rollup = dbs
+        com_rollup.rollup.check_interval = 0
+        com_rollup.get_alunos_data()
+        with live.pool.connection() as conn:
+            conn.raw.execute('DELETE FROM respostas WHERE rowid % 2 = 0')
+            conn.raw.commit()
+
+        com_rollup.rollup.mark_rebuild()
+
+        assert self._por_id(com_rollup.get_alunos_data()) == self._por_id(live.get_alunos_data())
@@ -0,0 +1,40 @@
+"""
+Testes de inicialização: o app sobe sem carregar as bibliotecas pesadas
+"""
+import os
+
+import pytest
+
+from benchmarks.bench_startup import BIBLIOTECAS_PESADAS, importtime
+
+# Orçamento do import do app (ms); o import antigo, com scikit-learn, levava ~1,6s
+ORCAMENTO_MS = float(os.getenv('ML_STARTUP_BUDGET_MS', 1000))
+
+
+class TestStartup:
+    def test_importar_app_nao_carrega_bibliotecas_pesadas(self):
+        modulos, _ = importtime('import app')
+
+        assert 'app' in modulos
+        assert [nome for nome in BIBLIOTECAS_PESADAS if nome in modulos] == []
+
+    def test_health_nao_inicializa_servicos(self):
+        modulos, _ = importtime(
+            "from app import create_app\n"
+            "assert create_app().test_client().get('/health').status_code == 200"
+        )
+
+        assert [nome for nome in BIBLIOTECAS_PESADAS if nome in modulos] == []
+        assert 'services.database' not in modulos
+
+    def test_tempo_de_importacao_dentro_do_orcamento(self):
+        modulos, _ = importtime('import app')
+
+        acumulado_ms = modulos['app'][1] / 1000
+        assert acumulado_ms < ORCAMENTO_MS, f'import app levou {acumulado_ms:.0f}ms'
+
+    def test_warm_up_carrega_servicos_de_predicao(self):
+        modulos, _ = importtime('from app import create_app; create_app().extensions["ml_services"].warm_up()')
+
+        assert 'services.ml_predictor' in modulos
+        assert 'pandas' in modulos
@@ -0,0 +1,69 @@
+"""
+Testes das estatísticas descritivas vetorizadas
+"""
+import numpy as np
+
+from services.stats import (FAIXAS_ENGAJAMENTO, FAIXAS_NOTAS, contar_faixas, faixas, pagina, primeiros_k,
+                            resumo, ultimos_k)
+
+
+class TestFaixas:
+    def test_igual_ao_digitize_inclusive_nos_limites(self):
+        valores = np.array([0, 3.99, 4, 5.5, 6, 7.99, 8, 10])
+
+        assert faixas(valores, FAIXAS_NOTAS[0]).tolist() == np.digitize(valores, FAIXAS_NOTAS[0]).tolist()
+
+    def test_nan_fica_na_primeira_faixa(self):
+        assert faixas(np.array([np.nan, 7.0]), FAIXAS_ENGAJAMENTO[0]).tolist() == [0, 2]
+
+    def test_contagem_por_faixa(self):
+        contagens = contar_faixas(np.array([1, 4, 5, 6, 8, 9.5]), *FAIXAS_NOTAS)
+
+        assert contagens == {'baixo': 1, 'regular': 2, 'bom': 1, 'excelente': 2}
+
+
+class TestResumo:
+    def test_ignora_nulos_e_valores_fora_da_mascara(self):
+        notas = np.array([np.nan, 0, 9.0, 5.0, 7.0])
+
+        resultado = resumo(notas, notas != 0, mediana=True, faixas_de=FAIXAS_NOTAS)
+
+        assert resultado == {
+            'total': 3,
+            'media': 7.0,
+            'mediana': 7.0,
+            'faixas': {'baixo': 0, 'regular': 1, 'bom': 1, 'excelente': 1},
+        }
+
+    def test_sem_valores_validos(self):
+        resultado = resumo(np.array([np.nan, np.nan]), mediana=True, faixas_de=FAIXAS_NOTAS)
+
+        assert resultado['total'] == 0
+        assert (resultado['media'], resultado['mediana']) == (0.0, 0.0)
+        assert set(resultado['faixas'].values()) == {0}
+
+    def test_vazio(self):
+        assert resumo(np.array([], dtype=float)) == {'total': 0, 'media': 0.0}
+
+
+class TestSelecaoParcial:
+    # Muitos empates, como nos riscos da heurística (80/50/20)
+    valores = np.array([20, 80, 50, 80, 20, 50, 80, 20, 50, 20], dtype=float)
+    ordem = np.argsort(-valores, kind='stable')
+
+    def test_primeiros_k_igual_ao_sort_estavel(self):
+        for k in range(len(self.valores) + 2):
+            assert primeiros_k(self.valores, k).tolist() == self.ordem[:k].tolist()
+
+    def test_ultimos_k_igual_ao_sort_estavel(self):
+        for k in range(1, len(self.valores) + 2):
+            assert ultimos_k(self.valores, k).tolist() == self.ordem[-k:].tolist()
+
+    def test_ordem_crescente(self):
+        assert primeiros_k(self.valores, 4, decrescente=False).tolist() == \
+            np.argsort(self.valores, kind='stable')[:4].tolist()
+
+    def test_pagina(self):
+        assert pagina(self.valores, limit=3, offset=2).tolist() == self.ordem[2:5].tolist()
+        assert pagina(self.valores, offset=8).tolist() == self.ordem[8:].tolist()
+        assert pagina(self.valores, limit=5, offset=20).tolist() == []
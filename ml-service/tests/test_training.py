@@ -0,0 +1,172 @@
+"""
+Testes dos jobs de treinamento em segundo plano
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from services import training
+from services.training import TrainingJobManager
+
+
+# Runners de nível de módulo: precisam ser importáveis pelo processo do pool
+def _runner_ok(job_id):
+    training._fila_progresso.put((job_id, 'treinando_evasao', 30, time.time()))
+    return {'success': True, 'totalAlunos': 3}
+
+
+def _runner_lento(job_id):
+    time.sleep(0.5)
+    return {'success': True}
+
+
+def _runner_sem_sucesso(job_id):
+    return {'success': False, 'error': 'Sem dados'}
+
+
+def _runner_com_excecao(job_id):
+    raise ValueError('falha no ajuste')
+
+
+def _aguardar(manager, job_id, timeout=20):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        job = manager.get(job_id)
+        if job['status'] not in training.ATIVOS:
+            return job
+        time.sleep(0.02)
+    raise AssertionError('job não terminou a tempo')
+
+
+@pytest.fixture
+def criar_manager():
+    managers = []
+
+    def criar(runner, **kwargs):
+        kwargs.setdefault('mp_context', 'fork')
+        manager = TrainingJobManager(runner=runner, **kwargs)
+        managers.append(manager)
+        return manager
+
+    yield criar
+    for manager in managers:
+        manager.shutdown()
+
+
+class TestTrainingJobManager:
+    def test_job_conclui_com_resultado_e_duracao(self, criar_manager):
+        manager = criar_manager(_runner_ok)
+
+        job, criado = manager.submit()
+        final = _aguardar(manager, job['jobId'])
+
+        assert criado is True
+        assert job['status'] == 'pendente'
+        assert final['status'] == 'concluido'
+        assert final['progresso'] == 100
+        assert final['resultado'] == {'success': True, 'totalAlunos': 3}
+        assert final['duracaoSegundos'] is not None
+        assert final['concluidoEm'] is not None
+
+    def test_single_flight_reaproveita_job_em_andamento(self, criar_manager):
+        manager = criar_manager(_runner_lento)
+
+        primeiro, criado1 = manager.submit()
+        segundo, criado2 = manager.submit()
+
+        assert (criado1, criado2) == (True, False)
+        assert segundo['jobId'] == primeiro['jobId']
+        _aguardar(manager, primeiro['jobId'])
+        terceiro, criado3 = manager.submit()
+        assert criado3 is True and terceiro['jobId'] != primeiro['jobId']
+
+    def test_resultado_sem_sucesso_marca_falha(self, criar_manager):
+        manager = criar_manager(_runner_sem_sucesso)
+
+        job, _ = manager.submit()
+        final = _aguardar(manager, job['jobId'])
+
+        assert final['status'] == 'falhou'
+        assert final['erro'] == 'Sem dados'
+
+    def test_excecao_no_processo_marca_falha(self, criar_manager):
+        manager = criar_manager(_runner_com_excecao)
+
+        job, _ = manager.submit()
+        final = _aguardar(manager, job['jobId'])
+
+        assert final['status'] == 'falhou'
+        assert 'falha no ajuste' in final['erro']
+
+    def test_on_complete_chamado_apenas_com_sucesso(self, criar_manager):
+        concluidos = []
+        evento = threading.Event()
+        manager = criar_manager(_runner_ok, on_complete=lambda job: (concluidos.append(job), evento.set()))
+
+        job, _ = manager.submit()
+
+        assert evento.wait(20)
+        assert concluidos[0]['jobId'] == job['jobId']
+
+    def test_job_desconhecido(self, criar_manager):
+        assert criar_manager(_runner_ok).get('nao-existe') is None
+
+    def test_contexto_spawn(self, criar_manager):
+        manager = criar_manager(_runner_ok, mp_context='spawn')
+
+        job, _ = manager.submit()
+
+        assert _aguardar(manager, job['jobId'], timeout=60)['status'] == 'concluido'
+
+
+class TestEstadoCompartilhado:
+    def test_single_flight_entre_processos(self, criar_manager, tmp_path):
+        worker1 = criar_manager(_runner_lento, state_dir=str(tmp_path))
+        worker2 = criar_manager(_runner_lento, state_dir=str(tmp_path))
+
+        job, criado1 = worker1.submit()
+        mesmo, criado2 = worker2.submit()
+
+        assert (criado1, criado2) == (True, False)
+        assert mesmo['jobId'] == job['jobId']
+        assert worker2.get(job['jobId'])['status'] in ('pendente', 'executando')
+
+        _aguardar(worker1, job['jobId'])
+        assert worker2.get(job['jobId'])['status'] == 'concluido'
+        novo, criado3 = worker2.submit()
+        assert criado3 is True and novo['jobId'] != job['jobId']
+        _aguardar(worker2, novo['jobId'])
+
+    def test_job_desconhecido_no_disco(self, criar_manager, tmp_path):
+        manager = criar_manager(_runner_ok, state_dir=str(tmp_path))
+
+        assert manager.get('nao-existe') is None
+        assert manager.get('../nao-existe') is None
+
+    def _job_no_disco(self, tmp_path, job_id, status='executando'):
+        (tmp_path / f'{job_id}.json').write_text(json.dumps({'jobId': job_id, 'status': status, 'erro': None}))
+        (tmp_path / 'ativo').write_text(job_id)
+
+    def test_job_sem_dono_e_lido_como_falho(self, criar_manager, tmp_path):
+        # Worker que iniciou o job morreu: o arquivo ficou 'executando' e ninguém segura o lock
+        self._job_no_disco(tmp_path, 'orfao')
+        manager = criar_manager(_runner_ok, state_dir=str(tmp_path))
+
+        job = manager.get('orfao')
+
+        assert job['status'] == 'falhou'
+        assert job['erro']
+        assert json.loads((tmp_path / 'orfao.json').read_text())['status'] == 'falhou'
+        assert not (tmp_path / 'ativo').exists()
+
+    def test_job_sem_dono_com_outro_treinamento_ativo(self, criar_manager, tmp_path):
+        self._job_no_disco(tmp_path, 'orfao')
+        worker1 = criar_manager(_runner_lento, state_dir=str(tmp_path))
+        worker2 = criar_manager(_runner_lento, state_dir=str(tmp_path))
+        job, _ = worker1.submit()
+
+        assert worker2.get('orfao')['status'] == 'falhou'
+        assert worker2.get(job['jobId'])['status'] in training.ATIVOS
+        _aguardar(worker1, job['jobId'])
@@ -0,0 +1,119 @@
+"""
+Testes do motor de tendências (séries de notas de vários alunos de uma vez)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import trends
+
+
+def _series(*series):
+    """Arrays achatados (grupos, tempos, valores) a partir de [(tempos, valores), ...]"""
+    grupos = np.concatenate([np.full(len(t), g) for g, (t, _) in enumerate(series)]).astype(np.intp)
+    tempos = np.concatenate([np.asarray(t, dtype=float) for t, _ in series])
+    valores = np.concatenate([np.asarray(v, dtype=float) for _, v in series])
+    return grupos, tempos, valores, len(series)
+
+
+def _theil_sen(t, v):
+    inclinacoes = [(v[j] - v[i]) / (t[j] - t[i])
+                   for i in range(len(t)) for j in range(i + 1, len(t)) if t[j] != t[i]]
+    return float(np.median(inclinacoes))
+
+
+class TestInclinacao:
+    def test_reta_exata_nos_dois_metodos(self):
+        args = _series(([0, 2, 3, 10], [1, 2, 2.5, 6]), ([0, 5, 10], [9, 8, 7]))
+
+        for estimador in (trends.inclinacao_mq, trends.inclinacao_theil_sen):
+            assert estimador(*args) == pytest.approx([0.5, -0.2])
+
+    def test_usa_os_instantes_e_nao_as_posicoes(self):
+        # Mesmas notas, espaçamento diferente: a inclinação muda
+        args = _series(([0, 1, 2], [5, 6, 7]), ([0, 1, 10], [5, 6, 7]))
+
+        inclinacao = trends.inclinacao_mq(*args)
+
+        assert inclinacao[0] == pytest.approx(1.0)
+        assert inclinacao[1] < 0.2
+
+    def test_theil_sen_igual_a_mediana_dos_pares_e_robusto(self):
+        rng = np.random.default_rng(3)
+        series = []
+        for _ in range(20):
+            t = np.sort(rng.integers(0, 60, rng.integers(2, 15))).astype(float)
+            series.append((t, rng.normal(6, 2, len(t))))
+        series.append(([0, 1, 2, 3, 4], [5, 5.1, 5.2, 0, 5.4]))  # nota atípica
+
+        inclinacoes = trends.inclinacao_theil_sen(*_series(*series))
+
+        for g, (t, v) in enumerate(series[:-1]):
+            if np.ptp(t) > 0:
+                assert inclinacoes[g] == pytest.approx(_theil_sen(t, v))
+        assert inclinacoes[-1] == pytest.approx(0.1)
+
+    def test_notas_no_mesmo_instante_nao_tem_inclinacao(self):
+        args = _series(([3, 3, 3], [4, 8, 6]), ([1], [7]))
+
+        for estimador in (trends.inclinacao_mq, trends.inclinacao_theil_sen):
+            assert np.isnan(estimador(*args)).all()
+
+    def test_grupo_sem_notas(self):
+        grupos, tempos, valores, _ = _series(([0, 1], [1, 2]))
+
+        resultado = trends.calcular_tendencias(grupos, tempos, valores, n_grupos=2)
+
+        assert resultado['total'].tolist() == [2, 0]
+        assert np.isnan(resultado['inclinacao'][1])
+
+
+class TestMediaExponencial:
+    def test_pesos_pela_meia_vida(self):
+        args = _series(([0, 30, 60], [2, 4, 8]))
+
+        media = trends.media_exponencial(*args, meia_vida=30)
+
+        assert media[0] == pytest.approx((0.25 * 2 + 0.5 * 4 + 8) / 1.75)
+
+
+class TestMediaPrimeiraMetade:
+    def test_primeiras_k_sobre_2_notas_de_cada_grupo(self):
+        grupos, tempos, valores, n = _series(([0, 1, 2, 3], [4, 6, 9, 9]), ([0, 1, 2], [3, 8, 8]), ([0], [5]))
+
+        media = trends.media_primeira_metade(grupos, valores, n)
+
+        assert media[:2].tolist() == [5.0, 3.0]
+        assert np.isnan(media[2])
+
+class TestClassificar:
+    def test_rotulos_pela_variacao_no_periodo(self):
+        args = _series(
+            ([0, 10, 20], [5, 6, 7]),    # +2 no período
+            ([0, 10, 20], [7, 6, 5]),    # -2
+            ([0, 10, 20], [6, 6.1, 6]),  # ~0
+            ([0, 10], [5, 9]),           # poucas notas
+            ([4, 4, 4], [1, 5, 9]),      # mesmo instante
+        )
+
+        resultado = trends.calcular_tendencias(*args)
+
+        assert resultado['variacao'][:2] == pytest.approx([2.0, -2.0])
+        assert trends.classificar(resultado, limiar=1.0, rotulos=trends.ROTULOS_DESEMPENHO) == [
+            'melhorando', 'piorando', 'estavel', 'insuficiente', 'insuficiente'
+        ]
+
+
+class TestTendenciasDoFrame:
+    def test_ids_na_ordem_dos_arrays(self):
+        df = pd.DataFrame({
+            'aluno_id': pd.Categorical(['b', 'b', 'b', 'a', 'a', 'a']),
+            'criado_em': pd.to_datetime(['2025-01-01', '2025-01-11', '2025-01-21'] * 2),
+            'valor_num': [5.0, 6.0, 7.0, 9.0, 8.0, 7.0],
+        })
+
+        ids, resultado = trends.tendencias_do_frame(df, metodo='mq')
+
+        assert ids.tolist() == ['b', 'a']
+        assert resultado['inclinacao'] == pytest.approx([0.1, -0.1])
+        assert resultado['dias'].tolist() == [20.0, 20.0]
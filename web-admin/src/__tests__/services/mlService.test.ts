@@ -0,0 +1,57 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+
+// Mock do módulo api para isolar o serviço
+vi.mock('../../lib/api', () => {
+  const mockApi = {
+    post: vi.fn(),
+    get: vi.fn(),
+    interceptors: {
+      request: { use: vi.fn() },
+      response: { use: vi.fn() },
+    },
+  };
+  return { default: mockApi, api: mockApi };
+});
+
+import api from '../../lib/api';
+import { mlService } from '../../services/mlService';
+
+const mockedApi = api as unknown as {
+  post: ReturnType<typeof vi.fn>;
+  get: ReturnType<typeof vi.fn>;
+};
+
+beforeEach(() => {
+  vi.clearAllMocks();
+  vi.useFakeTimers();
+});
+
+afterEach(() => {
+  vi.useRealTimers();
+});
+
+describe('mlService.trainModels', () => {
+  it('deve acompanhar o job até concluir e retornar o resultado', async () => {
+    mockedApi.post.mockResolvedValue({ data: { jobId: 'job-1', status: 'pendente' } });
+    mockedApi.get
+      .mockResolvedValueOnce({ data: { jobId: 'job-1', status: 'executando' } })
+      .mockResolvedValueOnce({ data: { jobId: 'job-1', status: 'concluido', resultado: { success: true } } });
+
+    const promessa = mlService.trainModels();
+    await vi.advanceTimersByTimeAsync(4000);
+
+    await expect(promessa).resolves.toEqual({ success: true });
+    expect(mockedApi.get).toHaveBeenCalledWith('/ml/train/jobs/job-1');
+  });
+
+  it('deve desistir quando o job não termina dentro do prazo', async () => {
+    mockedApi.post.mockResolvedValue({ data: { jobId: 'job-1', status: 'pendente' } });
+    mockedApi.get.mockResolvedValue({ data: { jobId: 'job-1', status: 'executando' } });
+
+    const promessa = mlService.trainModels();
+    const verificacao = expect(promessa).rejects.toThrow('Tempo esgotado');
+    await vi.advanceTimersByTimeAsync(31 * 60 * 1000);
+
+    await verificacao;
+  });
+});
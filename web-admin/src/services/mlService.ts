@@ -3,6 +3,10 @@
  */
 import api from '../lib/api';
 
+const TRAIN_POLL_INTERVAL_MS = 2000;
+// Prazo máximo acompanhando um treinamento antes de desistir
+const TRAIN_TIMEOUT_MS = 30 * 60 * 1000;
+
 export const mlService = {
   // Analytics
   async getOverview() {
@@ -46,8 +50,27 @@ export const mlService = {
   },
 
   // Modelos
+  // O treinamento roda em segundo plano: inicia o job e acompanha até terminar
   async trainModels() {
-    const { data } = await api.post('/ml/train');
+    const { data: job } = await api.post('/ml/train');
+    const prazo = Date.now() + TRAIN_TIMEOUT_MS;
+    let atual = job;
+    while (atual.status === 'pendente' || atual.status === 'executando') {
+      if (Date.now() >= prazo) {
+        throw new Error('Tempo esgotado aguardando o treinamento dos modelos');
+      }
+      await new Promise((resolve) => setTimeout(resolve, TRAIN_POLL_INTERVAL_MS));
+      const { data } = await api.get(`/ml/train/jobs/${job.jobId}`);
+      atual = data;
+    }
+    if (atual.resultado) {
+      return atual.resultado;
+    }
+    throw new Error(atual.erro || 'Falha no treinamento dos modelos');
+  },
+
+  async getTrainingJob(jobId: string) {
+    const { data } = await api.get(`/ml/train/jobs/${jobId}`);
     return data;
   },
 